@@ -0,0 +1,157 @@
+"""
+Loader/runner for user-defined commands in custom_commands.json
+Entries are either {"type": "run", "windows": ..., "mac": ..., "linux": ...}
+or {"type": "url", "url": ...}
+CustomCommandTable keeps the parsed file in memory and reloads it when it
+changes on disk.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import threading
+import webbrowser
+from collections import namedtuple
+
+from launcher.fuzzy_index import FuzzyIndex
+
+COMMANDS_PATH = os.path.join(os.path.dirname(__file__), "custom_commands.json")
+
+
+def load_custom_commands(path=COMMANDS_PATH):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading custom commands: {e}")
+        return {}
+
+
+def run_custom_command(name, commands=None):
+    """Run a named entry. Returns True if something was launched."""
+    commands = commands if commands is not None else load_custom_commands()
+    entry = commands.get(name)
+    if not entry:
+        print(f"Unknown custom command: {name}")
+        return False
+
+    try:
+        if entry.get("type") == "url":
+            webbrowser.open(entry["url"])
+            return True
+
+        if entry.get("type") == "run":
+            system = platform.system()
+            key = "windows" if system == "Windows" else "mac" if system == "Darwin" else "linux"
+            cmd = entry.get(key)
+            if not cmd:
+                print(f"Custom command '{name}' has no entry for {key}")
+                return False
+            subprocess.Popen(cmd, shell=True)
+            return True
+    except Exception as e:
+        print(f"Error running custom command '{name}': {e}")
+        return False
+
+    print(f"Unsupported custom command type: {entry.get('type')}")
+    return False
+
+
+def normalize_phrase(text):
+    return " ".join(text.lower().split())
+
+
+# One immutable version of the table; replaced as a whole on reload
+CommandSnapshot = namedtuple("CommandSnapshot", "commands phrases fuzzy mtime")
+
+
+class CustomCommandTable:
+    """custom_commands.json held in memory, reloaded when the file changes.
+
+    A daemon thread checks the file's mtime every ``interval`` seconds and
+    builds a new snapshot (the commands, a normalized phrase -> name table
+    and a FuzzyIndex) off the caller's thread; swapping it in is a single
+    assignment, so ``lookup``, ``commands`` and ``run`` never wait on disk.
+    A file that fails to parse (e.g. while it is being saved) keeps the
+    previous snapshot. ``on_reload(table)`` runs after each swap.
+    """
+
+    def __init__(self, path=COMMANDS_PATH, interval=1.0, on_reload=None):
+        self.path = path
+        self.interval = interval
+        self.on_reload = on_reload
+        self.reloads = 0
+        self._snapshot = CommandSnapshot({}, {}, FuzzyIndex(), None)
+        self._failed_mtime = None  # version of the file that did not parse, not retried
+        self._stop = threading.Event()
+        self._thread = None
+        self.reload()
+
+    @property
+    def commands(self):
+        return self._snapshot.commands
+
+    def names(self):
+        return list(self._snapshot.commands)
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self, force=False):
+        """Rebuild the snapshot if the file changed; returns True if it was swapped."""
+        mtime = self._mtime()
+        if not force and mtime in (self._snapshot.mtime, self._failed_mtime):
+            return False
+        commands = {}
+        if mtime is not None:
+            try:
+                with open(self.path, "r") as f:
+                    commands = json.load(f)
+            except Exception as e:
+                print(f"Error loading custom commands: {e}")
+                self._failed_mtime = mtime
+                return False
+        phrases = {normalize_phrase(name): name for name in commands}
+        fuzzy = FuzzyIndex()
+        for name in commands:
+            fuzzy.add(name, name)
+        self._snapshot = CommandSnapshot(commands, phrases, fuzzy, mtime)
+        self.reloads += 1
+        if self.on_reload is not None:
+            try:
+                self.on_reload(self)
+            except Exception as e:
+                print(f"Custom commands reload callback error: {e}")
+        return True
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.reload()
+
+    def lookup(self, text):
+        """Name of the custom command spoken as ``text`` (case/spacing ignored), or None."""
+        return self._snapshot.phrases.get(normalize_phrase(text))
+
+    def suggest(self, text, k=3):
+        """Closest custom command names as [(score, name)]."""
+        return [(score, name) for score, _phrase, name in self._snapshot.fuzzy.search(text, k)]
+
+    def run(self, name):
+        return run_custom_command(name, self._snapshot.commands)
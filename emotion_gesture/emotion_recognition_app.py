@@ -4,14 +4,19 @@ import cv2
 import numpy as np
 from PIL import Image, ImageTk
 import threading
-import time
 import webbrowser
 import subprocess
 import os
 import platform
+import sys
+import argparse
 import warnings
 warnings.filterwarnings('ignore')
 
+# Shared frame pacing helper
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from launcher.frame_scheduler import FrameScheduler
+
 # --- Model / features (your pipeline) ---
 import joblib
 from mediapipe.python.solutions import face_mesh as mp_face_mesh
@@ -24,7 +29,7 @@ LABELS_PATH = os.path.join(MODEL_DIR, "label_encoder.joblib")
 
 
 class EmotionRecognitionApp:
-    def __init__(self, root):
+    def __init__(self, root, detection_fps=30):
         self.root = root
 
         # --- App state ---
@@ -32,6 +37,12 @@ class EmotionRecognitionApp:
         self.emotion_confidence = 0.0
         self.detection_active = False
         self._proba_window = deque(maxlen=10)
+        self.detection_fps = max(1, int(detection_fps))
+        self.detection_scheduler = FrameScheduler(self.detection_fps)
+        # Preview: newest frame waiting for the Tk thread; dropped while minimized
+        self._pending_video = None
+        self._video_render_scheduled = False
+        self._preview_visible = True
 
         # Canonical 7 labels used by UI/actions
         self.emotion_labels = ['angry', 'disgust', 'fear', 'happy', 'neutral', 'sad', 'surprise']
@@ -270,9 +281,15 @@ class EmotionRecognitionApp:
 
     def setup_responsive_layout(self):
         self.root.bind('<Configure>', self._on_window_configure)
+        self.root.bind('<Map>', self._on_root_map)
+        self.root.bind('<Unmap>', self._on_root_map)
         self._last_width = self.root.winfo_width()
         self._last_height = self.root.winfo_height()
 
+    def _on_root_map(self, event):
+        if event.widget is self.root:
+            self._preview_visible = event.type == tk.EventType.Map
+
     def _on_window_configure(self, event):
         if event.widget == self.root:
             current_width = event.width
@@ -331,11 +348,13 @@ class EmotionRecognitionApp:
 
     # ---------- Prediction (UNCHANGED) ----------
     def predict_emotion_from_frame(self, frame_bgr):
+        return self.predict_emotion_from_rgb(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB))
+
+    def predict_emotion_from_rgb(self, rgb):
         if not self.model_loaded or self.face_mesh is None:
             return "neutral", 0.0
 
-        h, w = frame_bgr.shape[:2]
-        rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+        h, w = rgb.shape[:2]
         res = self.face_mesh.process(rgb)
         if not res.multi_face_landmarks:
             return "neutral", 0.0
@@ -378,42 +397,59 @@ class EmotionRecognitionApp:
 
     # ---------- Loop (camera size effect RESTORED) ----------
     def detect_emotions(self):
+        self.detection_scheduler.set_fps(self.detection_fps)
+        self.detection_scheduler.reset()
         while self.detection_active:
             if self.cap is None:
                 break
 
+            self.detection_scheduler.begin()
             ok, frame = self.cap.read()
             if not ok:
+                self.detection_scheduler.wait()
                 continue
             frame = cv2.flip(frame, 1)
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-            emotion, confidence = self.predict_emotion_from_frame(frame)
-            cv2.putText(frame, f'{emotion}: {confidence:.2f}', (10, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
+            emotion, confidence = self.predict_emotion_from_rgb(frame_rgb)
 
             # Update emotion panel
             self.root.after(0, self.update_emotion_display, emotion, confidence)
 
-            # === Camera resizing effect: fit frame to camera_container with aspect preserved ===
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            container_width = max(self.camera_container.winfo_width(), 400)
-            container_height = max(self.camera_container.winfo_height(), 300)
+            # Preview: keep only the newest frame; text + resize happen when it is shown
+            if self._preview_visible:
+                self._pending_video = (frame_rgb, emotion, confidence)
+                if not self._video_render_scheduled:
+                    self._video_render_scheduled = True
+                    self.root.after(0, self.render_video_frame)
 
-            aspect = frame_rgb.shape[1] / frame_rgb.shape[0]
-            if container_width / container_height > aspect:
-                new_height = container_height
-                new_width = int(container_height * aspect)
-            else:
-                new_width = container_width
-                new_height = int(container_width / aspect)
+            self.detection_scheduler.wait()  # paces to detection_fps, skips frames when behind
 
-            frame_pil = Image.fromarray(frame_rgb).resize((new_width, new_height), Image.Resampling.LANCZOS)
-            frame_tk = ImageTk.PhotoImage(frame_pil)
-            self.root.after(0, self.update_video_display, frame_tk)
+    # ---------- UI update helpers (UNCHANGED) ----------
+    def render_video_frame(self):
+        """Draw the label and fit the pending frame to camera_container (Tk thread)."""
+        self._video_render_scheduled = False
+        pending, self._pending_video = self._pending_video, None
+        if pending is None:
+            return
+        frame_rgb, emotion, confidence = pending
+        cv2.putText(frame_rgb, f'{emotion}: {confidence:.2f}', (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
 
-            time.sleep(0.03)  # ~33 FPS cap
+        container_width = max(self.camera_container.winfo_width(), 400)
+        container_height = max(self.camera_container.winfo_height(), 300)
+
+        aspect = frame_rgb.shape[1] / frame_rgb.shape[0]
+        if container_width / container_height > aspect:
+            new_height = container_height
+            new_width = int(container_height * aspect)
+        else:
+            new_width = container_width
+            new_height = int(container_width / aspect)
+
+        frame_pil = Image.fromarray(frame_rgb).resize((new_width, new_height), Image.Resampling.LANCZOS)
+        self.update_video_display(ImageTk.PhotoImage(frame_pil))
 
-    # ---------- UI update helpers (UNCHANGED) ----------
     def update_video_display(self, frame_tk):
         self.video_label.configure(image=frame_tk)
         self.video_label.image = frame_tk
@@ -656,8 +692,12 @@ class EmotionRecognitionApp:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Emotion recognition with action suggestions.")
+    parser.add_argument("--fps", type=int, default=30, help="Emotion detection rate in frames per second (default: 30).")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = EmotionRecognitionApp(root)
+    app = EmotionRecognitionApp(root, detection_fps=args.fps)
 
     def on_closing():
         app.detection_active = False
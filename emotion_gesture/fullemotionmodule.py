@@ -24,9 +24,15 @@ warnings.filterwarnings('ignore')
 # Import theme configuration
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from launcher import theme_config
+from launcher.frame_scheduler import FrameScheduler
 
 # Import advanced analytics
 from advanced_analytics import AdvancedAnalytics, ReportGenerator, REPORTLAB_AVAILABLE, PANDAS_AVAILABLE
+from gesture_library import GestureLibrary, CustomGestureTrigger
+from custom_commands import CustomCommandTable
+from scroll_emitter import ScrollEmitter
+from two_hand import (stack_hands, primary_index, finger_states, TwoHandGestures,
+                      THUMB, INDEX, MIDDLE, RING, PINKY)
 
 # --- Model / features (your pipeline) ---
 import joblib
@@ -45,7 +51,7 @@ LABELS_PATH = os.path.join(MODEL_DIR, "label_encoder.joblib")
 # Hand Gesture Mouse Controller
 # ==============================
 class HandGestureController:
-    def __init__(self):
+    def __init__(self, target_fps=30, two_hand_mode=False):
         self.running = False
         self.is_active = False
         self.thread = None
@@ -74,13 +80,26 @@ class HandGestureController:
         self.RIGHT_CLICK_COOLDOWN = 1.0
         
         # Vertical scroll
-        self.SCROLL_INTERVAL = 0.15
         self.V_DEADZONE = max(30, int(self.screen_height * 0.05))
-        self.last_scroll_time = 0.0
+        self.scroller = ScrollEmitter(pyautogui.scroll, deadzone=self.V_DEADZONE / self.mid_screen_y)
         
         # MediaPipe hands
         self.mp_hands = mp_hands
         self.hands = None
+
+        # Frame pacing; read on start
+        self.target_fps = target_fps
+        self.scheduler = FrameScheduler(self.target_fps)
+
+        # Custom poses recorded from the speech app (custom_gestures.json)
+        self.gesture_library = GestureLibrary()
+        self.custom_trigger = CustomGestureTrigger()
+        self.custom_commands = CustomCommandTable()
+        self.custom_commands.start()
+
+        # Two-hand mode: track both hands (pinch-zoom, two-hand scroll); read on start
+        self.two_hand_mode = two_hand_mode
+        self.two_hand_gestures = TwoHandGestures()
         
     def landmarks_to_array(self, lm_list):
         return np.array([[lm.x, lm.y, lm.z] for lm in lm_list])
@@ -105,32 +124,45 @@ class HandGestureController:
             self.cap = cap
             self.thread = threading.Thread(target=self._run_gesture_control, daemon=True)
             self.thread.start()
+            self.scroller.start()
             print("Hand Gesture Controller started")
     
     def stop(self):
         self.running = False
         self.is_active = False
+        self.scroller.stop()
         if self.hands:
             self.hands.close()
             self.hands = None
         print("Hand Gesture Controller stopped")
+        print(f"Gesture loop: {self.scheduler.summary()}")
+    
+    def _run_custom_gesture(self, template):
+        binding = template.get("binding", {})
+        print(f"Custom Gesture: {template['name']}")
+        # Voice-command bindings need the speech app; only custom commands run here
+        if binding.get("type") == "command":
+            self.custom_commands.run(binding.get("target", ""))
     
     def _run_gesture_control(self):
         self.hands = self.mp_hands.Hands(
             model_complexity=1,
             min_detection_confidence=0.6,
             min_tracking_confidence=0.6,
-            max_num_hands=1
+            max_num_hands=2 if self.two_hand_mode else 1
         )
+        self.scheduler.set_fps(self.target_fps)
+        self.scheduler.reset()
         
         while self.running:
             if self.cap is None:
                 time.sleep(0.1)
                 continue
                 
+            self.scheduler.begin()
             ret, frame = self.cap.read()
             if not ret:
-                time.sleep(0.03)
+                self.scheduler.wait()
                 continue
             
             frame = cv2.flip(frame, 1)
@@ -140,22 +172,35 @@ class HandGestureController:
             now = time.time()
             
             if results.multi_hand_landmarks:
-                hand_landmarks = results.multi_hand_landmarks[0]
-                lms = self.landmarks_to_array(hand_landmarks.landmark)
+                # All hands in one array; finger states for every hand in one pass
+                stack, labels = stack_hands(results)
+                states = finger_states(stack, labels if self.two_hand_mode else None)
+                primary = primary_index(labels) if self.two_hand_mode else 0
+                lms = stack[primary]
                 
                 # Toggle activation with 5 fingers
-                if self.five_fingers_extended(lms) and (now - self.last_toggle_time > 1.5):
+                if states[primary].all() and (now - self.last_toggle_time > 1.5):
                     self.is_active = not self.is_active
                     print("Virtual Mouse " + ("Activated" if self.is_active else "Deactivated"))
                     self.last_toggle_time = now
                 
-                if self.is_active:
+                # Two-hand gestures take priority over the one-hand ones
+                if self.is_active and self.two_hand_mode:
+                    for action, direction in self.two_hand_gestures.update(stack, states, now):
+                        if action == "zoom":
+                            mod = "command" if platform.system() == "Darwin" else "ctrl"
+                            pyautogui.hotkey(mod, "+" if direction > 0 else "-")
+                            print("Zoom In" if direction > 0 else "Zoom Out")
+                        elif action == "scroll":
+                            pyautogui.scroll(50 * direction)
+                            print("Two-hand Scroll " + ("Up" if direction > 0 else "Down"))
+                
+                if not self.is_active or self.two_hand_gestures.active:
+                    self.scroller.release()
+                else:
                     # Finger states
-                    index_ext = self.finger_extended_np(lms, 8, 6)
-                    middle_ext = self.finger_extended_np(lms, 12, 10)
-                    ring_ext = self.finger_extended_np(lms, 16, 14)
-                    pinky_ext = self.finger_extended_np(lms, 20, 18)
-                    thumb_ext = self.thumb_really_extended_np(lms)
+                    thumb_ext, index_ext, middle_ext, ring_ext, pinky_ext = (
+                        bool(v) for v in states[primary, [THUMB, INDEX, MIDDLE, RING, PINKY]])
                     
                     # Cursor movement
                     index_tip = lms[self.mp_hands.HandLandmark.INDEX_FINGER_TIP.value]
@@ -207,23 +252,28 @@ class HandGestureController:
                         self.right_click_active = False
                     
                     # Vertical Scroll
+                    # (velocity follows distance from mid-screen, emitted by self.scroller)
                     scroll_gesture = index_ext and middle_ext and ring_ext and not pinky_ext
-                    if scroll_gesture and (now - self.last_scroll_time >= self.SCROLL_INTERVAL):
+                    if scroll_gesture:
                         avg_y = np.mean([lms[8,1], lms[12,1], lms[16,1]])
-                        finger_y_screen = int(avg_y * self.screen_height)
-                        dy = finger_y_screen - self.mid_screen_y
-                        if abs(dy) > self.V_DEADZONE:
-                            if dy > 0:
-                                pyautogui.scroll(-50)
-                                print("Scroll Down")
-                            else:
-                                pyautogui.scroll(50)
-                                print("Scroll Up")
-                        self.last_scroll_time = now
+                        self.scroller.feed((avg_y * self.screen_height - self.mid_screen_y) / self.mid_screen_y)
+                    else:
+                        self.scroller.release()
+
+                    # Custom poses, only when no built-in gesture is held
+                    if len(self.gesture_library) and not (left_click_gesture or rock_sign or scroll_gesture or self.dragging):
+                        template, _dist = self.gesture_library.match(lms)
+                        fired = self.custom_trigger.update(template, now)
+                        if fired:
+                            self._run_custom_gesture(fired)
+                    else:
+                        self.custom_trigger.update(None, now)
             else:
+                self.two_hand_gestures.reset()
+                self.scroller.release()
                 self.prev_mouse_x, self.prev_mouse_y = pyautogui.position()
             
-            time.sleep(0.03)
+            self.scheduler.wait()
 
 
 # ==============================
@@ -242,6 +292,12 @@ class EmotionRecognitionApp:
         self.emotion_confidence = 0.0
         self.detection_active = False
         self._proba_window = deque(maxlen=10)
+        self.detection_fps = 30
+        self.detection_scheduler = FrameScheduler(self.detection_fps)
+        # Preview: newest frame waiting for the Tk thread; dropped while minimized
+        self._pending_video = None
+        self._video_render_scheduled = False
+        self._preview_visible = True
 
         # Canonical 7 labels used by UI/actions
         self.emotion_labels = ['angry', 'disgust', 'fear', 'happy', 'neutral', 'sad', 'surprise']
@@ -678,9 +734,15 @@ class EmotionRecognitionApp:
 
     def setup_responsive_layout(self):
         self.root.bind('<Configure>', self._on_window_configure)
+        self.root.bind('<Map>', self._on_root_map)
+        self.root.bind('<Unmap>', self._on_root_map)
         self._last_width = self.root.winfo_width()
         self._last_height = self.root.winfo_height()
 
+    def _on_root_map(self, event):
+        if event.widget is self.root:
+            self._preview_visible = event.type == tk.EventType.Map
+
     def _on_window_configure(self, event):
         if event.widget == self.root:
             current_width = event.width
@@ -736,11 +798,13 @@ class EmotionRecognitionApp:
         return self.emotion_actions.get(canonical_label) or self.emotion_actions["neutral"]
 
     def predict_emotion_from_frame(self, frame_bgr):
+        return self.predict_emotion_from_rgb(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB))
+
+    def predict_emotion_from_rgb(self, rgb):
         if not self.model_loaded or self.face_mesh is None:
             return "neutral", 0.0
 
-        h, w = frame_bgr.shape[:2]
-        rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+        h, w = rgb.shape[:2]
         res = self.face_mesh.process(rgb)
         if not res.multi_face_landmarks:
             return "neutral", 0.0
@@ -782,48 +846,58 @@ class EmotionRecognitionApp:
         return arr
 
     def detect_emotions(self):
+        self.detection_scheduler.set_fps(self.detection_fps)
+        self.detection_scheduler.reset()
         while self.detection_active:
             if self.cap is None:
                 break
 
+            self.detection_scheduler.begin()
             ok, frame = self.cap.read()
             if not ok:
+                self.detection_scheduler.wait()
                 continue
             frame = cv2.flip(frame, 1)
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-            emotion, confidence = self.predict_emotion_from_frame(frame)
-            cv2.putText(
-                frame,
-                f'{emotion}: {confidence:.2f}',
-                (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1.0,
-                (0, 255, 0),
-                2
-            )
+            emotion, confidence = self.predict_emotion_from_rgb(frame_rgb)
 
+            # Update emotion panel
             self.root.after(0, self.update_emotion_display, emotion, confidence)
 
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            container_width = max(self.camera_container.winfo_width(), 400)
-            container_height = max(self.camera_container.winfo_height(), 300)
+            # Preview: keep only the newest frame; text + resize happen when it is shown
+            if self._preview_visible:
+                self._pending_video = (frame_rgb, emotion, confidence)
+                if not self._video_render_scheduled:
+                    self._video_render_scheduled = True
+                    self.root.after(0, self.render_video_frame)
+
+            self.detection_scheduler.wait()
+        print(f"Emotion detection loop: {self.detection_scheduler.summary()}")
+
+    def render_video_frame(self):
+        """Draw the label and fit the pending frame to camera_container (Tk thread)."""
+        self._video_render_scheduled = False
+        pending, self._pending_video = self._pending_video, None
+        if pending is None:
+            return
+        frame_rgb, emotion, confidence = pending
+        cv2.putText(frame_rgb, f'{emotion}: {confidence:.2f}', (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
 
-            aspect = frame_rgb.shape[1] / frame_rgb.shape[0]
-            if container_width / container_height > aspect:
-                new_height = container_height
-                new_width = int(container_height * aspect)
-            else:
-                new_width = container_width
-                new_height = int(container_width / aspect)
+        container_width = max(self.camera_container.winfo_width(), 400)
+        container_height = max(self.camera_container.winfo_height(), 300)
 
-            frame_pil = Image.fromarray(frame_rgb).resize(
-                (new_width, new_height),
-                Image.Resampling.LANCZOS
-            )
-            frame_tk = ImageTk.PhotoImage(frame_pil)
-            self.root.after(0, self.update_video_display, frame_tk)
+        aspect = frame_rgb.shape[1] / frame_rgb.shape[0]
+        if container_width / container_height > aspect:
+            new_height = container_height
+            new_width = int(container_height * aspect)
+        else:
+            new_width = container_width
+            new_height = int(container_width / aspect)
 
-            time.sleep(0.03)
+        frame_pil = Image.fromarray(frame_rgb).resize((new_width, new_height), Image.Resampling.LANCZOS)
+        self.update_video_display(ImageTk.PhotoImage(frame_pil))
 
     def update_video_display(self, frame_tk):
         self.video_label.configure(image=frame_tk)
@@ -978,6 +1052,8 @@ class EmotionRecognitionApp:
                 "• Thumb + Index: Click (hold for drag)\n"
                 "• Index + Pinky (rock sign): Right click\n"
                 "• Index + Middle + Ring: Scroll (move hand up/down)"
+                + ("\n• Both hands pinching: Zoom (move apart/together)\n• Both hands Index + Middle: Scroll (move up/down)"
+                   if self.gesture_controller.two_hand_mode else "")
             )
         else:
             self.gesture_controller.stop()
@@ -1584,6 +1660,20 @@ class EmotionRecognitionApp:
             }
             self._save_user_settings()
         
+        # Frame-rate and gesture preferences, used the next time detection starts
+        preferences = self.user_settings.get('preferences', {})
+        try:
+            self.gesture_controller.target_fps = max(1, int(preferences.get('gesture_fps', 30)))
+        except (TypeError, ValueError):
+            print(f"Ignoring invalid gesture_fps preference: {preferences.get('gesture_fps')!r}")
+            self.gesture_controller.target_fps = 30
+        try:
+            self.detection_fps = max(1, int(preferences.get('detection_fps', 30)))
+        except (TypeError, ValueError):
+            print(f"Ignoring invalid detection_fps preference: {preferences.get('detection_fps')!r}")
+            self.detection_fps = 30
+        self.gesture_controller.two_hand_mode = bool(preferences.get('two_hand_mode', False))
+
         # Load emotion log
         self._load_emotion_log()
     
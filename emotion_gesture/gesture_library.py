@@ -0,0 +1,227 @@
+"""
+Custom static hand-pose library
+Records user-defined poses as normalized landmark vectors and matches live
+hands against them with a vectorized nearest-neighbour search
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+GESTURES_PATH = os.path.join(os.path.dirname(__file__), "custom_gestures.json")
+
+NUM_LANDMARKS = 21
+VECTOR_SIZE = NUM_LANDMARKS * 3
+WRIST = 0
+MIDDLE_MCP = 9
+
+
+def normalize_pose(lms):
+    """Normalize landmarks for translation, scale and in-plane rotation.
+
+    ``lms`` is a (21, 3) array or a stacked (N, 21, 3) array of MediaPipe
+    landmarks. Returns float32 vectors of shape (63,) or (N, 63).
+    """
+    pts = np.asarray(lms, dtype=np.float32)
+    single = pts.ndim == 2
+    if single:
+        pts = pts[None, ...]
+
+    # Translation: wrist at the origin
+    pts = pts - pts[:, WRIST:WRIST + 1, :]
+
+    # Rotation: wrist -> middle MCP points straight up (-y in image space)
+    axis = pts[:, MIDDLE_MCP, :2]
+    angle = -np.arctan2(axis[:, 0], -axis[:, 1])
+    cos, sin = np.cos(angle)[:, None], np.sin(angle)[:, None]
+    x, y = pts[:, :, 0], pts[:, :, 1]
+    rotated = np.stack([x * cos - y * sin, x * sin + y * cos, pts[:, :, 2]], axis=-1)
+
+    # Scale: palm length becomes 1
+    scale = np.linalg.norm(axis, axis=1)
+    scale[scale < 1e-6] = 1.0
+    rotated /= scale[:, None, None]
+
+    vectors = rotated.reshape(rotated.shape[0], VECTOR_SIZE)
+    return vectors[0] if single else vectors
+
+
+class GestureLibrary:
+    """User-recorded poses bound to actions, persisted as JSON.
+
+    Each template stores a name, a fixed-length pose vector and a binding
+    such as ``{"type": "command", "target": "open project folder"}`` (an entry
+    of custom_commands.json) or ``{"type": "speech", "target": "volume up"}``.
+    Changes are written to disk by a background thread, since they are
+    usually made from the camera loop; ``flush`` waits for the write.
+    """
+
+    def __init__(self, path=GESTURES_PATH, threshold=0.3):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_pending = False
+        self._saver = None
+        self.templates = []
+        self._rows = []
+        self._matrix = np.zeros((0, VECTOR_SIZE), dtype=np.float32)
+        self._sq_norms = np.zeros((0,), dtype=np.float32)
+        self.load()
+
+    def __len__(self):
+        return len(self.templates)
+
+    def names(self):
+        return [t["name"] for t in self.templates]
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                self.templates = [t for t in data.get("gestures", [])
+                                  if len(t.get("vector", [])) == VECTOR_SIZE]
+        except Exception as e:
+            print(f"Error loading custom gestures: {e}")
+            self.templates = []
+        self._rebuild()
+
+    def save(self):
+        try:
+            with open(self.path, "w") as f:
+                json.dump({"gestures": self.templates}, f, indent=2)
+        except Exception as e:
+            print(f"Error saving custom gestures: {e}")
+
+    def save_later(self):
+        """Save on the background writer; several changes in a row are written once."""
+        with self._save_lock:
+            self._save_pending = True
+            if self._saver is None:
+                self._saver = threading.Thread(target=self._save_loop, daemon=True)
+                self._saver.start()
+
+    def _save_loop(self):
+        while True:
+            with self._save_lock:
+                if not self._save_pending:
+                    self._saver = None
+                    return
+                self._save_pending = False
+            self.save()
+
+    def flush(self, timeout=2.0):
+        """Wait for a pending background save; True once nothing is left to write."""
+        with self._save_lock:
+            saver = self._saver
+        if saver is not None:
+            saver.join(timeout)
+        return self._saver is None
+
+    def _rebuild(self):
+        # Swap in a new matrix so match() never sees a half-built one
+        rows = list(self.templates)
+        if rows:
+            matrix = np.array([t["vector"] for t in rows], dtype=np.float32)
+        else:
+            matrix = np.zeros((0, VECTOR_SIZE), dtype=np.float32)
+        with self._lock:
+            self._rows = rows
+            self._matrix = matrix
+            self._sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+
+    def add_template(self, name, samples, binding):
+        """Average one or more (21, 3) landmark samples into a template."""
+        vectors = normalize_pose(np.asarray(samples, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 3))
+        vector = vectors.mean(axis=0)
+        self.templates = [t for t in self.templates if t["name"] != name]
+        self.templates.append({
+            "name": name,
+            "vector": [round(float(v), 5) for v in vector],
+            "binding": binding,
+        })
+        self._rebuild()
+        self.save_later()
+
+    def remove_template(self, name):
+        before = len(self.templates)
+        self.templates = [t for t in self.templates if t["name"] != name]
+        if len(self.templates) != before:
+            self._rebuild()
+            self.save_later()
+            return True
+        return False
+
+    def match_vectors(self, vectors):
+        """Nearest template for each row of ``vectors`` (N, 63).
+
+        Returns (templates, distances); the template is None where the
+        nearest one is further than the threshold.
+        """
+        with self._lock:
+            rows, matrix, sq_norms = self._rows, self._matrix, self._sq_norms
+        vectors = np.atleast_2d(vectors)
+        if matrix.shape[0] == 0:
+            return [None] * vectors.shape[0], np.full(vectors.shape[0], np.inf)
+        # ||t - q||^2 = ||t||^2 - 2 t.q + ||q||^2, all templates at once
+        d2 = sq_norms[None, :] - 2.0 * vectors @ matrix.T + np.einsum("ij,ij->i", vectors, vectors)[:, None]
+        idx = np.argmin(d2, axis=1)
+        dist = np.sqrt(np.maximum(d2[np.arange(len(idx)), idx], 0.0)) / np.sqrt(NUM_LANDMARKS)
+        matches = [rows[i] if d <= self.threshold else None for i, d in zip(idx, dist)]
+        return matches, dist
+
+    def match(self, lms):
+        """Match one (21, 3) landmark array. Returns (template or None, distance)."""
+        matches, dist = self.match_vectors(normalize_pose(lms)[None, :])
+        return matches[0], float(dist[0])
+
+
+class PoseRecorder:
+    """Collects a few frames of a held pose before saving it as a template."""
+
+    def __init__(self, library, name, binding, frames=15):
+        self.library = library
+        self.name = name
+        self.binding = binding
+        self.frames = frames
+        self.samples = []
+
+    @property
+    def done(self):
+        return len(self.samples) >= self.frames
+
+    def add(self, lms):
+        if not self.done:
+            self.samples.append(np.asarray(lms, dtype=np.float32))
+            if self.done:
+                self.library.add_template(self.name, self.samples, self.binding)
+        return self.done
+
+
+class CustomGestureTrigger:
+    """Fires a template's binding once the pose has been held long enough."""
+
+    def __init__(self, hold_time=0.4, cooldown=1.5):
+        self.hold_time = hold_time
+        self.cooldown = cooldown
+        self._current = None
+        self._since = 0.0
+        self._last_fire = 0.0
+
+    def update(self, template, now):
+        """Feed the current match (or None). Returns the template to fire, if any."""
+        name = template["name"] if template else None
+        if name != self._current:
+            self._current = name
+            self._since = now
+            return None
+        if (name is not None
+                and now - self._since >= self.hold_time
+                and now - self._last_fire >= self.cooldown):
+            self._last_fire = now
+            self._since = now
+            return template
+        return None
@@ -0,0 +1,108 @@
+"""
+Continuous scroll emitter
+A small thread that scrolls at a fixed rate with a velocity proportional to
+the hand's displacement, so the vision loop only has to post a number
+"""
+
+import threading
+import time
+
+from launcher.frame_scheduler import FrameScheduler
+
+
+class ScrollEmitter:
+    """Turn a displacement in [-1, 1] into smooth, continuous scrolling.
+
+    The gesture loop calls ``feed(displacement)`` every frame (negative is
+    up, as in image coordinates) and ``release()`` when the scroll gesture
+    ends. The emitter thread runs at ``rate_hz`` and sends whole scroll
+    units through ``scroll_fn`` as its fractional accumulator fills up.
+
+    Speed curve: no motion inside ``deadzone``; beyond it the normalized
+    excess is raised to ``exponent`` (>1 gives fine control near the centre
+    and fast scrolling at the edges) and scaled to ``max_speed`` units/s.
+    """
+
+    def __init__(self, scroll_fn, rate_hz=60, deadzone=0.1, max_speed=1200.0,
+                 exponent=1.8, smoothing=0.25, stale_after=0.25):
+        self.scroll_fn = scroll_fn
+        self.deadzone = deadzone
+        self.max_speed = max_speed
+        self.exponent = exponent
+        self.smoothing = smoothing
+        self.stale_after = stale_after
+        self.scheduler = FrameScheduler(rate_hz)
+
+        self._target = 0.0
+        self._fed_at = 0.0
+        self._velocity = 0.0
+        self._accum = 0.0
+        self._running = False
+        self._thread = None
+
+    def speed_for(self, displacement):
+        """Scroll speed (units/s, positive scrolls up) for a displacement."""
+        mag = min(abs(displacement), 1.0)
+        if mag <= self.deadzone:
+            return 0.0
+        excess = (mag - self.deadzone) / (1.0 - self.deadzone)
+        speed = self.max_speed * excess ** self.exponent
+        return speed if displacement < 0 else -speed
+
+    def feed(self, displacement):
+        # Plain attribute writes: the vision loop never waits on the emitter
+        self._target = self.speed_for(displacement)
+        self._fed_at = time.perf_counter()
+
+    def release(self):
+        self._target = 0.0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._velocity = 0.0
+        self._accum = 0.0
+        self.scheduler.reset()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._target = 0.0
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=0.5)
+        self._thread = None
+
+    def is_running(self):
+        return self._running
+
+    def step(self, dt):
+        """Advance the emitter by ``dt`` seconds. Returns the units scrolled."""
+        target = self._target
+        if time.perf_counter() - self._fed_at > self.stale_after:
+            target = 0.0  # hand lost / loop stalled: coast to a stop
+        self._velocity += (target - self._velocity) * self.smoothing
+        if abs(self._velocity) < 1.0 and target == 0.0:
+            self._velocity = 0.0
+            self._accum = 0.0
+            return 0
+
+        self._accum += self._velocity * dt
+        units = int(self._accum)
+        if units:
+            self._accum -= units
+            try:
+                self.scroll_fn(units)
+            except Exception as e:
+                print(f"Scroll error: {e}")
+        return units
+
+    def _run(self):
+        last = time.perf_counter()
+        while self._running:
+            self.scheduler.begin()
+            now = time.perf_counter()
+            self.step(now - last)
+            last = now
+            self.scheduler.wait()
@@ -0,0 +1,68 @@
+"""
+Test for the hot-reloaded custom command table
+Edits a temporary custom_commands.json while the watcher runs and checks
+that lookups switch to the new contents, and that a half-written file keeps
+the previous table.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_commands import CustomCommandTable
+
+
+def write(path, data):
+    with open(path, "w") as f:
+        f.write(data if isinstance(data, str) else json.dumps(data))
+    # Make sure the mtime moves even on coarse-grained filesystems
+    stamp = time.time_ns() + 1_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+
+def wait_for(condition, timeout=2.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+print("=" * 60)
+print("CUSTOM COMMAND TABLE TEST")
+print("=" * 60)
+
+path = os.path.join(tempfile.mkdtemp(prefix="custom_commands_"), "custom_commands.json")
+write(path, {"Start Coding": {"type": "run", "linux": "true"}})
+reloads = []
+table = CustomCommandTable(path, interval=0.05, on_reload=lambda t: reloads.append(t.names()))
+table.start()
+
+assert table.lookup("start  coding") == "Start Coding"
+assert table.lookup("open project folder") is None
+assert table.suggest("start codin")[0][1] == "Start Coding"
+print("✓ Initial table: exact and fuzzy lookups")
+
+write(path, {"Start Coding": {"type": "run", "linux": "true"}, "open project folder": {"type": "url", "url": "x"}})
+assert wait_for(lambda: table.lookup("Open Project Folder") == "open project folder")
+print(f"✓ Reloaded after the file changed ({table.reloads} loads)")
+
+write(path, '{"broken": ')
+time.sleep(0.3)
+assert table.lookup("open project folder") == "open project folder"
+print("✓ Unparseable file keeps the previous table")
+
+start = time.perf_counter()
+for _ in range(10000):
+    table.lookup("start coding")
+print(f"✓ Lookup: {(time.perf_counter() - start) * 100:.2f} µs")
+
+table.stop()
+assert len(reloads) == table.reloads
+print("\nAll checks passed")
@@ -0,0 +1,110 @@
+"""
+Test for the custom hand-pose library
+Checks that normalize_pose ignores where the hand is, how big it is and how
+it is turned in the image plane, that a held pose is matched against
+hundreds of templates well inside a 30 fps frame budget, and that recording
+a pose does not wait for the JSON file to be written.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from gesture_library import GestureLibrary, PoseRecorder, normalize_pose, NUM_LANDMARKS
+
+rng = np.random.default_rng(27)
+FRAME_BUDGET_MS = 1000.0 / 30
+
+
+def random_hand():
+    """Plausible (21, 3) landmarks: wrist low, fingers spread upwards."""
+    lms = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+    lms[0] = [0.5, 0.8, 0.0]
+    lms[1:] = lms[0] + rng.uniform([-0.15, -0.35, -0.05], [0.15, -0.02, 0.05], size=(NUM_LANDMARKS - 1, 3))
+    return lms
+
+
+def transform(lms, shift, scale, degrees):
+    """Rotate about the wrist in the image plane, scale, then move."""
+    theta = np.radians(degrees)
+    rot = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]], dtype=np.float32)
+    out = lms - lms[0]
+    out[:, :2] = out[:, :2] @ rot.T
+    return out * scale + lms[0] + np.asarray(shift, dtype=np.float32)
+
+
+print("=" * 60)
+print("GESTURE LIBRARY TEST")
+print("=" * 60)
+
+# Normalization: translation, scale and in-plane rotation give the same vector
+worst = 0.0
+for _ in range(50):
+    hand = random_hand()
+    base = normalize_pose(hand)
+    for shift, scale, degrees in [((0.2, -0.1, 0.0), 1.0, 0), ((0, 0, 0), 0.4, 0), ((0, 0, 0), 1.0, 75),
+                                  ((-0.3, 0.05, 0.02), 1.7, -140)]:
+        worst = max(worst, float(np.abs(normalize_pose(transform(hand, shift, scale, degrees)) - base).max()))
+assert worst < 1e-4, f"normalization not invariant: max difference {worst}"
+stacked = np.stack([random_hand() for _ in range(8)])
+assert np.allclose(normalize_pose(stacked), [normalize_pose(h) for h in stacked], atol=1e-6)
+print(f"✓ Moved, scaled and rotated hands normalize to the same vector (max difference {worst:.1e})")
+
+# Matching against hundreds of templates within the frame budget
+workdir = tempfile.mkdtemp(prefix="gestures_")
+library = GestureLibrary(os.path.join(workdir, "custom_gestures.json"))
+hands = [random_hand() for _ in range(500)]
+for i, hand in enumerate(hands):
+    library.add_template(f"pose{i}", [hand], {"type": "speech", "target": f"command {i}"})
+assert library.flush()
+assert len(library) == 500
+
+correct = 0
+queries = rng.integers(0, len(hands), size=200)
+start = time.perf_counter()
+for i in queries:
+    held = transform(hands[i], rng.uniform(-0.1, 0.1, 3), rng.uniform(0.7, 1.3), rng.uniform(-30, 30))
+    held = held + rng.normal(0, 0.002, held.shape).astype(np.float32)
+    template, _dist = library.match(held)
+    correct += template is not None and template["name"] == f"pose{i}"
+per_frame_ms = (time.perf_counter() - start) / len(queries) * 1000
+assert correct >= len(queries) * 0.95, f"only {correct}/{len(queries)} held poses matched"
+assert per_frame_ms < FRAME_BUDGET_MS * 0.1, f"{per_frame_ms:.2f} ms per frame"
+print(f"✓ {correct}/{len(queries)} held poses matched among {len(library)} templates, "
+      f"{per_frame_ms * 1000:.0f} µs per frame ({FRAME_BUDGET_MS:.1f} ms budget)")
+
+# Recording on the camera thread does not wait for the file
+writes = []
+save = library.save
+
+
+def slow_save():
+    time.sleep(0.3)
+    save()
+    writes.append(time.perf_counter())
+
+
+library.save = slow_save
+recorder = PoseRecorder(library, "thumbs up", {"type": "command", "target": "Start Coding"}, frames=3)
+start = time.perf_counter()
+for _ in range(3):
+    recorder.add(hands[0])
+elapsed_ms = (time.perf_counter() - start) * 1000
+assert recorder.done and elapsed_ms < 100, f"recording blocked for {elapsed_ms:.0f} ms"
+assert library.flush() and writes
+with open(library.path) as f:
+    assert "thumbs up" in [g["name"] for g in json.load(f)["gestures"]]
+print(f"✓ Recording finished in {elapsed_ms:.1f} ms; the JSON was written in the background")
+
+assert library.remove_template("thumbs up") and library.flush()
+with open(library.path) as f:
+    assert "thumbs up" not in [g["name"] for g in json.load(f)["gestures"]]
+print("✓ Removal saved")
+
+print("\nAll gesture library tests passed!")
@@ -0,0 +1,124 @@
+"""
+Two-hand gesture support
+All detected hands are stacked into one (N, 21, 3) array so finger states,
+pinches and custom-pose matching run in a single vectorized pass per frame
+"""
+
+import numpy as np
+
+TIPS = [8, 12, 16, 20]
+PIPS = [6, 10, 14, 18]
+THUMB_TIP, THUMB_IP, INDEX_TIP, MIDDLE_MCP, WRIST = 4, 3, 8, 9, 0
+
+# Column order of finger_states()
+THUMB, INDEX, MIDDLE, RING, PINKY = range(5)
+
+
+def stack_hands(results):
+    """Return (landmarks (N, 21, 3), handedness labels) for a MediaPipe result."""
+    hands = results.multi_hand_landmarks or []
+    if not hands:
+        return np.zeros((0, 21, 3), dtype=np.float32), []
+    stack = np.array([[(lm.x, lm.y, lm.z) for lm in h.landmark] for h in hands], dtype=np.float32)
+    labels = []
+    handedness = getattr(results, "multi_handedness", None) or []
+    for i in range(len(hands)):
+        try:
+            labels.append(handedness[i].classification[0].label)
+        except (IndexError, AttributeError):
+            labels.append("Unknown")
+    return stack, labels
+
+
+def primary_index(labels):
+    """Index of the hand that drives the cursor (right hand when visible)."""
+    return labels.index("Right") if "Right" in labels else 0
+
+
+def finger_states(stack, labels=None):
+    """Extended/folded state of every finger of every hand, shape (N, 5) bool.
+
+    The thumb test mirrors for left hands so both hands use the same rule
+    (on the flipped preview a right thumb extends towards -x).
+    """
+    if stack.shape[0] == 0:
+        return np.zeros((0, 5), dtype=bool)
+    fingers = stack[:, TIPS, 1] < stack[:, PIPS, 1]
+    side = np.array([-1.0 if l == "Left" else 1.0 for l in labels] if labels else np.ones(stack.shape[0]),
+                    dtype=np.float32)
+    thumb = (((stack[:, THUMB_TIP, 0] - stack[:, THUMB_IP, 0]) * side < 0)
+             & (np.abs(stack[:, THUMB_TIP, 0] - stack[:, INDEX_TIP, 0]) > 0.08))
+    return np.column_stack([thumb, fingers])
+
+
+def palm_sizes(stack):
+    return np.maximum(np.linalg.norm(stack[:, MIDDLE_MCP, :2] - stack[:, WRIST, :2], axis=1), 1e-6)
+
+
+def pinch_states(stack, ratio=0.35):
+    """Thumb-index pinch per hand, relative to palm size. Returns (pinched, points)."""
+    gap = np.linalg.norm(stack[:, THUMB_TIP, :2] - stack[:, INDEX_TIP, :2], axis=1)
+    points = (stack[:, THUMB_TIP, :2] + stack[:, INDEX_TIP, :2]) * 0.5
+    return gap < ratio * palm_sizes(stack), points
+
+
+class TwoHandGestures:
+    """Turns consecutive two-hand frames into discrete actions.
+
+    * Pinch-zoom: both hands pinching; moving them apart/together emits
+      ``("zoom", +1)`` / ``("zoom", -1)`` for every ZOOM_STEP of relative change.
+    * Two-hand scroll: both hands showing index+middle; moving them up/down
+      together emits ``("scroll", +1)`` (up) / ``("scroll", -1)`` (down).
+    """
+
+    ZOOM_STEP = 0.15
+    SCROLL_STEP = 0.04
+    SCROLL_INTERVAL = 0.1
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._zoom_base = None
+        self._scroll_anchor = None
+        self._last_scroll = 0.0
+        self.active = None
+
+    def update(self, stack, states, now):
+        """Feed the stacked hands and their finger states. Returns a list of actions."""
+        if stack.shape[0] < 2:
+            self.reset()
+            return []
+        stack, states = stack[:2], states[:2]
+        actions = []
+
+        pinched, points = pinch_states(stack)
+        if pinched.all():
+            self._scroll_anchor = None
+            self.active = "zoom"
+            span = float(np.linalg.norm(points[0] - points[1]))
+            if self._zoom_base is None:
+                self._zoom_base = span
+            elif self._zoom_base > 1e-6:
+                change = span / self._zoom_base - 1.0
+                if abs(change) >= self.ZOOM_STEP:
+                    actions.append(("zoom", 1 if change > 0 else -1))
+                    self._zoom_base = span
+            return actions
+        self._zoom_base = None
+
+        two_finger = states[:, INDEX] & states[:, MIDDLE] & ~states[:, RING] & ~states[:, PINKY]
+        if two_finger.all():
+            self.active = "scroll"
+            y = float(stack[:, [INDEX_TIP, 12], 1].mean())
+            if self._scroll_anchor is None:
+                self._scroll_anchor = y
+            elif now - self._last_scroll >= self.SCROLL_INTERVAL:
+                dy = y - self._scroll_anchor
+                if abs(dy) >= self.SCROLL_STEP:
+                    actions.append(("scroll", -1 if dy > 0 else 1))
+                    self._last_scroll = now
+            return actions
+        self._scroll_anchor = None
+        self.active = None
+        return actions
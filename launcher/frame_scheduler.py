@@ -0,0 +1,79 @@
+"""
+Deadline-based frame pacing shared by the capture loops
+(gesture control, emotion detection, embedded virtual mouse)
+"""
+
+import time
+
+
+class FrameScheduler:
+    """Keep a loop on a fixed frame period instead of sleeping a constant amount.
+
+    Call ``wait()`` once at the end of every iteration. It sleeps only for
+    whatever is left of the current frame budget. When an iteration overran
+    its budget the missed frame slots are skipped (the deadline is realigned
+    to the next slot) rather than bursting to catch up.
+    """
+
+    def __init__(self, fps=30.0):
+        self.set_fps(fps)
+        self.reset()
+
+    def set_fps(self, fps):
+        fps = float(fps) if fps else 30.0
+        self.fps = max(1.0, fps)
+        self.period = 1.0 / self.fps
+
+    def reset(self):
+        self._deadline = None
+        self._started = None
+        self.frames = 0
+        self.overruns = 0
+        self.skipped = 0
+        self._busy_total = 0.0
+        self._frame_start = None
+
+    def begin(self):
+        """Mark the start of a frame (optional, used for busy-time stats)."""
+        self._frame_start = time.perf_counter()
+
+    def wait(self):
+        """Sleep until the next frame deadline. Returns the number of skipped slots."""
+        now = time.perf_counter()
+        if self._deadline is None:
+            self._started = now
+            self._deadline = now
+        if self._frame_start is not None:
+            self._busy_total += now - self._frame_start
+            self._frame_start = None
+
+        self.frames += 1
+        self._deadline += self.period
+        remaining = self._deadline - now
+        if remaining > 0:
+            time.sleep(remaining)
+            return 0
+
+        # Behind schedule: count the overrun and drop the slots we missed
+        self.overruns += 1
+        missed = int(-remaining // self.period)
+        self.skipped += missed
+        self._deadline += missed * self.period
+        return missed
+
+    def stats(self):
+        elapsed = (time.perf_counter() - self._started) if self._started else 0.0
+        return {
+            "target_fps": self.fps,
+            "actual_fps": (self.frames / elapsed) if elapsed > 0 else 0.0,
+            "frames": self.frames,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "avg_busy_ms": (self._busy_total / self.frames * 1000.0) if self.frames else 0.0,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"{s['actual_fps']:.1f}/{s['target_fps']:.0f} fps, "
+                f"{s['overruns']} overruns, {s['skipped']} skipped frames, "
+                f"busy {s['avg_busy_ms']:.1f} ms/frame")
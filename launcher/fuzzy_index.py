@@ -0,0 +1,126 @@
+"""
+Fuzzy phrase lookup
+Character-trigram inverted index with edit-distance re-ranking, used to
+suggest the closest known command for misheard speech.
+"""
+
+import threading
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def levenshtein(a, b, limit=None):
+    """Edit distance between ``a`` and ``b`` (bit-parallel, Myers/Hyyrö).
+
+    With ``limit``, returns ``limit + 1`` as soon as the lengths alone show
+    the distance is larger.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    if not b:
+        return len(a)
+    # Bit i of peq[c] is set where a[i] == c; columns of the DP table are bit vectors
+    peq = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    ones = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    pv, mv, distance = ones, 0, len(a)
+    for c in b:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & ones)
+        mh = pv & xh
+        if ph & last:
+            distance += 1
+        elif mh & last:
+            distance -= 1
+        ph = ((ph << 1) | 1) & ones
+        mh = (mh << 1) & ones
+        pv = mh | (~(xv | ph) & ones)
+        mv = ph & xv
+    return distance
+
+
+class FuzzyIndex:
+    """Phrases indexed by character trigrams.
+
+    ``search`` ranks the phrases sharing the most trigrams with the query by
+    Dice coefficient, re-scores the best ``shortlist`` of them with edit
+    distance and returns the top ``k`` as (score, phrase, payload), scores in
+    0..1. Adding a phrase twice keeps the first payload.
+    """
+
+    def __init__(self, shortlist=16):
+        self.shortlist = shortlist
+        self.phrases = []  # (phrase, payload, gram count)
+        self._ids = {}
+        self._grams = {}  # trigram -> phrase ids
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def add(self, phrase, payload=None):
+        phrase = " ".join(phrase.lower().split())
+        if not phrase:
+            return False
+        with self._lock:
+            if phrase in self._ids:
+                return False
+            grams = trigrams(phrase)
+            pid = len(self.phrases)
+            self._ids[phrase] = pid
+            self.phrases.append((phrase, payload, len(grams)))
+            for g in grams:
+                self._grams.setdefault(g, []).append(pid)
+        return True
+
+    def search(self, query, k=3, min_score=0.5, accept=None):
+        """Closest phrases to ``query``; ``accept(payload)`` can restrict the candidates."""
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+        grams = trigrams(query)
+        shared = {}
+        with self._lock:
+            for g in grams:
+                for pid in self._grams.get(g, ()):
+                    shared[pid] = shared.get(pid, 0) + 1
+            phrases = self.phrases
+        ranked = sorted(((2.0 * n / (len(grams) + phrases[pid][2]), pid) for pid, n in shared.items()),
+                        reverse=True)
+        results = []
+        considered = 0
+        floor = min_score  # score a candidate must beat to enter the top k
+        for dice, pid in ranked:
+            # Candidates come in falling Dice order; even an exact spelling cannot beat the floor now
+            if considered >= self.shortlist or 0.5 * (1.0 + dice) < floor:
+                break
+            phrase, payload, _count = phrases[pid]
+            if accept is not None and not accept(payload):
+                continue
+            considered += 1
+            # score = mean of edit similarity and Dice, so only this much editing can still pass
+            longest = max(len(phrase), len(query))
+            limit = int(longest * (1.0 - (2.0 * floor - dice)))
+            if limit < 0:
+                continue
+            distance = levenshtein(query, phrase, limit)
+            if distance > limit:
+                continue
+            score = 0.5 * (1.0 - distance / float(longest) + dice)
+            if score >= floor:
+                results.append((score, phrase, payload))
+                if len(results) >= k:
+                    results.sort(key=lambda r: -r[0])
+                    del results[k:]
+                    floor = max(floor, results[-1][0])
+        results.sort(key=lambda r: -r[0])
+        return results[:k]
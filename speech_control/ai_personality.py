@@ -29,7 +29,10 @@ class AIPersonality:
         
     def get_greeting_response(self, greeting_type):
         """Return natural greeting responses"""
-        time_hour = datetime.now().hour
+        options, emotion = self._greeting_options(greeting_type, datetime.now().hour)
+        return random.choice(options), emotion
+
+    def _greeting_options(self, greeting_type, time_hour):
         
         if greeting_type == "hello":
             if 5 <= time_hour < 12:
@@ -50,7 +53,7 @@ class AIPersonality:
                     f"Hello {self.user_name}! How can I help?",
                     f"Hey there! What would you like me to do?"
                 ]
-            return random.choice(greetings), "friendly"
+            return greetings, "friendly"
             
         elif greeting_type == "how_are_you":
             responses = [
@@ -59,7 +62,7 @@ class AIPersonality:
                 "I'm excellent! Ready to help with anything you need.",
                 "I'm wonderful, thank you! How can I help you today?"
             ]
-            return random.choice(responses), "friendly"
+            return responses, "friendly"
             
         elif greeting_type == "my_name":
             responses = [
@@ -67,7 +70,7 @@ class AIPersonality:
                 "You can call me Nova! I'm your friendly AI assistant ready to help.",
                 "I'm Nova, your voice-controlled personal assistant!"
             ]
-            return random.choice(responses), "friendly"
+            return responses, "friendly"
             
         elif greeting_type == "thanks":
             responses = [
@@ -77,7 +80,7 @@ class AIPersonality:
                 "Glad I could help! What else can I do for you?",
                 "You're welcome! Feel free to ask me anything."
             ]
-            return random.choice(responses), "friendly"
+            return responses, "friendly"
             
         elif greeting_type == "goodbye":
             responses = [
@@ -86,7 +89,7 @@ class AIPersonality:
                 "Bye! Let me know when you need me again.",
                 "Farewell! I'll be here whenever you need me."
             ]
-            return random.choice(responses), "calm"
+            return responses, "calm"
             
         elif greeting_type == "help":
             response = ("I can help you with many things! Try saying:\n"
@@ -97,7 +100,7 @@ class AIPersonality:
                        "- Open files and folders\n"
                        "- Enable virtual mouse with hand gestures\n"
                        "Just speak naturally and I'll understand!")
-            return response, "friendly"
+            return [response], "friendly"
             
         elif greeting_type == "creator":
             responses = [
@@ -105,7 +108,7 @@ class AIPersonality:
                 "I'm your personal AI assistant, built to help you control your system with voice commands!",
                 "I was designed to be a friendly voice assistant that makes using your computer more natural!"
             ]
-            return random.choice(responses), "friendly"
+            return responses, "friendly"
             
         elif greeting_type == "joke":
             jokes = [
@@ -115,13 +118,16 @@ class AIPersonality:
                 "Why did the developer go broke? Because he used up all his cache!",
                 "What's a computer's favorite snack? Microchips!"
             ]
-            return random.choice(jokes), "excited"
+            return jokes, "excited"
             
-        return "Hello! How can I help you?", "friendly"
+        return ["Hello! How can I help you?"], "friendly"
     
     def get_action_response(self, action_type, action_data="", success=True):
         """Generate contextual responses for different actions"""
-        
+        options, emotion = self._action_options(action_type, action_data, success)
+        return random.choice(options), emotion
+
+    def _action_options(self, action_type, action_data="", success=True):
         if not success:
             error_responses = [
                 "Sorry, I couldn't complete that. Could you try again?",
@@ -130,9 +136,25 @@ class AIPersonality:
                 "Oops, something went wrong. I'm here if you want to try again.",
                 "I couldn't do that right now. Is there something else I can help with?"
             ]
-            return random.choice(error_responses), "calm"
-        
-        responses_map = {
+            return error_responses, "calm"
+
+        response_data = self._action_responses(action_data).get(action_type)
+        if response_data is not None:
+            return response_data["texts"], response_data["emotion"]
+
+        # Default friendly response
+        defaults = [
+            "Done! Anything else I can help with?",
+            "All set! Let me know if you need anything else.",
+            "Completed! What would you like to do next?",
+            "Got it done! How else can I assist you?",
+            "Task completed! I'm here if you need more help."
+        ]
+        return defaults, "friendly"
+
+    def _action_responses(self, action_data=""):
+        """Action type -> {"texts": [...], "emotion": ...} with ``action_data`` filled in"""
+        return {
             "application": {
                 "texts": [
                     f"Opening {action_data} for you now.",
@@ -484,20 +506,6 @@ class AIPersonality:
                 "emotion": "neutral"
             }
         }
-        
-        if action_type in responses_map:
-            response_data = responses_map[action_type]
-            return random.choice(response_data["texts"]), response_data["emotion"]
-        
-        # Default friendly response
-        defaults = [
-            "Done! Anything else I can help with?",
-            "All set! Let me know if you need anything else.",
-            "Completed! What would you like to do next?",
-            "Got it done! How else can I assist you?",
-            "Task completed! I'm here if you need more help."
-        ]
-        return random.choice(defaults), "friendly"
     
     def get_unknown_command_response(self):
         """Response when command is not understood"""
@@ -521,3 +529,28 @@ class AIPersonality:
             "At your service! What do you need?"
         ]
         return random.choice(responses), "excited"
+
+    def static_responses(self):
+        """Every (text, emotion) reply that contains no runtime data.
+
+        Used to pre-render the TTS cache; replies that embed an app name,
+        time or search term are left to live synthesis.
+        """
+        marker = "\x00"
+        seen = set()
+        out = []
+
+        def add(options, emotion):
+            for text in options:
+                if marker not in text and (text, emotion) not in seen:
+                    seen.add((text, emotion))
+                    out.append((text, emotion))
+
+        for greeting_type in ("hello", "how_are_you", "my_name", "thanks", "goodbye", "creator", "joke"):
+            for hour in (8, 14, 20):
+                add(*self._greeting_options(greeting_type, hour))
+        for response_data in self._action_responses(marker).values():
+            add(response_data["texts"], response_data["emotion"])
+        add(*self._action_options("unknown", marker))  # the default replies
+        add(*self._action_options("", marker, success=False))
+        return out
@@ -0,0 +1,473 @@
+"""
+Always-open microphone capture
+One long-lived input stream writes into a ring buffer; a segmenter thread
+runs a frame-level energy VAD over it and queues complete utterances for the
+wake-word and command stages, so nothing said between listens is lost.
+Utterances heard while the assistant itself is talking are not queued
+unless the user barged in.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from noise_floor import NoiseFloorEstimator
+
+
+class RingBuffer:
+    """Single-producer / single-consumer sample ring buffer.
+
+    The producer only advances ``_write`` and the consumer only advances
+    ``_read`` (both monotonic sample counts), so no lock is needed. If the
+    consumer falls more than ``capacity`` behind, the oldest audio is
+    skipped and counted in ``overruns``.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=dtype)
+        self._write = 0
+        self._read = 0
+        self.overruns = 0
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=self._buf.dtype)
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self._write += n - self.capacity
+            n = self.capacity
+        start = self._write % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = samples[:first]
+        if first < n:
+            self._buf[:n - first] = samples[first:]
+        self._write += n  # publish only after the copy
+
+    def available(self):
+        return self._write - self._read
+
+    def read(self, n):
+        """Copy out up to ``n`` of the oldest unread samples."""
+        write = self._write
+        if write - self._read > self.capacity:
+            self.overruns += write - self._read - self.capacity
+            self._read = write - self.capacity
+        n = min(n, write - self._read)
+        if n <= 0:
+            return self._buf[:0].copy()
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out = np.concatenate([self._buf[start:start + first], self._buf[:n - first]])
+        if self._write - self._read > self.capacity:
+            # Producer lapped us while copying: the data is torn, drop it
+            self.overruns += n
+            self._read = self._write - self.capacity
+            return self._buf[:0].copy()
+        self._read += n
+        return out
+
+
+class Segment:
+    """One detected utterance as raw little-endian PCM."""
+
+    def __init__(self, pcm, sample_rate, sample_width, started, ended, voice_ended=None, endpoint="base",
+                 echo_frames=0):
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.started = started  # perf_counter() of the first voiced frame
+        self.ended = ended      # perf_counter() when the segment was closed
+        # perf_counter() of the last voiced frame; ended - voice_ended is the endpointing delay
+        self.voice_ended = ended if voice_ended is None else voice_ended
+        self.endpoint = endpoint  # which pause rule closed it: "short", "base", "long" or "max"
+        self.echo_frames = echo_frames  # voiced frames captured while our own speech was playing
+
+    @property
+    def duration(self):
+        return len(self.pcm) / float(self.sample_rate * self.sample_width)
+
+
+def frame_energy(frame):
+    return float(np.sqrt(np.mean(frame.astype(np.float64) ** 2))) if len(frame) else 0.0
+
+
+class EnergyVAD:
+    """Frame-level voice activity from RMS energy against the noise floor."""
+
+    def __init__(self, noise_floor=None):
+        self.noise_floor = noise_floor or NoiseFloorEstimator()
+
+    def is_speech(self, frame, frame_seconds, energy=None):
+        if energy is None:
+            energy = frame_energy(frame)
+        # The estimator decides background vs speech and adapts on background frames
+        return not self.noise_floor.update(energy, frame_seconds)
+
+
+class BargeInDetector:
+    """Detects the user starting to talk while the assistant is speaking.
+
+    The microphone also hears our own voice, so during playback the echo
+    level is tracked as a slow-rising, fast-adapting average of frame energy
+    and a barge-in needs ``onset_frames`` consecutive frames louder than
+    ``echo_ratio`` times that level (and above the noise threshold). The
+    first ``warmup`` seconds of each playback only train the echo level.
+    """
+
+    def __init__(self, noise_floor, is_playing, on_barge_in, echo_ratio=2.0,
+                 onset_frames=2, warmup=0.25, rise=0.05, fall=0.3):
+        self.noise_floor = noise_floor
+        self.is_playing = is_playing
+        self.on_barge_in = on_barge_in
+        self.echo_ratio = echo_ratio
+        self.onset_frames = onset_frames
+        self.warmup = warmup
+        self.rise = rise
+        self.fall = fall
+        self.enabled = True
+        self.triggered = 0
+        self.echo_level = 0.0
+        self._playback_started = None
+        self._run = 0
+        self._fired = False
+
+    def push(self, energy, now):
+        """Feed one frame's RMS energy. Returns True when a barge-in fired."""
+        if not (self.enabled and self.is_playing()):
+            self._playback_started = None
+            return False
+        if self._playback_started is None:
+            self._playback_started = now
+            self.echo_level = energy
+            self._run = 0
+            self._fired = False
+
+        loud = (energy > self.echo_ratio * self.echo_level
+                and energy > self.noise_floor.threshold())
+        if now - self._playback_started < self.warmup or not loud:
+            # Echo (or silence): adapt quickly downwards, slowly upwards
+            alpha = self.rise if energy > self.echo_level else self.fall
+            self.echo_level += alpha * (energy - self.echo_level)
+            self._run = 0
+            return False
+
+        self._run += 1
+        if self._run >= self.onset_frames and not self._fired:
+            self._fired = True
+            self.triggered += 1
+            self.on_barge_in()
+            return True
+        return False
+
+
+class UtteranceSegmenter:
+    """Turns a stream of VAD decisions into utterances.
+
+    Speech starts after ``start_frames`` consecutive voiced frames (the
+    ``preroll`` before it is kept so word onsets are not clipped) and ends
+    after ``pause`` seconds of silence or ``max_length`` seconds in total.
+    With an ``endpointer`` the pause is chosen per utterance instead.
+    Frames pushed with ``echo=True`` (captured during playback) are counted
+    in ``last_echo_frames`` of the utterance they end up in.
+    """
+
+    def __init__(self, sample_rate, frame_ms=30, preroll=0.3, start_frames=3,
+                 pause=0.8, min_length=0.3, max_length=6.0, endpointer=None):
+        self.sample_rate = sample_rate
+        self.frame_len = max(1, int(sample_rate * frame_ms / 1000))
+        self.frame_seconds = self.frame_len / float(sample_rate)
+        self.start_frames = start_frames
+        self.pause_frames = max(1, int(pause / self.frame_seconds))
+        self.min_frames = max(1, int(min_length / self.frame_seconds))
+        self.max_frames = max(1, int(max_length / self.frame_seconds))
+        self._preroll = deque(maxlen=max(start_frames, int(preroll / self.frame_seconds)))
+        self._frames = []
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._started = None
+        self.trailing_silence = 0.0  # seconds of silence that closed the last utterance
+        self.endpointer = endpointer
+        self.last_endpoint = "base"
+        self._voiced_frames = 0
+        self._echo_run = 0
+        self._echo_frames = 0
+        self.last_echo_frames = 0
+        self.in_speech = False
+
+    def push(self, frame, voiced, now, echo=False):
+        """Feed one frame. Returns a list of frames for a finished utterance, or None."""
+        if not self.in_speech:
+            self._preroll.append(frame)
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            self._echo_run = self._echo_run + 1 if voiced and echo else 0
+            if self._voiced_run >= self.start_frames:
+                self.in_speech = True
+                self._frames = list(self._preroll)
+                self._preroll.clear()
+                self._silent_run = 0
+                self._voiced_frames = self.start_frames
+                self._echo_frames = self._echo_run
+                self._started = now - self.start_frames * self.frame_seconds
+            return None
+
+        self._frames.append(frame)
+        if voiced:
+            if self._silent_run and self.endpointer is not None:
+                self.endpointer.observe_gap(self._silent_run * self.frame_seconds)
+            self._silent_run = 0
+            self._voiced_frames += 1
+            if echo:
+                self._echo_frames += 1
+        else:
+            self._silent_run += 1
+        pause_frames, kind = self._pause_frames()
+        if self._silent_run >= pause_frames or len(self._frames) >= self.max_frames:
+            frames = self._frames[:len(self._frames) - self._silent_run] or self._frames
+            self.trailing_silence = self._silent_run * self.frame_seconds
+            self.last_endpoint = kind if self._silent_run >= pause_frames else "max"
+            self.last_echo_frames = self._echo_frames
+            if self.endpointer is not None:
+                self.endpointer.record(self.last_endpoint)
+            self._reset()
+            if len(frames) >= self.min_frames:
+                return frames
+        return None
+
+    def set_max_length(self, seconds):
+        self.max_frames = max(1, int(seconds / self.frame_seconds))
+
+    def _pause_frames(self):
+        if self.endpointer is None:
+            return self.pause_frames, "base"
+        pause, kind = self.endpointer.pause_for(self._voiced_frames * self.frame_seconds)
+        return max(1, int(round(pause / self.frame_seconds))), kind
+
+    def _reset(self):
+        self.in_speech = False
+        self._frames = []
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._voiced_frames = 0
+        self._echo_run = 0
+        self._echo_frames = 0
+
+    @property
+    def started(self):
+        return self._started
+
+
+class AudioStream:
+    """Keeps one microphone stream open and publishes utterance segments.
+
+    ``microphone`` is a speech_recognition ``Microphone``; it is entered once
+    in ``start()`` and exited in ``stop()``.
+
+    ``is_playing`` tells whether our own speech is coming out of the
+    speakers. Frames captured then, or up to ``echo_tail`` seconds later
+    (room echo, output latency), are tagged as echo, and an utterance with
+    any voiced echo frame is dropped unless a barge-in fired while it was
+    being spoken, so the assistant never hears its own replies as commands.
+    """
+
+    def __init__(self, microphone, noise_floor=None, buffer_seconds=10.0,
+                 pause=0.8, max_length=6.0, max_segments=8, max_age=8.0, endpointer=None,
+                 is_playing=None, echo_tail=0.3):
+        self.microphone = microphone
+        self.endpointer = endpointer
+        self.vad = EnergyVAD(noise_floor)
+        self.buffer_seconds = buffer_seconds
+        self.pause = pause
+        self.max_length = max_length
+        self.max_age = max_age
+        self.segments = queue.Queue(maxsize=max_segments)
+        self._unread = None  # segment handed back with unread(), returned next
+        self.barge_in = None  # optional BargeInDetector fed with every frame
+        self.is_playing = is_playing
+        self.echo_tail = echo_tail
+        self.echo_dropped = 0
+        self._played_at = None   # perf_counter() of the last frame captured during playback
+        self._barge_in_at = None
+        self.dropped_segments = 0
+        self.ring = None
+        self.segmenter = None
+        self.sample_rate = None
+        self.sample_width = None
+        self._source = None
+        self._running = False
+        self._data_ready = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._running:
+            return
+        self._source = self.microphone.__enter__()
+        self.sample_rate = self._source.SAMPLE_RATE
+        self.sample_width = self._source.SAMPLE_WIDTH
+        self.ring = RingBuffer(int(self.sample_rate * self.buffer_seconds))
+        self.segmenter = UtteranceSegmenter(self.sample_rate, pause=self.pause, max_length=self.max_length,
+                                            endpointer=self.endpointer)
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._capture_loop, daemon=True),
+            threading.Thread(target=self._segment_loop, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self._running = False
+        self._data_ready.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self._threads = []
+        try:
+            if self._source is not None:
+                self.microphone.__exit__(None, None, None)
+        except Exception:
+            pass
+        self._source = None
+
+    def is_running(self):
+        return self._running
+
+    def _capture_loop(self):
+        chunk = self._source.CHUNK
+        while self._running:
+            try:
+                data = self._source.stream.read(chunk)
+            except Exception as e:
+                print(f"Audio capture error: {e}")
+                time.sleep(0.05)
+                continue
+            self.ring.write(np.frombuffer(data, dtype=np.int16))
+            self._data_ready.set()
+
+    def _segment_loop(self):
+        seg = self.segmenter
+        pending = np.zeros(0, dtype=np.int16)
+        while self._running:
+            self._data_ready.wait(timeout=0.1)
+            self._data_ready.clear()
+            data = self.ring.read(self.ring.available())
+            if len(data) == 0:
+                continue
+            pending = np.concatenate([pending, data]) if len(pending) else data
+            now = time.perf_counter()
+            offset = 0
+            while len(pending) - offset >= seg.frame_len:
+                frame = pending[offset:offset + seg.frame_len]
+                offset += seg.frame_len
+                energy = frame_energy(frame)
+                if self.barge_in is not None and self.barge_in.push(energy, now):
+                    self._barge_in_at = now
+                voiced = self.vad.is_speech(frame, seg.frame_seconds, energy)
+                started = seg.started
+                frames = seg.push(frame, voiced, now, self._is_echo(now))
+                if frames is not None:
+                    segment = Segment(np.concatenate(frames).tobytes(), self.sample_rate,
+                                      self.sample_width, started, now, now - seg.trailing_silence,
+                                      seg.last_endpoint, seg.last_echo_frames)
+                    if self._own_voice(segment):
+                        self.echo_dropped += 1
+                    else:
+                        self._publish(segment)
+            pending = pending[offset:]
+
+    def _is_echo(self, now):
+        if self.is_playing is None:
+            return False
+        if self.is_playing():
+            self._played_at = now
+        return self._played_at is not None and now - self._played_at <= self.echo_tail
+
+    def _own_voice(self, segment):
+        """Whether ``segment`` overlaps our playback without the user barging in."""
+        if not segment.echo_frames:
+            return False
+        started = segment.started if segment.started is not None else segment.ended
+        # A barge-in fires a couple of frames into the user's speech, around when the segment starts
+        return self._barge_in_at is None or self._barge_in_at < started - self.segmenter.frame_seconds * 4
+
+    def _publish(self, segment):
+        try:
+            self.segments.put_nowait(segment)
+        except queue.Full:
+            # Keep the newest speech: drop the oldest queued utterance
+            try:
+                self.segments.get_nowait()
+                self.dropped_segments += 1
+            except queue.Empty:
+                pass
+            self.segments.put_nowait(segment)
+
+    def next_segment(self, timeout=None, max_length=None):
+        """Oldest queued utterance that is still fresh, or None on timeout.
+
+        ``max_length`` (seconds) caps the utterance like sr's
+        ``phrase_time_limit``: speech still being captured is cut there, and
+        a longer utterance already queued is trimmed to it.
+        """
+        if self.segmenter is not None:
+            self.segmenter.set_max_length(max_length or self.max_length)
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            segment, self._unread = self._unread, None
+            if segment is None:
+                remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                try:
+                    segment = self.segments.get(timeout=remaining)
+                except queue.Empty:
+                    return None
+            if time.perf_counter() - segment.ended <= self.max_age:
+                if max_length:
+                    limit = int(max_length * segment.sample_rate) * segment.sample_width
+                    segment.pcm = segment.pcm[:limit]
+                return segment
+            self.dropped_segments += 1
+
+    def unread(self, segment):
+        """Return a segment from next_segment() unused; the next call gets it first."""
+        self._unread = segment
+
+    @property
+    def speaking(self):
+        """True while the VAD is inside an utterance."""
+        return bool(self.segmenter and self.segmenter.in_speech)
+
+
+def segment_samples(samples, sample_rate, sample_width=2, noise_floor=None, pause=0.8, max_length=6.0,
+                    endpointer=None):
+    """Run the same VAD + segmenter over a whole recording (offline replay).
+
+    Returns the Segments found; their timestamps are seconds from the start
+    of the recording. An utterance still open at the end is closed as if
+    silence followed.
+    """
+    samples = np.asarray(samples, dtype=np.int16)
+    vad = EnergyVAD(noise_floor)
+    seg = UtteranceSegmenter(sample_rate, pause=pause, max_length=max_length, endpointer=endpointer)
+    segments = []
+
+    def push(frame, voiced, now):
+        started = seg.started
+        frames = seg.push(frame, voiced, now)
+        if frames is not None:
+            segments.append(Segment(np.concatenate(frames).tobytes(), sample_rate, sample_width,
+                                    started, now, now - seg.trailing_silence, seg.last_endpoint))
+
+    now = 0.0
+    for i in range(len(samples) // seg.frame_len):
+        frame = samples[i * seg.frame_len:(i + 1) * seg.frame_len]
+        now = (i + 1) * seg.frame_seconds
+        push(frame, vad.is_speech(frame, seg.frame_seconds), now)
+    silence = np.zeros(seg.frame_len, dtype=np.int16)
+    while seg.in_speech:
+        now += seg.frame_seconds
+        push(silence, False, now)
+    return segments
@@ -0,0 +1,142 @@
+"""
+Pipelined voice command handling
+capture -> recognition -> intent parsing -> execution, each on its own
+worker thread with bounded queues in between, so the next utterance is
+captured and recognised while the previous command is still executing.
+"""
+
+import queue
+import threading
+import time
+
+
+class CommandPipeline:
+    """Four-stage producer/consumer pipeline.
+
+    * ``capture()`` returns the next utterance (or None on timeout), either
+      as raw audio or as an item dict with an ``"audio"`` key
+    * ``recognize(item)``, ``parse(item)`` and ``execute(item)`` each take
+      the previous stage's output; returning None drops the item there
+
+    Items are dicts that every stage may extend; ``captured_at`` is set when
+    the utterance enters the pipeline. One worker per stage keeps commands
+    in the order they were spoken. A full queue blocks the stage before it
+    (back-pressure) instead of growing without bound.
+    """
+
+    STAGES = ("capture", "recognize", "parse", "execute")
+
+    def __init__(self, capture, recognize, parse, execute, maxsize=4, on_error=None):
+        self._fns = {"recognize": recognize, "parse": parse, "execute": execute}
+        self._capture = capture
+        self.queues = {
+            "recognize": queue.Queue(maxsize=maxsize),
+            "parse": queue.Queue(maxsize=maxsize),
+            "execute": queue.Queue(maxsize=maxsize),
+        }
+        self.on_error = on_error or (lambda stage, e: print(f"Pipeline {stage} error: {e}"))
+        self._held = {name: None for name in self.queues}  # items put back by take()
+        self.processed = {name: 0 for name in self.STAGES}
+        self.max_depth = {name: 0 for name in self.queues}
+        self._running = False
+        self._threads = []
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._threads = [threading.Thread(target=self._capture_loop, daemon=True)]
+        nexts = {"recognize": "parse", "parse": "execute", "execute": None}
+        for stage, nxt in nexts.items():
+            self._threads.append(threading.Thread(target=self._stage_loop, args=(stage, nxt), daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join(timeout=timeout)
+        self._threads = []
+        self._held = {name: None for name in self.queues}
+        for q in self.queues.values():
+            while True:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    break
+
+    def is_running(self):
+        return self._running
+
+    def submit(self, stage, item):
+        """Inject an item before ``stage`` (e.g. typed text straight into "parse")."""
+        return self._put(stage, item)
+
+    def take(self, stage, timeout=None):
+        """Pull the next item waiting for ``stage`` from inside that stage's
+        function (e.g. to merge a continuation); None if none arrives in time."""
+        held = self._held[stage]
+        if held is not None:
+            self._held[stage] = None
+            return held
+        try:
+            return self.queues[stage].get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def putback(self, stage, item):
+        """Return an item obtained with take(); it is processed next."""
+        self._held[stage] = item
+
+    def _put(self, stage, item):
+        q = self.queues[stage]
+        while self._running:
+            try:
+                q.put(item, timeout=0.1)
+                self.max_depth[stage] = max(self.max_depth[stage], q.qsize())
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _capture_loop(self):
+        while self._running:
+            try:
+                audio = self._capture()
+            except Exception as e:
+                self.on_error("capture", e)
+                time.sleep(0.5)
+                continue
+            if audio is None:
+                continue
+            self.processed["capture"] += 1
+            item = audio if isinstance(audio, dict) else {"audio": audio}
+            item.setdefault("captured_at", time.perf_counter())
+            self._put("recognize", item)
+
+    def _stage_loop(self, stage, nxt):
+        fn = self._fns[stage]
+        q = self.queues[stage]
+        while self._running:
+            item = self._held[stage]
+            if item is not None:
+                self._held[stage] = None
+            else:
+                try:
+                    item = q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            try:
+                out = fn(item)
+            except Exception as e:
+                self.on_error(stage, e)
+                continue
+            self.processed[stage] += 1
+            if out is not None and nxt is not None:
+                self._put(nxt, out)
+
+    def summary(self):
+        counts = ", ".join(f"{k} {v}" for k, v in self.processed.items())
+        depth = ", ".join(f"{k} {v}" for k, v in self.max_depth.items())
+        return f"processed: {counts}; max queue depth: {depth}"
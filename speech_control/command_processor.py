@@ -0,0 +1,1080 @@
+"""
+Voice command parsing
+Turns recognized text into {"action", "parameters", "confidence"} dicts with
+ordered regex patterns; no GUI or system dependencies, so it can be used by
+the app and by offline tools alike.
+
+The ordered patterns are compiled once and indexed by the literal words they
+require, so each utterance only runs the patterns whose keywords occur in it;
+the first pattern that matches still wins exactly as with a loop of
+re.search calls. Utterances joining several commands ("open chrome and
+search for ...") are split into a plan of steps for run_plan.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from launcher.fuzzy_index import FuzzyIndex
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+WORD_RUN = re.compile(r"\w+")
+
+# Command type -> parameter filled from the first group of a user command pattern
+USER_ARGUMENT_KEYS = {
+    "application": "app",
+    "web": "query",
+    "file": "filename",
+    "typing": "text",
+    "selection": "text",
+    "utility": "value",
+}
+
+# Joins several commands in one utterance: "open chrome and then search ..."
+CLAUSE_BREAK = re.compile(r"((?:\s*(?:,|;|\band\b|\bthen\b|\balso\b|\bafter that\b)\s*)+)")
+
+# Commands that leave the keyboard, mouse and foreground window alone
+BACKGROUND_ACTIONS = {"conversation", "network", "gesture"}
+BACKGROUND_SYSTEM_ACTIONS = {"volume", "brightness", "mutecontrol", "telltime", "telldate",
+                             "checkinternet", "emptyrecycle"}
+
+# Seconds the window a step brings up needs before the next step types into it
+SETTLE_SECONDS = {"application": 2.0, "web": 1.5, "file": 0.5, "window": 0.3}
+
+
+def _requirement(parsed):
+    """Keys of which at least one occurs in every match of ``parsed``, or None."""
+    best = None
+    run = []
+
+    def consider(keys):
+        nonlocal best
+        if keys and (best is None or (len(keys), -min(map(len, keys))) < (len(best), -min(map(len, best)))):
+            best = keys
+
+    def flush():
+        fragments = WORD_RUN.findall("".join(run))
+        if fragments:
+            consider((max(fragments, key=len),))
+        run.clear()
+
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        flush()
+        if op is sre_parse.SUBPATTERN:
+            # (?i:...) matches other casings of its literals: no key from it
+            if not av[1] & re.IGNORECASE:
+                consider(_requirement(av[-1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            consider(_requirement(av[2]))
+        elif op is sre_parse.BRANCH:
+            alternatives = [_requirement(alt) for alt in av[1]]
+            if all(alternatives):
+                consider(tuple(sorted({k for alt in alternatives for k in alt})))
+    flush()
+    return best
+
+
+def required_keys(pattern):
+    """Word fragments of which every match of ``pattern`` contains at least one.
+
+    Returns None when there is no such literal (or the pattern is
+    case-insensitive), meaning the pattern has to be tried on every text.
+    Literals inside a local ``(?i:...)`` group are never used as keys.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    return _requirement(parsed)
+
+
+def _expand(parsed, limit):
+    """(text, open) spellings of ``parsed``; ``open`` means free text follows."""
+    outs = [("", False)]
+    for op, av in parsed:
+        if all(is_open for _text, is_open in outs):
+            break
+        if op is sre_parse.LITERAL:
+            options = [(chr(av), False)]
+        elif op is sre_parse.SUBPATTERN:
+            options = _expand(av[-1], limit)
+        elif op is sre_parse.BRANCH:
+            options = [option for alt in av[1] for option in _expand(alt, limit)]
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            low, high, sub = av
+            inner = _expand(sub, limit)
+            if low == 0:
+                options = [("", False)] + inner if high == 1 else [("", False)]
+            else:
+                options = inner if high == 1 else [(text, True) for text, _open in inner]
+        elif op is sre_parse.AT:
+            options = [("", False)]
+        elif op is sre_parse.IN and all(item_op is sre_parse.LITERAL for item_op, _ in av):
+            options = [(chr(av[0][1]), False)]
+        else:
+            options = [("", True)]  # any character, a class, ... : free text
+        outs = [(text, is_open) if is_open else (text + more, more_open)
+                for text, is_open in outs
+                for more, more_open in ([("", True)] if is_open else options)][:limit]
+    return outs
+
+
+def example_phrases(pattern, limit=48):
+    """Spoken forms of a command pattern as (phrase, takes_argument) pairs.
+
+    Alternatives and optional parts are spelled out; a phrase stops where
+    free text (``(.+)``, ``\\w+`` ...) would follow, e.g. "search for".
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return []
+    phrases = {}
+    for text, is_open in _expand(parsed, limit):
+        text = " ".join(text.split())
+        if text:
+            phrases[text] = phrases.get(text, False) or is_open
+    return list(phrases.items())
+
+
+class EnhancedCommandProcessor:
+    def __init__(self):
+        self._entries = []  # (category, action, compiled pattern) in match order
+        self._index = {}  # required keyword -> indices into _entries
+        self._unindexed = []
+        self._key_lengths = []
+        self.suggestions = FuzzyIndex()  # every known command phrase, for "did you mean"
+        self._known_commands = []  # extra (patterns, source, literal) for suggestions
+        self._prefixes = None  # word prefixes of the example phrases, built on first use
+        self.user_commands = {}  # "user:<id>" -> (type, parameters) from the database
+        self.user_commands_version = None
+        self._user_commands_lock = threading.Lock()  # one reload at a time
+        self.classifier = None  # IntentClassifier consulted when no pattern matches
+        # Normalized utterance -> parsed command, most recent last
+        self.cache_size = 256
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = OrderedDict()
+        self._cache_generation = 0  # bumped on every clear, so parses that straddle one aren't cached
+        self._cache_lock = threading.Lock()
+        self.load_enhanced_patterns()
+
+    def load_enhanced_patterns(self):
+        # IMPORTANT: Pattern order matters! Specific patterns MUST come before generic ones
+        # Order: typing → selection → web → window → scroll → conversation → system → application → rest
+        self.patterns = {
+            # 1. TYPING - Most specific, check first
+            "typing": [
+                (r"type (.+)", "type_text"),
+                (r"write (.+)", "type_text"),
+                (r"enter (.+)", "type_text"),
+                (r"new line", "new_line"),
+                (r"new paragraph", "new_paragraph"),
+                (r"press enter", "press_enter"),
+                (r"press tab", "press_tab"),
+                (r"(press |hit )?space(bar)?", "press_space"),
+                (r"backspace", "backspace"),
+                (r"delete", "delete_key"),
+                # Keyboard numbers
+                (r"press (\d+|zero|one|two|three|four|five|six|seven|eight|nine)", "press_key"),
+                (r"type (\d+|zero|one|two|three|four|five|six|seven|eight|nine)", "press_key"),
+                # Navigation keys
+                (r"go back", "press_back"),
+                (r"go forward", "press_forward"),
+                (r"press escape", "press_escape"),
+                (r"escape", "press_escape"),
+            ],
+            
+            # 2. SELECTION - Text selection and OCR-based screen selection
+            "selection": [
+                # General screen selection using OCR (must come first)
+                (r"select (.+)", "select_on_screen"),
+                (r"click (.+)", "select_on_screen"),
+                (r"choose (.+)", "select_on_screen"),
+                # Specific text selection (more specific patterns after general)
+                (r"select next (word|line|character)", "select_next"),
+                (r"select previous (word|line|character)", "select_previous"),
+                (r"select all", "select_all"),
+            ],
+            
+            # 3. WEB - Website opening and search (BEFORE application)
+            "web": [
+                # Website opening (must come before search to take priority)
+                (r"(open|launch|go to) youtube", "open_website"),
+                (r"(open|launch|go to) facebook", "open_website"),
+                (r"(open|launch|go to) twitter", "open_website"),
+                (r"(open|launch|go to) instagram", "open_website"),
+                (r"(open|launch|go to) linkedin", "open_website"),
+                (r"(open|launch|go to) whatsapp( web)?", "open_website"),
+                (r"(open|launch|go to) github", "open_website"),
+                (r"(open|launch|go to) gmail", "open_website"),
+                (r"(open|launch|go to) amazon", "open_website"),
+                (r"open netflix", "open_website"),
+                (r"open spotify", "open_website"),
+                (r"open reddit", "open_website"),
+                (r"open pinterest", "open_website"),
+                (r"open tiktok", "open_website"),
+                (r"open snapchat", "open_website"),
+                (r"open telegram", "open_website"),
+                (r"open discord", "open_website"),
+                (r"open slack", "open_website"),
+                (r"open medium", "open_website"),
+                (r"open quora", "open_website"),
+                (r"open stack overflow", "open_website"),
+                (r"open maps", "open_website"),
+                (r"google maps", "open_website"),
+                (r"open drive", "open_website"),
+                (r"google drive", "open_website"),
+                # Web search (comes after website opening)
+                # Explicit Google searches (bypass context)
+                (r"search (.+) in google", "google_search"),
+                (r"google search (.+)", "google_search"),
+                (r"search google for (.+)", "google_search"),
+                # Browse always opens Google (not YouTube)
+                (r"browse (.+)", "browse_web"),
+                # Context-aware searches (YouTube if open, else Google)
+                (r"search for (.+)", "web_search"),
+                (r"search (.+)", "web_search"),
+                (r"google (.+)", "web_search"),
+                (r"look up (.+)", "web_search"),
+                (r"find (.+)", "web_search"), 
+                (r"show me (.+)", "web_search"),
+                (r"check weather", "web_search"),
+                (r"check news", "web_search"),
+            ],
+            
+            # 4. WINDOW - Window and tab management (BEFORE navigation)
+            "window": [
+                # Tab operations - MUST come FIRST (more specific than app switching)
+                (r"close (tab|table)", "close_tab"),
+                (r"close this (tab|table)", "close_tab"),
+                (r"go to next (tab|table)", "switch_tab"),
+                (r"go to previous (tab|table)", "previous_tab"),
+                (r"switch previous (tab|table)", "previous_tab"),
+                (r"switch next (tab|table)", "switch_tab"),
+                (r"switch (tab|table)", "switch_tab"),
+                (r"next (tab|table)", "switch_tab"),
+                (r"change (tab|table)", "switch_tab"),
+                (r"change previous (tab|table)", "previous_tab"),
+                (r"change next (tab|table)", "switch_tab"),
+                (r"previous (tab|table)", "previous_tab"),
+                (r"new (tab|table)", "new_tab"),
+                (r"open new (tab|table)", "new_tab"),
+                
+                # Window switching - Generic window commands
+                (r"^(switch|change) window$", "next_window"),
+                (r"go to next window", "next_window"),
+                (r"go to previous window", "previous_window"),
+                (r"next window", "next_window"),
+                (r"previous window", "previous_window"),
+                
+                # App-specific switching - AFTER tab and generic window patterns
+                (r"switch to (\w+)", "switch_to_window"),
+                (r"switch (\w+)", "switch_to_window"),
+                (r"change to (\w+)", "switch_to_window"),
+                
+                # Window operations
+                (r"(minimize|minimise) (window|the window|this window|this)", "minimize_window"),
+                (r"maximize (window|the window|this window)", "maximize_window"),
+                (r"close (window|the window|this window)", "close_window"),
+            ],
+            
+            # 5. SCROLL - Page scrolling
+            "scroll": [
+                (r"scroll (up|down)", "scroll_page"),
+                (r"(page|scroll) (up|down)", "scroll_page"),
+                (r"scroll to (top|bottom)", "scroll_extreme"),
+            ],
+            
+            # 6. CONVERSATION - Friendly responses
+            "conversation": [
+                (r"(hello|hi|hey|greetings)", "greeting"),
+                (r"how are you", "how_are_you"),
+                (r"what(s| is) your name", "my_name"),
+                (r"(thank you|thanks|thank)", "thanks"),
+                (r"(goodbye|bye|see you)", "goodbye"),
+                (r"(help|what can you do)", "help"),
+                (r"(who made you|who created you)", "creator"),
+                (r"tell me a joke", "joke"),
+            ],
+            
+            # 7. SYSTEM - System commands (volume, brightness, time, etc.) - BEFORE utility
+            "system": [
+                (r"volume up", "volume_control"),
+                (r"volume down", "volume_control"),
+                (r"(increase|raise) (the )?volume", "volume_control"),
+                (r"(decrease|lower) (the )?volume", "volume_control"),
+                (r"turn (the )?volume (up|down)", "volume_control"), 
+                (r"make it (louder|quieter)", "volume_control"),  
+                (r"(mute|unmute)", "mute_control"),
+                (r"brightness up", "brightness_control"),
+                (r"brightness down", "brightness_control"),
+                (r"(increase|raise|turn up) (the )?brightness", "brightness_control"),
+                (r"(decrease|lower|turn down|dim) (the )?brightness", "brightness_control"),
+                (r"lock (computer|screen)", "lock_system"),
+                (r"shutdown|shut down", "shutdown"),
+                (r"restart|reboot", "restart"),
+                (r"sleep|hibernate", "sleep"),
+                (r"take screenshot", "screenshot"),
+                # TIME/DATE - Must come BEFORE utility to avoid calculator conflict
+                (r"what time is it", "tell_time"),
+                (r"^time$", "tell_time"),
+                (r"tell (me )?(the )?time", "tell_time"),
+                (r"current time", "tell_time"),
+                (r"what date is it", "tell_date"),
+                (r"^date$", "tell_date"),
+                (r"tell (me )?(the )?date", "tell_date"),
+                (r"current date", "tell_date"),
+                (r"today's date", "tell_date"),
+                (r"minimize all", "minimize_all"),
+                (r"show desktop", "show_desktop"),
+                (r"task manager", "task_manager"),
+                (r"check internet", "check_internet"),
+                (r"empty (the )?recycle bin", "empty_recycle"),
+            ],
+            
+            # 8. APPLICATION - Open/close applications (AFTER web patterns)
+            "application": [
+                (r"open (\w+)", "open_app"),
+                (r"launch (\w+)", "open_app"),
+                (r"start (\w+)", "open_app"),
+                (r"run (\w+)", "open_app"),
+                (r"close (\w+)", "close_app"),
+            ],
+            
+            # 9. FILE - File operations
+            "file": [
+                (r"create folder (.+)", "create_folder"),
+                (r"(create|make) (a )?file (.+)", "create_file"),
+                (r"open (desktop|documents|downloads|pictures|music|videos)", "open_folder"),
+                (r"go to (desktop|documents|downloads|pictures|music|videos)", "open_folder"),
+                (r"open (file explorer|explorer)", "open_explorer"),
+            ],
+            
+            # 10. MEDIA - Media controls + YouTube/Screen OCR navigation
+            "media": [
+                # YouTube video play commands
+                (r"^play$", "play_video"),  # Single word 'play' for YouTube
+                (r"play (this|video|it)", "play_video"),
+                (r"play first (one|video|song|result)", "play_video"),
+                (r"play (the )?video", "play_video"),
+                
+                # OCR-based selection by number (first, second, third, etc.)
+                (r"select (first|second|third|fourth|fifth|1st|2nd|3rd|4th|5th) (result|video|one)", "select_number"),
+                (r"play (first|second|third|fourth|fifth|1st|2nd|3rd|4th|5th) (result|video|one)", "play_number"),
+                (r"click (first|second|third|fourth|fifth|1st|2nd|3rd|4th|5th) (result|video|one)", "select_number"),
+                
+                # OCR-based selection by text/title
+                (r"select (video|result) (about|with|titled) (.+)", "select_by_text"),
+                (r"play (video|result) (about|with|titled) (.+)", "play_by_text"),
+                (r"find and (select|play|click) (.+)", "select_by_text"),
+                
+                # Traditional navigation
+                (r"select first (one|video|result|song)", "select_first"),
+                (r"select (down|up|next|previous)", "navigate_result"),  # Captures direction in group 1
+                (r"(go |move |scroll )?(down|up)", "scroll_direction"),  # Captures direction in group 2
+                (r"next (result|video|one)", "next_result"),
+                (r"previous (result|video|one)", "previous_result"),
+                (r"scroll (down|up)", "scroll_media"),
+                
+                # Regular media controls
+                (r"(play|start|resume) (music|song|audio)", "play_music"),
+                (r"(pause|stop) (music|song|audio)", "pause_music"),
+                (r"(next|skip) (song|track)", "next_song"),
+                (r"(previous|back|last) (song|track)", "previous_song"),
+                (r"stop (playing |the )?music", "stop_music"),
+            ],
+            
+            # 11. NETWORK - Network operations
+            "network": [
+                (r"connect wifi", "connect_wifi"),
+                (r"disconnect wifi", "disconnect_wifi"),
+                (r"show ip", "show_ip"),
+                (r"network settings", "network_settings"),
+            ],
+            
+            # 12. UTILITY - Utility operations (math only, NOT time/date)
+            "utility": [
+                (r"set timer (.+)", "set_timer"),
+                (r"set alarm (.+)", "set_alarm"),
+                # CALCULATOR - Only match actual math operations
+                (r"calculate (.+)", "calculate"),
+                (r"(add|subtract|multiply|divide|sum|minus|plus|times) (.+)", "calculate"),
+                (r"what('s| is) (\d+.*[+\-*/].+)", "calculate"),  # Only math expressions
+                (r"solve (.+)", "calculate"),
+                (r"copy (.+)", "copy_text"),
+                (r"paste", "paste_text"),
+                (r"(read|speak|say) (.+)", "read_text"),
+            ],
+            
+            # 13. GESTURE - Gesture control
+            "gesture": [
+                (r"(enable|start|turn on) (gesture|mouse|virtual mouse)", "gesture_on"),
+                (r"(disable|stop|turn off) (gesture|mouse|virtual mouse)", "gesture_off"),
+                (r"(toggle|switch) (gesture|mouse)", "gesture_toggle"),
+            ],
+            
+            # 14. NAVIGATION - Arrow keys (LAST, most generic)
+            "navigation": [
+                (r"^right$", "arrow_right"),
+                (r"^left$", "arrow_left"),
+                (r"^up$", "arrow_up"),
+                (r"^down$", "arrow_down"),
+                (r"arrow right", "arrow_right"),
+                (r"arrow left", "arrow_left"),
+                (r"arrow up", "arrow_up"),
+                (r"arrow down", "arrow_down"),
+                (r"press right", "arrow_right"),
+                (r"press left", "arrow_left"),
+                (r"press up", "arrow_up"),
+                (r"press down", "arrow_down"),
+            ],
+        }
+        self.compile_patterns()
+
+    def compile_patterns(self):
+        """Compile ``self.patterns`` once and index them by required keyword.
+
+        Call again after changing ``self.patterns``. A pattern is indexed
+        under a literal word fragment every match must contain (or under each
+        alternative of a group of literals); patterns without one are always
+        tried.
+        """
+        entries, index, unindexed = [], {}, []
+        for cat, pats in self.patterns.items():
+            for pattern, action in pats:
+                compiled = re.compile(pattern)
+                keys = required_keys(pattern)
+                if keys:
+                    for key in keys:
+                        index.setdefault(key, []).append(len(entries))
+                else:
+                    unindexed.append(len(entries))
+                entries.append((cat, action, compiled))
+        self._entries = entries
+        self._index = index
+        self._unindexed = unindexed
+        self._key_lengths = sorted({len(k) for k in index})
+        self._prefixes = None
+        self.clear_cache()  # parses may differ with the new pattern set
+        self._rebuild_suggestions()
+
+    def _rebuild_suggestions(self):
+        # From scratch, so removed patterns are no longer suggested
+        suggestions = FuzzyIndex()
+        self._index_phrases(suggestions, (p for pats in self.patterns.values() for p, _action in pats), "pattern")
+        for patterns, source, literal in self._known_commands:
+            self._index_phrases(suggestions, patterns, source, literal)
+        self.suggestions = suggestions
+
+    def add_known_commands(self, patterns, source, literal=False):
+        """Make command phrases available to ``suggest_commands``.
+
+        ``patterns`` are regexes like those in ``self.patterns`` (or, with
+        ``literal=True``, plain phrases such as custom command names). They
+        replace phrases added earlier under the same ``source``.
+        """
+        self._known_commands = [known for known in self._known_commands if known[1] != source]
+        self._known_commands.append((list(patterns), source, literal))
+        self._rebuild_suggestions()
+
+    @staticmethod
+    def _index_phrases(suggestions, patterns, source, literal=False):
+        for pattern in patterns:
+            phrases = [(pattern, False)] if literal else example_phrases(pattern)
+            for phrase, takes_argument in phrases:
+                suggestions.add(phrase, {"source": source, "argument": takes_argument})
+
+    def candidates(self, t):
+        """Indices into the compiled patterns that can match ``t``, in match order."""
+        if not self._key_lengths:
+            return range(len(self._entries))
+        found = set(self._unindexed)
+        index, lengths = self._index, self._key_lengths
+        for run in WORD_RUN.findall(t):
+            n = len(run)
+            for size in lengths:
+                if size > n:
+                    break
+                for i in range(n - size + 1):
+                    hits = index.get(run[i:i + size])
+                    if hits:
+                        found.update(hits)
+        return sorted(found)
+
+    def match(self, t):
+        """(category, action, match) for the first pattern found in ``t``, or None."""
+        entries = self._entries
+        for i in self.candidates(t):
+            cat, action, compiled = entries[i]
+            m = compiled.search(t)
+            if m:
+                return cat, action, m
+        return None
+
+    def load_user_commands(self, rows, version=None):
+        """Match database commands before the built-in patterns.
+
+        ``rows`` are dicts with id, name, pattern ("volume up|louder"), type
+        and parameters (JSON). Patterns must match the whole command, so a
+        row like "open my notes" wins over the built-in "open <app>" only
+        when nothing else was said. They
+        are compiled here once; ``version`` records which table contents were
+        loaded so callers can reload only after the rows changed. Reloads are
+        serialized, and ``self.patterns`` is replaced rather than changed in
+        place, so threads iterating the old one are not disturbed.
+        """
+        patterns, commands = [], {}
+        for row in rows:
+            pattern = f"^(?:{row['pattern']})$"
+            try:
+                re.compile(pattern)
+                parameters = json.loads(row.get("parameters") or "{}")
+            except (re.error, ValueError) as e:
+                print(f"Skipping command '{row.get('name')}': {e}")
+                continue
+            action = f"user:{row['id']}"
+            patterns.append((pattern, action))
+            commands[action] = (row["type"], parameters)
+        with self._user_commands_lock:
+            # Entries are tried in dict order: the user's commands first
+            merged = {"user": patterns} if patterns else {}
+            merged.update((cat, pats) for cat, pats in self.patterns.items() if cat != "user")
+            self.patterns = merged
+            self.user_commands = commands
+            self.user_commands_version = version
+            self.compile_patterns()
+        return len(patterns)
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_generation += 1
+
+    def cache_summary(self):
+        lookups = self.cache_hits + self.cache_misses
+        rate = self.cache_hits / float(lookups) if lookups else 0.0
+        return (f"parse cache {rate:.0%} hit rate ({self.cache_hits} hits / {self.cache_misses} misses, "
+                f"{len(self._cache)} entries)")
+
+    def process_command(self, text):
+        """Parse ``text``; repeated utterances are answered from an LRU cache.
+
+        The result carries ``extracted``, the command text left after filler
+        words were removed, for logging.
+        """
+        key = " ".join(text.lower().split())
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+            generation = self._cache_generation
+        if cached is not None:
+            return dict(cached, parameters=dict(cached["parameters"]))
+
+        result = self._parse(text)
+        with self._cache_lock:
+            self.cache_misses += 1
+            if generation == self._cache_generation:
+                self._cache[key] = dict(result, parameters=dict(result["parameters"]))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def plan_command(self, text):
+        """Ordered steps for an utterance holding several commands, or None.
+
+        "open chrome and search for python tutorials" becomes two steps. The
+        text is only split where the parts on both sides are commands the
+        patterns know, so "search for salt and pepper" stays one search;
+        dictation and user-defined commands keep the rest of the utterance.
+        Each step is {"text", "command", "after", "settle"}: ``after`` is the
+        index of the step that must finish first, None if it can start right
+        away, and ``settle`` the pause its dependents wait after it (see
+        ``run_plan``).
+        """
+        parts = CLAUSE_BREAK.split(" ".join(text.lower().split()))
+        if len(parts) < 3:
+            return None
+        t = self.extract_command(text)
+        if any(cat == "user" and compiled.match(t) for cat, _action, compiled in self._entries):
+            return None
+        clauses = [parts[0]]
+        for joiner, part in zip(parts[1::2], parts[2::2]):
+            if self._splits(clauses[-1], part):
+                clauses.append(part)
+            else:
+                clauses[-1] += joiner + part
+        if len(clauses) < 2:
+            return None
+
+        steps, previous = [], None
+        for clause in clauses:
+            command = self.process_command(clause)
+            foreground = touches_foreground(command)
+            steps.append({"text": clause, "command": command,
+                          "after": previous if foreground else None,
+                          "settle": settle_seconds(command)})
+            if foreground:
+                previous = len(steps) - 1
+        return steps
+
+    def _splits(self, clause, part):
+        """Whether ``part`` is a command of its own rather than more of ``clause``."""
+        if not clause or not part:
+            return False
+        command = self.parse_patterns(self.extract_command(clause))
+        following = self.parse_patterns(self.extract_command(part))
+        if command is None or following is None:
+            return False
+        if _dictation(command):
+            # Dictation takes the rest of the utterance, except a key to press
+            # after it: "type hello and press enter"
+            return following["action"] == "typing" and not _dictation(following)
+        return True
+
+    def set_classifier(self, classifier):
+        self.classifier = classifier
+        self.clear_cache()  # earlier "unknown" results may now be classified
+
+    def parse_patterns(self, text):
+        """Parsed command for the first pattern matching ``text``, or None."""
+        t = text.lower().strip()
+        found = self.match(t)
+        if found:
+            cat, action, m = found
+            return self._build(cat, action, m, t)
+        return None
+
+    def _parse(self, text):
+        # First, clean the input by removing filler words and extracting command
+        cleaned_text = self.extract_command(text)
+
+        command = self.parse_patterns(cleaned_text)
+        if command is None and self.classifier is not None:
+            predicted = self.classifier.predict(cleaned_text)
+            command = predicted[0] if predicted is not None else None
+        if command is None:
+            command = {"action": "unknown", "parameters": {}, "confidence": 0.1}
+        command["extracted"] = cleaned_text
+        return command
+    
+    def extract_command(self, text):
+        """Extract actual command from text by removing filler words and focusing on action keywords"""
+        t = text.lower().strip()
+        
+        # List of filler/conversational words to remove
+        filler_words = [
+            'yeah', 'yes', 'yep', 'yup', 'sure', 'okay', 'ok', 'alright', 'fine',
+            'no', 'nah', 'nope', 'please', 'thanks', 'thank you', 'sorry',
+            'um', 'uh', 'ah', 'well', 'like', 'just', 'maybe', 'perhaps',
+            'can you', 'could you', 'would you', 'will you', 'i want', 'i need',
+            'of course', 'ofcourse', 'definitely', 'absolutely', 'totally',
+            'actually', 'basically', 'literally', 'really', 'very', 'quite',
+            'i want to', 'i need to', 'i would like to', 'i want you to',
+        ]
+        
+        # Action keywords that indicate actual commands
+        action_keywords = [
+            'open', 'close', 'launch', 'start', 'run', 'stop', 'quit', 'exit',
+            'search', 'google', 'browse', 'find', 'look', 'show',
+            'play', 'pause', 'stop', 'next', 'previous', 'skip',
+            'select', 'click', 'choose', 'pick',
+            'switch', 'change', 'go to', 'move to',
+            'type', 'write', 'enter', 'press',
+            'volume', 'brightness', 'mute', 'unmute',
+            'minimize', 'maximise', 'maximize', 'minimise',
+            'scroll', 'up', 'down', 'left', 'right',
+            'create', 'make', 'delete', 'remove',
+            'take', 'screenshot', 'lock', 'shutdown', 'restart', 'sleep',
+            'what', 'tell', 'time', 'date', 'weather', 'news',
+        ]
+        
+        # First, try to find command patterns with action keywords
+        words = t.split()
+        
+        # Remove leading filler words
+        while words and words[0] in filler_words:
+            words.pop(0)
+        
+        # Remove trailing filler words
+        while words and words[-1] in filler_words:
+            words.pop()
+        
+        # Try to find where the actual command starts
+        command_start_idx = -1
+        for i, word in enumerate(words):
+            if word in action_keywords:
+                command_start_idx = i
+                break
+        
+        # If we found an action keyword, extract from there
+        if command_start_idx >= 0:
+            # Take from action keyword onwards
+            command_words = words[command_start_idx:]
+            
+            # Remove any remaining filler words that appear after action
+            cleaned_command = []
+            skip_next = False
+            for i, word in enumerate(command_words):
+                if skip_next:
+                    skip_next = False
+                    continue
+                    
+                # Check for multi-word fillers
+                if i < len(command_words) - 1:
+                    two_words = f"{word} {command_words[i+1]}"
+                    if two_words in filler_words:
+                        skip_next = True
+                        continue
+                
+                # Skip single-word fillers only if they're not part of command
+                if word in filler_words and word not in action_keywords:
+                    continue
+                    
+                cleaned_command.append(word)
+            
+            result = ' '.join(cleaned_command)
+            return result if result else t
+        
+        # If no action keyword found, just remove filler words
+        cleaned_words = [w for w in words if w not in filler_words]
+        result = ' '.join(cleaned_words)
+        return result if result else t
+    
+    def suggest_commands(self, text, k=3):
+        """Closest known commands to ``text`` as [(suggestion, score)], best first.
+
+        The whole text is compared with every known phrase; in addition the
+        first one to three words are compared with commands that take an
+        argument, so "serch for cats" becomes "search for cats".
+        """
+        original = " ".join(text.lower().split())
+        words = original.split()
+        # Speech recognition artifact: a repeated first word ("open open chrome")
+        if len(words) >= 2 and words[0] == words[1]:
+            words = words[1:]
+        if not words:
+            return []
+        scores = {}
+        for score, phrase, _payload in self.suggestions.search(" ".join(words), k):
+            scores[phrase] = score
+        for n in range(1, min(3, len(words) - 1) + 1):
+            head, rest = " ".join(words[:n]), " ".join(words[n:])
+            for score, phrase, _payload in self.suggestions.search(head, k, accept=lambda p: p["argument"]):
+                suggestion = f"{phrase} {rest}"
+                # Slightly below a whole-phrase match of the same quality
+                scores[suggestion] = max(scores.get(suggestion, 0.0), score * 0.95)
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        return [(suggestion, score) for suggestion, score in ranked if suggestion != original][:k]
+
+    def incomplete_command(self, text):
+        """True if ``text`` is only the start of a known command, e.g. "open".
+
+        Used after a short endpoint: "open … chrome" split by a pause is
+        joined instead of failing as an unknown "open".
+        """
+        prefixes = self._prefixes
+        if prefixes is None:
+            prefixes = set()
+            for pats in self.patterns.values():
+                for pattern, _action in pats:
+                    for phrase, takes_argument in example_phrases(pattern):
+                        words = phrase.split()
+                        prefixes.update(" ".join(words[:i]) for i in range(1, len(words)))
+                        if takes_argument:
+                            prefixes.add(phrase)
+            self._prefixes = prefixes
+        t = self.extract_command(text)
+        return t in prefixes and self.parse_patterns(t) is None
+
+    def suggest_command(self, text):
+        """Best "did you mean" suggestion for ``text``, or None."""
+        suggestions = self.suggest_commands(text, k=1)
+        return suggestions[0][0] if suggestions else None
+
+    def _build(self, cat, action, m, original):
+        if cat == "user":
+            found = self.user_commands.get(action)
+            if found is None:  # removed by a reload during this parse
+                return None
+            kind, parameters = found[0], dict(found[1])
+            argument = next((g for g in m.groups() if g), None)
+            key = USER_ARGUMENT_KEYS.get(kind)
+            if argument and key and not parameters.get(key):
+                parameters[key] = argument.strip()
+            if kind == "conversation":
+                parameters.setdefault("original", original)
+            return {"action": kind, "parameters": parameters, "confidence": 0.9}
+        if cat == "conversation":
+            return {"action": "conversation", "parameters": {"type": action, "original": original}, "confidence": 0.95}
+        if cat == "application":
+            if action == "close_app":
+                app = m.group(1) if m.groups() else "unknown"
+                return {"action": "application", "parameters": {"app": app, "close": True}, "confidence": 0.9}
+            app = m.group(1) if m.groups() else "unknown"
+            return {"action": "application", "parameters": {"app": app}, "confidence": 0.9}
+        if cat == "web":
+            if action == "open_website":
+                # Comprehensive site mapping for social media and popular sites
+                site_map = {
+                    "youtube": "youtube.com",
+                    "facebook": "facebook.com",
+                    "twitter": "twitter.com",
+                    "instagram": "instagram.com",
+                    "linkedin": "linkedin.com",
+                    "whatsapp": "web.whatsapp.com",
+                    "github": "github.com",
+                    "gmail": "gmail.com",
+                    "amazon": "amazon.com",
+                    "netflix": "netflix.com",
+                    "spotify": "spotify.com",
+                    "reddit": "reddit.com",
+                    "pinterest": "pinterest.com",
+                    "tiktok": "tiktok.com",
+                    "snapchat": "snapchat.com",
+                    "telegram": "web.telegram.org",
+                    "discord": "discord.com",
+                    "slack": "slack.com",
+                    "medium": "medium.com",
+                    "quora": "quora.com",
+                    "stack overflow": "stackoverflow.com",
+                    "stackoverflow": "stackoverflow.com",
+                    "maps": "maps.google.com",
+                    "drive": "drive.google.com",
+                    "chatgpt": "chat.openai.com"
+                }
+                q = None
+                # Check for exact matches in the original command
+                original_lower = original.lower()
+                for k, v in site_map.items():
+                    if k in original_lower:
+                        q = v
+                        break
+                if q is None:
+                    q = m.group(1) if m.groups() else original
+                return {"action": "web", "parameters": {"query": q, "is_website": True}, "confidence": 0.95}
+            elif action == "google_search":
+                # Force Google search regardless of context
+                q = m.group(1) if m.groups() else original
+                return {"action": "web", "parameters": {"query": q, "is_website": False, "force_google": True}, "confidence": 0.95}
+            elif action == "browse_web":
+                # Browse always uses Google
+                q = m.group(1) if m.groups() else original
+                return {"action": "web", "parameters": {"query": q, "is_website": False, "force_google": True}, "confidence": 0.9}
+            elif "weather" in original:
+                q = "weather forecast"
+            elif "news" in original:
+                q = "latest news"
+            else:
+                q = m.group(1) if m.groups() else original
+            return {"action": "web", "parameters": {"query": q, "is_website": False}, "confidence": 0.9}
+        if cat == "system":
+            if "volume" in action:
+                direction = "up" if ("up" in original or "increase" in original) else "down"
+                return {"action": "system", "parameters": {"action": "volume", "direction": direction}, "confidence": 0.9}
+            if "brightness" in action:
+                direction = "up" if ("up" in original or "increase" in original or "raise" in original or "turn up" in original) else "down"
+                return {"action": "system", "parameters": {"action": "brightness", "direction": direction}, "confidence": 0.9}
+            return {"action": "system", "parameters": {"action": action.replace("_", "")}, "confidence": 0.9}
+        if cat == "file":
+            if action == "create_folder":
+                name = m.group(1) if m.groups() else "New Folder"
+                return {"action": "file", "parameters": {"action": "create_folder", "filename": name}, "confidence": 0.9}
+            if action == "open_folder":
+                folder = m.group(1) if m.groups() else "desktop"
+                return {"action": "file", "parameters": {"action": "open_folder", "folder": folder}, "confidence": 0.9}
+        if cat == "media":
+            if action == "navigate_result":
+                # Extract direction from group 1 for "select down/up"
+                direction = m.group(1) if m.groups() else "down"
+                return {"action": "media", "parameters": {"action": action, "direction": direction}, "confidence": 0.9}
+            elif action == "scroll_direction":
+                # Extract direction from group 2 for "down/up" (group 1 is optional prefix)
+                direction = m.group(2) if len(m.groups()) >= 2 else (m.group(1) if m.groups() else "down")
+                return {"action": "media", "parameters": {"action": action, "direction": direction}, "confidence": 0.9}
+            elif action in ("select_number", "play_number"):
+                # Extract number from text (first, second, 1st, 2nd, etc.)
+                number_text = m.group(1) if m.groups() else "first"
+                number_map = {
+                    "first": 1, "1st": 1,
+                    "second": 2, "2nd": 2,
+                    "third": 3, "3rd": 3,
+                    "fourth": 4, "4th": 4,
+                    "fifth": 5, "5th": 5,
+                    "sixth": 6, "6th": 6,
+                    "seventh": 7, "7th": 7,
+                    "eighth": 8, "8th": 8,
+                    "ninth": 9, "9th": 9,
+                    "tenth": 10, "10th": 10
+                }
+                number = number_map.get(number_text.lower(), 1)
+                return {"action": "media", "parameters": {"action": action, "number": number}, "confidence": 0.9}
+            elif action in ("select_by_text", "play_by_text"):
+                # Extract search text - get the last group which has the actual search query
+                search_text = ""
+                if m.groups():
+                    # Get the last non-empty group (the search query)
+                    for g in reversed(m.groups()):
+                        if g:
+                            search_text = g
+                            break
+                return {"action": "media", "parameters": {"action": action, "text": search_text}, "confidence": 0.9}
+            return {"action": "media", "parameters": {"action": action}, "confidence": 0.9}
+        if cat == "network":
+            return {"action": "network", "parameters": {"action": action}, "confidence": 0.9}
+        if cat == "utility":
+            value = m.group(1) if m.groups() else None
+            return {"action": "utility", "parameters": {"action": action, "value": value}, "confidence": 0.9}
+        if cat == "gesture":
+            intent = "on" if "on" in action else "off" if "off" in action else "toggle"
+            return {"action": "gesture", "parameters": {"state": intent}, "confidence": 0.95}
+        if cat == "window":
+            if action == "switch_to_window":
+                app_name = m.group(1) if m.groups() else "unknown"
+                return {"action": "window", "parameters": {"action": action, "app": app_name}, "confidence": 0.9}
+            return {"action": "window", "parameters": {"action": action}, "confidence": 0.9}
+        if cat == "typing":
+            if "type_text" in action:
+                text = m.group(1) if m.groups() else ""
+                return {"action": "typing", "parameters": {"action": action, "text": text}, "confidence": 0.9}
+            elif action == "press_key":
+                key = m.group(1) if m.groups() else ""
+                return {"action": "typing", "parameters": {"action": action, "text": key}, "confidence": 0.9}
+            return {"action": "typing", "parameters": {"action": action}, "confidence": 0.9}
+        if cat == "selection":
+            if action == "select_on_screen":
+                # Extract text to find and select
+                search_text = m.group(1) if m.groups() else ""
+                return {"action": "selection", "parameters": {"action": action, "text": search_text}, "confidence": 0.85}
+            
+            # Traditional selection
+            unit = "character"
+            if m.groups():
+                unit = m.group(1) if "word" in original or "line" in original or "character" in original else "character"
+            direction = "next" if "next" in action else "previous" if "previous" in action else "all"
+            return {"action": "selection", "parameters": {"action": action, "unit": unit, "direction": direction}, "confidence": 0.9}
+        if cat == "navigation":
+            # Determine arrow direction from action or original text
+            if "right" in action or "right" in original or "next" in original:
+                arrow_dir = "right"
+            elif "left" in action or "left" in original or "back" in original:
+                arrow_dir = "left"
+            elif "up" in action or "up" in original:
+                arrow_dir = "up"
+            elif "down" in action or "down" in original:
+                arrow_dir = "down"
+            else:
+                arrow_dir = "right"  # default
+            return {"action": "navigation", "parameters": {"direction": arrow_dir}, "confidence": 0.95}
+        if cat == "scroll":
+            if "extreme" in action:
+                direction = "top" if "top" in original else "bottom"
+            else:
+                direction = "up" if "up" in original else "down"
+            return {"action": "scroll", "parameters": {"direction": direction}, "confidence": 0.9}
+        return {"action": "unknown", "parameters": {}, "confidence": 0.1}
+
+
+# Parsed action -> EnhancedSystemController method taking the parameters dict
+CONTROLLER_METHODS = {
+    "system": "execute_system_command",
+    "file": "file_operation",
+    "media": "media_control",
+    "network": "network_operation",
+    "utility": "utility_operation",
+    "window": "window_operation",
+    "typing": "typing_operation",
+    "selection": "selection_operation",
+    "navigation": "navigation_operation",
+}
+
+
+def _dictation(command):
+    return command["action"] == "typing" and bool(command["parameters"].get("text"))
+
+
+def touches_foreground(command):
+    """Whether a command uses the keyboard, mouse or foreground window."""
+    action = command["action"]
+    if action == "system":
+        return command["parameters"].get("action") not in BACKGROUND_SYSTEM_ACTIONS
+    return action not in BACKGROUND_ACTIONS and action != "unknown"
+
+
+def settle_seconds(command):
+    if command["action"] == "application" and command["parameters"].get("close"):
+        return 0.0
+    return SETTLE_SECONDS.get(command["action"], 0.0)
+
+
+def run_plan(steps, execute, log=print, sleep=time.sleep):
+    """Execute the steps of ``plan_command``; True if all of them succeeded.
+
+    Every step runs on its own thread as soon as the step it depends on has
+    finished and settled, so a search waits for the browser it needs while
+    a volume change in the same utterance happens straight away. Steps after
+    a failed step are skipped.
+    """
+    done = [threading.Event() for _ in steps]
+    results = [False] * len(steps)
+
+    def run(i, step):
+        try:
+            after = step["after"]
+            if after is not None:
+                done[after].wait()
+                if not results[after]:
+                    log(f"⏭️ Skipped '{step['text']}': '{steps[after]['text']}' did not work")
+                    return
+                sleep(steps[after]["settle"])
+            results[i] = bool(execute(step["command"]))
+            log(f"{'✅' if results[i] else '❌'} Step {i + 1}/{len(steps)}: {step['text']}")
+        except Exception as e:
+            log(f"❌ Step {i + 1}/{len(steps)} error: {e}")
+        finally:
+            done[i].set()
+
+    workers = [threading.Thread(target=run, args=(i, step), daemon=True) for i, step in enumerate(steps)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return all(results)
+
+
+def controller_call(command_result, context=None):
+    """(method name, args) to run on the system controller for a parsed command.
+
+    Returns None for actions the controller does not handle (conversation,
+    gesture, unknown). ``context`` is the last opened browser context used by
+    web searches.
+    """
+    action = command_result["action"]
+    params = command_result["parameters"]
+    if action == "application":
+        if params.get("close"):
+            return "close_application", (params.get("app", ""),)
+        return "open_application", (params.get("app", ""),)
+    if action == "web":
+        return "web_search", (params, context)
+    if action == "scroll":
+        return "scroll_page", (params.get("direction", "down"),)
+    if action in CONTROLLER_METHODS:
+        return CONTROLLER_METHODS[action], (params,)
+    return None
@@ -0,0 +1,91 @@
+"""
+Adaptive endpointing
+Decides how much trailing silence ends an utterance: short commands close
+quickly, long phrases and dictation get longer pauses, and the thresholds
+adapt to how long this speaker pauses between words.
+"""
+
+import threading
+from collections import deque
+
+# Commands whose argument is free text and may contain thinking pauses
+DICTATION_PREFIXES = ("type", "write", "enter", "search", "google", "search for", "look up")
+
+
+class Endpointer:
+    """Pause-length policy for UtteranceSegmenter.
+
+    * utterances with at most ``short_utterance`` seconds of voice so far
+      (e.g. "open chrome", "volume up") end after ``short_pause``
+    * longer ones end after ``base_pause``
+    * in "dictation" mode every utterance waits ``long_pause``
+    * the pause is never shorter than the speaker's usual gap between words
+      (90th percentile of observed within-utterance gaps times ``gap_margin``)
+
+    The choice is made from voiced duration because it happens before any
+    transcript exists (the recognizers are not streaming). The words are
+    checked afterwards: when a short endpoint leaves a dictation prefix
+    (``wants_continuation``) or only the start of a command ("open"), the
+    app joins the next segment to it.
+    """
+
+    def __init__(self, short_pause=0.35, base_pause=0.8, long_pause=1.3, short_utterance=1.5,
+                 min_pause=0.25, gap_margin=1.3, min_gaps=8):
+        self.short_pause = short_pause
+        self.base_pause = base_pause
+        self.long_pause = long_pause
+        self.short_utterance = short_utterance
+        self.min_pause = min_pause
+        self.gap_margin = gap_margin
+        self.min_gaps = min_gaps
+        self.enabled = True
+        self.mode = "command"
+        self.gaps = deque(maxlen=200)
+        self.endpoints = {"short": 0, "base": 0, "long": 0, "max": 0}
+        self._lock = threading.Lock()
+
+    def set_mode(self, mode):
+        self.mode = mode if mode in ("command", "dictation") else "command"
+
+    def observe_gap(self, seconds):
+        """A pause inside an utterance (speech resumed afterwards)."""
+        with self._lock:
+            self.gaps.append(seconds)
+
+    def speaker_gap(self):
+        with self._lock:
+            if len(self.gaps) < self.min_gaps:
+                return None
+            ordered = sorted(self.gaps)
+        return ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))]
+
+    def pause_for(self, voiced_seconds):
+        """(seconds of silence that end the utterance, kind) after ``voiced_seconds`` of speech."""
+        if not self.enabled:
+            return self.base_pause, "base"
+        if self.mode == "dictation":
+            pause, kind = self.long_pause, "long"
+        elif voiced_seconds <= self.short_utterance:
+            pause, kind = self.short_pause, "short"
+        else:
+            pause, kind = self.base_pause, "base"
+        gap = self.speaker_gap()
+        if gap is not None:
+            # Never cut in the middle of this speaker's normal word gaps
+            pause = max(pause, min(self.long_pause, gap * self.gap_margin))
+        return max(self.min_pause, pause), kind
+
+    def record(self, kind):
+        self.endpoints[kind] = self.endpoints.get(kind, 0) + 1
+
+    @staticmethod
+    def wants_continuation(text):
+        """True if ``text`` starts a free-text command that a pause may have split."""
+        t = " ".join(text.lower().split())
+        return any(t == p or t.startswith(p + " ") for p in DICTATION_PREFIXES)
+
+    def summary(self):
+        gap = self.speaker_gap()
+        gap_text = f"{gap * 1000:.0f} ms" if gap is not None else "learning"
+        counts = ", ".join(f"{k} {v}" for k, v in self.endpoints.items())
+        return f"mode {self.mode}, speaker gap p90 {gap_text}; endpoints: {counts}"
@@ -0,0 +1,210 @@
+"""
+Local intent classifier
+Fallback for utterances no command pattern matches: hashed character
+n-gram TF-IDF features and a softmax (multinomial logistic regression)
+layer, trained with numpy from the phrases the patterns accept and from
+commands that succeeded in the history. Classes are complete parsed
+commands such as {"action": "scroll", "parameters": {"direction": "down"}}.
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from command_processor import example_phrases
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_model.npz")
+
+# Run without confirmation and cannot be undone: never executed on a guess
+UNSAFE_SYSTEM_ACTIONS = {"shutdown", "restart", "sleep", "locksystem", "emptyrecycle"}
+
+
+def _label(command):
+    """Class key of a parsed command; the echoed utterance is not part of it."""
+    parameters = {k: v for k, v in command["parameters"].items() if k != "original"}
+    return json.dumps({"action": command["action"], "parameters": parameters}, sort_keys=True)
+
+
+def guessable(command):
+    """Whether the fallback may produce ``command``; irreversible system actions need the exact words."""
+    return not (command["action"] == "system" and command["parameters"].get("action") in UNSAFE_SYSTEM_ACTIONS)
+
+
+class IntentClassifier:
+    """Softmax over TF-IDF weighted, hashed character 2-4-grams.
+
+    ``predict`` returns (command dict, probability) or None below
+    ``threshold``; one prediction touches only the rows of the weight matrix
+    for the n-grams present, so it takes about a tenth of a millisecond.
+    """
+
+    def __init__(self, dim=4096, threshold=0.2, ngrams=(2, 3, 4)):
+        self.dim = dim
+        self.threshold = threshold
+        self.ngrams = ngrams
+        self.labels = []
+        self.weights = None  # (dim, classes)
+        self.bias = None
+        self.idf = np.ones(dim, dtype=np.float32)
+        self.trained_on = 0
+        self.predictions = 0
+        self.accepted = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.weights is not None
+
+    def _features(self, text):
+        """(hashed n-gram indices, L2-normalised TF-IDF values) of ``text``."""
+        t = f" {' '.join(text.lower().split())} "
+        grams = [t[i:i + n] for n in self.ngrams for i in range(len(t) - n + 1)]
+        if not grams:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        hashed = np.fromiter((zlib.crc32(g.encode("utf-8")) % self.dim for g in grams), dtype=np.int64, count=len(grams))
+        idx, counts = np.unique(hashed, return_counts=True)
+        values = (1.0 + np.log(counts)).astype(np.float32) * self.idf[idx]
+        norm = np.linalg.norm(values)
+        return idx, values / norm if norm > 0 else values
+
+    def _matrix(self, texts):
+        X = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            idx, values = self._features(text)
+            X[row, idx] = values
+        return X
+
+    def train(self, texts, commands, epochs=300, lr=20.0, l2=1e-4):
+        """Fit on utterances and the parsed commands they mean; returns training accuracy."""
+        labels = sorted({_label(c) for c in commands})
+        if len(labels) < 2:
+            raise ValueError("need examples of at least two commands")
+        index = {label: i for i, label in enumerate(labels)}
+        y = np.array([index[_label(c)] for c in commands])
+
+        # Document frequencies over the hashed n-grams
+        self.idf = np.ones(self.dim, dtype=np.float32)
+        df = np.zeros(self.dim, dtype=np.float32)
+        for text in texts:
+            df[self._features(text)[0]] += 1
+        self.idf = (np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0).astype(np.float32)
+        # Only hashed n-grams seen in training can get weights
+        used = np.flatnonzero(df)
+        X = self._matrix(texts)[:, used]
+        Y = np.eye(len(labels), dtype=np.float32)[y]
+
+        W = np.zeros((len(used), len(labels)), dtype=np.float32)
+        b = np.zeros(len(labels), dtype=np.float32)
+        for _ in range(epochs):
+            logits = X @ W + b
+            logits -= logits.max(axis=1, keepdims=True)
+            P = np.exp(logits)
+            P /= P.sum(axis=1, keepdims=True)
+            G = (P - Y) / len(texts)
+            W -= lr * (X.T @ G + l2 * W)
+            b -= lr * G.sum(axis=0)
+
+        weights = np.zeros((self.dim, len(labels)), dtype=np.float32)
+        weights[used] = W
+        with self._lock:
+            self.labels = labels
+            self.weights, self.bias = weights, b
+            self.trained_on = len(texts)
+        return float(((X @ W + b).argmax(axis=1) == y).mean())
+
+    def probabilities(self, text):
+        idx, values = self._features(text)
+        with self._lock:
+            W, b = self.weights, self.bias
+        logits = values @ W[idx] + b
+        logits -= logits.max()
+        p = np.exp(logits)
+        return p / p.sum()
+
+    def predict(self, text):
+        """(command dict, probability) for ``text``, or None if not confident enough."""
+        if not self.ready:
+            return None
+        p = self.probabilities(text)
+        best = int(p.argmax())
+        self.predictions += 1
+        if p[best] < self.threshold:
+            return None
+        command = json.loads(self.labels[best])
+        if not guessable(command):  # a model saved before these were left out
+            return None
+        self.accepted += 1
+        if command["action"] == "conversation":
+            command["parameters"]["original"] = " ".join(text.lower().split())
+        command["confidence"] = round(float(p[best]), 3)
+        return command, float(p[best])
+
+    def save(self, path=MODEL_PATH):
+        with self._lock:
+            np.savez(path, weights=self.weights, bias=self.bias, idf=self.idf,
+                     labels=np.array(self.labels), meta=np.array([self.dim, self.trained_on]),
+                     ngrams=np.array(self.ngrams))
+
+    def load(self, path=MODEL_PATH):
+        try:
+            data = np.load(path, allow_pickle=False)
+            with self._lock:
+                self.dim, self.trained_on = (int(v) for v in data["meta"])
+                self.ngrams = tuple(int(n) for n in data["ngrams"])
+                self.weights, self.bias, self.idf = data["weights"], data["bias"], data["idf"]
+                self.labels = [str(label) for label in data["labels"]]
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Intent model unreadable, retrain it: {e}")
+            return False
+
+    def summary(self):
+        if not self.ready:
+            return "intent model not trained"
+        return (f"intent model: {len(self.labels)} commands from {self.trained_on} examples; "
+                f"{self.accepted}/{self.predictions} fallbacks accepted")
+
+
+def training_examples(processor, history=()):
+    """(texts, commands) from the processor's patterns and past utterances.
+
+    Every fixed phrase a pattern accepts (alternatives and optional words
+    spelled out) is labelled with what the patterns parse it to; phrases that
+    expect free text and commands that are not ``guessable`` are left out.
+    ``history`` texts are labelled the same way, which adds real wording
+    such as filler words.
+    """
+    texts, commands = [], []
+    for pats in processor.patterns.values():
+        for pattern, _action in pats:
+            for phrase, takes_argument in example_phrases(pattern):
+                if takes_argument:
+                    continue
+                command = processor.parse_patterns(phrase)
+                if command is not None and guessable(command):
+                    texts.append(phrase)
+                    commands.append(command)
+    labels = {_label(c) for c in commands}
+    for text in history:
+        command = processor.parse_patterns(processor.extract_command(text))
+        if command is not None and _label(command) in labels:
+            texts.append(text)
+            commands.append(command)
+    return texts, commands
+
+
+def train_from(processor, history=(), path=MODEL_PATH, **kwargs):
+    """Train a classifier for ``processor``, save it and return (classifier, accuracy, seconds)."""
+    start = time.perf_counter()
+    texts, commands = training_examples(processor, history)
+    classifier = IntentClassifier(**kwargs)
+    accuracy = classifier.train(texts, commands)
+    if path:
+        classifier.save(path)
+    return classifier, accuracy, time.perf_counter() - start
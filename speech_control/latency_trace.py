@@ -0,0 +1,112 @@
+"""
+Per-command latency tracing
+Every voice command carries a trace with perf_counter() timestamps for each
+stage (speech wait, endpointing, recognition, parsing, execution, status
+update, TTS), which is stored in SQLite and summarised as percentiles. The
+replay harness adds offline VAD and wake-word stages.
+"""
+
+import math
+import threading
+import time
+import uuid
+
+# (stage, start mark, end mark); a stage is reported when both marks exist
+STAGES = (
+    ("vad", "vad_start", "vad_end"),
+    ("wake", "wake_start", "wake_end"),
+    ("wait_for_speech", "listen_start", "speech_start"),
+    ("speech", "speech_start", "voice_end"),
+    ("endpoint", "voice_end", "segment_end"),
+    ("listen", "listen_start", "captured"),
+    ("recognize", "recognize_start", "recognize_end"),
+    ("parse", "parse_start", "parse_end"),
+    ("execute", "execute_start", "execute_end"),
+    ("status", "status_start", "status_end"),
+    ("tts_queue", "execute_end", "tts_start"),
+    ("tts", "tts_start", "tts_end"),
+)
+
+STAGE_NAMES = tuple(s[0] for s in STAGES) + ("voice_to_action", "total")
+
+
+class LatencyTrace:
+    """Timestamps for one command, identified by ``trace_id``."""
+
+    def __init__(self, source="voice"):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.source = source
+        self.created = time.time()
+        self.marks = {}
+        self.text = ""
+        self.history_id = None
+        self.info = {}  # non-timing details, e.g. which endpoint rule closed the utterance
+        self.waiting_for_tts = False
+        self._lock = threading.Lock()
+
+    def mark(self, name, at=None):
+        with self._lock:
+            self.marks[name] = time.perf_counter() if at is None else at
+
+    def span(self, stage):
+        """Context manager marking ``<stage>_start`` / ``<stage>_end``."""
+        return _Span(self, stage)
+
+    def durations(self):
+        """Stage name -> milliseconds for every stage that was recorded."""
+        with self._lock:
+            marks = dict(self.marks)
+        out = {}
+        for stage, start, end in STAGES:
+            if start in marks and end in marks:
+                out[stage] = (marks[end] - marks[start]) * 1000.0
+        heard = marks.get("voice_end", marks.get("captured"))
+        if heard is not None and "execute_end" in marks:
+            out["voice_to_action"] = (marks["execute_end"] - heard) * 1000.0
+        if marks:
+            out["total"] = (max(marks.values()) - min(marks.values())) * 1000.0
+        return out
+
+    def to_record(self):
+        base = min(self.marks.values()) if self.marks else 0.0
+        return {
+            "trace_id": self.trace_id,
+            "history_id": self.history_id,
+            "source": self.source,
+            "command_text": self.text,
+            "stages": self.durations(),
+            "marks": {k: round((v - base) * 1000.0, 2) for k, v in self.marks.items()},
+        }
+
+
+class _Span:
+    def __init__(self, trace, stage):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self.trace.mark(f"{self.stage}_start")
+        return self.trace
+
+    def __exit__(self, *exc):
+        self.trace.mark(f"{self.stage}_end")
+        return False
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(stage_dicts):
+    """List of per-trace {stage: ms} -> [(stage, count, p50, p90, p99, max)]."""
+    rows = []
+    for stage in STAGE_NAMES:
+        values = sorted(d[stage] for d in stage_dicts if stage in d)
+        if values:
+            rows.append((stage, len(values), percentile(values, 50), percentile(values, 90),
+                         percentile(values, 99), values[-1]))
+    return rows
@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, simpledialog
 import threading
 import queue
 import json
@@ -19,9 +19,27 @@ from pathlib import Path
 # Import theme configuration
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from launcher import theme_config
+from launcher.frame_scheduler import FrameScheduler
+from emotion_gesture.gesture_library import GestureLibrary, PoseRecorder, CustomGestureTrigger
+from emotion_gesture.custom_commands import CustomCommandTable
+from emotion_gesture.scroll_emitter import ScrollEmitter
+from emotion_gesture.two_hand import (stack_hands, primary_index, finger_states, TwoHandGestures,
+                                      THUMB, INDEX, MIDDLE, RING, PINKY)
 
 # Import AI personality module
 from ai_personality import AIPersonality
+from noise_floor import NoiseFloorEstimator, LatencyLog
+from audio_stream import AudioStream, BargeInDetector
+from endpointer import Endpointer
+from wake_word_spotter import WakeWordSpotter, strip_wake_word
+from recognizer_backends import create_backend, BackendUnavailable, LIVE_BACKENDS
+from command_pipeline import CommandPipeline
+from command_processor import EnhancedCommandProcessor, controller_call, run_plan
+from intent_classifier import IntentClassifier, train_from
+import tts_worker
+from tts_worker import TTSWorker
+from tts_cache import TTSCache
+from latency_trace import LatencyTrace, summarize
 
 # Hand-gesture stack
 import cv2
@@ -67,6 +85,8 @@ class ModernDarkSpeechApp:
         self.wake_word_active = False
         self.continuous_listening = False
         self.is_processing = False
+        self.enrolling = False
+        self.intent_training = False
 
         # Status vars
         self.status_var = tk.StringVar(value="Initializing…")
@@ -77,10 +97,16 @@ class ModernDarkSpeechApp:
         # refs set later
         self.logs_text = None
         self.history_tree = None
+        self.latency_tree = None
+        self.parse_cache_var = None
         self.commands_tree = None
         self.gesture_video_label = None
         self._gesture_ui_after = None
         self._last_gesture_image = None
+        # Latest (frame, overlay) from the gesture thread; overlays are drawn only when shown
+        self._pending_gesture_frame = None
+        self._gesture_tab_visible = False
+        self._window_mapped = True
 
         # Back-end components
         self.setup_components()
@@ -98,6 +124,10 @@ class ModernDarkSpeechApp:
 
         # responsive wraplength updates
         self.root.bind("<Configure>", self._on_resize)
+        # preview visibility (skip rendering when hidden or minimized)
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        self.root.bind("<Unmap>", self._on_root_map)
+        self.root.bind("<Map>", self._on_root_map)
 
         # auto-start listening
         self.root.after(1200, self.auto_start_voice_control)
@@ -110,9 +140,22 @@ class ModernDarkSpeechApp:
             self.db_manager = DatabaseManager()
             self.speech_engine = EnhancedSpeechEngine()
             self.command_processor = EnhancedCommandProcessor()
+            self._refresh_user_commands()
+            # update_database.py edits the commands table from outside the app
+            self._user_commands_stop = threading.Event()
+            threading.Thread(target=self._watch_user_commands, daemon=True).start()
+            # custom_commands.json, reloaded in the background when the file changes
+            self.custom_commands = CustomCommandTable(on_reload=self._on_custom_commands_reloaded)
+            self.custom_commands.start()
             self.system_controller = EnhancedSystemController()
             self.ai_personality = AIPersonality()  # Add AI personality
+            # Fixed replies are rendered to disk in the background and replayed from there
+            self.speech_engine.prewarm_tts(self.ai_personality.static_responses())
             
+            # Wake word detected -> command listener accepting speech
+            self.wake_latency = LatencyLog()
+            self.command_pipeline = None
+
             # Track last opened context (for context-aware search)
             self.last_opened_context = None
 
@@ -120,7 +163,8 @@ class ModernDarkSpeechApp:
             self.gesture_controller = HandGestureController(
                 on_started=lambda: self._gesture_ui(True),
                 on_stopped=lambda: self._gesture_ui(False),
-                on_error=lambda msg: self.safe_log_message(f"🛑 Gesture error: {msg}")
+                on_error=lambda msg: self.safe_log_message(f"🛑 Gesture error: {msg}"),
+                on_custom_gesture=self._on_custom_gesture
             )
 
             self.settings = {
@@ -135,8 +179,22 @@ class ModernDarkSpeechApp:
                 "camera_index": 0,
                 "camera_width": 640,
                 "camera_height": 480,
+                "camera_fps": 30,
+                "two_hand_mode": False,
+                "per_listen_calibration": False,
+                "recognizer_backend": "google",
+                "barge_in": True,
+                "adaptive_endpointing": True,
+                "intent_fallback_threshold": 0.2,
             }
             self.load_settings()
+            if self.settings.get("recognizer_backend") not in LIVE_BACKENDS:
+                self.settings["recognizer_backend"] = "google"
+            self.speech_engine.set_per_listen_calibration(self.settings.get("per_listen_calibration", False))
+            self.speech_engine.set_backend(self.settings.get("recognizer_backend", "google"))
+            self.speech_engine.set_barge_in(self.settings.get("barge_in", True))
+            self.speech_engine.set_adaptive_endpointing(self.settings.get("adaptive_endpointing", True))
+            self._load_intent_model()
         except Exception as e:
             print(f"Error initializing components: {e}")
 
@@ -352,6 +410,7 @@ class ModernDarkSpeechApp:
         self.tab_settings = ttk.Frame(self.notebook, style='Dark.TFrame')
         self.tab_logs = ttk.Frame(self.notebook, style='Dark.TFrame')
         self.tab_gesture = ttk.Frame(self.notebook, style='Dark.TFrame')
+        self.tab_latency = ttk.Frame(self.notebook, style='Dark.TFrame')
 
         self.notebook.add(self.tab_control, text="🎛️ Control")
         self.notebook.add(self.tab_commands, text="📋 Commands")
@@ -359,6 +418,7 @@ class ModernDarkSpeechApp:
         self.notebook.add(self.tab_settings, text="⚙️ Settings")
         self.notebook.add(self.tab_logs, text="📝 Logs")
         self.notebook.add(self.tab_gesture, text="🖐️ Virtual Mouse")  
+        self.notebook.add(self.tab_latency, text="⏱️ Latency")
 
         self._build_tab_control()
         self._build_tab_commands()
@@ -366,6 +426,7 @@ class ModernDarkSpeechApp:
         self._build_tab_settings()
         self._build_tab_logs()
         self._build_tab_gesture()  
+        self._build_tab_latency()
 
         # Footer
         footer = tk.Frame(main_container, bg=self.colors["bg_secondary"], bd=0, relief=tk.FLAT, height=40)
@@ -463,7 +524,13 @@ class ModernDarkSpeechApp:
         f = self.tab_commands
         f.grid_rowconfigure(1, weight=1)
         f.grid_columnconfigure(0, weight=1)
-        ttk.Label(f, text="📋 Available Voice Commands", style='Title.TLabel').grid(row=0, column=0, sticky="w", padx=15, pady=(15, 10))
+        header = ttk.Frame(f, style='Dark.TFrame')
+        header.grid(row=0, column=0, sticky="ew", padx=15, pady=(15, 10))
+        ttk.Label(header, text="📋 Available Voice Commands", style='Title.TLabel').pack(side="left")
+        tk.Button(header, text="🧠 Retrain Intent Model", font=("Segoe UI", 9),
+                  bg=self.colors["accent_secondary"], fg=self.colors["text_primary"],
+                  activebackground="#3a5a8c", bd=0, relief=tk.FLAT,
+                  command=self.retrain_intent_model, cursor="hand2", padx=12, pady=6).pack(side="right")
         card = tk.Frame(f, bg=self.colors["bg_tertiary"], bd=1, relief=tk.SOLID)
         card.grid(row=1, column=0, sticky="nsew", padx=15, pady=(0, 15))
         card.grid_rowconfigure(0, weight=1)
@@ -506,6 +573,50 @@ class ModernDarkSpeechApp:
         vs.grid(row=0, column=1, sticky="ns", padx=(0, 10), pady=10)
         self.load_history()
 
+    def _build_tab_latency(self):
+        f = self.tab_latency
+        f.grid_rowconfigure(1, weight=1)
+        f.grid_columnconfigure(0, weight=1)
+        header = ttk.Frame(f, style='Dark.TFrame')
+        header.grid(row=0, column=0, sticky="ew", padx=15, pady=(15, 10))
+        ttk.Label(header, text="⏱️ Command Latency", style='Title.TLabel').pack(side="left")
+        refresh_btn = tk.Button(header, text="🔄 Refresh", font=("Segoe UI", 9),
+                  bg=self.colors["accent_secondary"], fg="white",
+                  activebackground="#3a5a8c", bd=0, relief=tk.FLAT,
+                  command=self.load_latency, cursor="hand2", padx=12, pady=6)
+        refresh_btn.pack(side="right")
+        self.latency_info_var = tk.StringVar(value="")
+        tk.Label(header, textvariable=self.latency_info_var, font=("Segoe UI", 9),
+                 bg=self.colors["bg_primary"], fg=self.colors["text_muted"]).pack(side="right", padx=12)
+        card = tk.Frame(f, bg=self.colors["bg_tertiary"], bd=1, relief=tk.SOLID)
+        card.grid(row=1, column=0, sticky="nsew", padx=15, pady=(0, 15))
+        card.grid_rowconfigure(0, weight=1)
+        card.grid_columnconfigure(0, weight=1)
+        columns = ("Stage", "Count", "p50 (ms)", "p90 (ms)", "p99 (ms)", "Max (ms)")
+        self.latency_tree = ttk.Treeview(card, columns=columns, show="headings", style="Dark.Treeview")
+        for col in columns:
+            self.latency_tree.heading(col, text=col)
+            self.latency_tree.column(col, width=120, anchor="w")
+        vs = ttk.Scrollbar(card, orient=tk.VERTICAL, command=self.latency_tree.yview, style="Dark.Vertical.TScrollbar")
+        self.latency_tree.configure(yscrollcommand=vs.set)
+        self.latency_tree.grid(row=0, column=0, sticky="nsew", padx=(10, 0), pady=10)
+        vs.grid(row=0, column=1, sticky="ns", padx=(0, 10), pady=10)
+        self.load_latency()
+
+    def load_latency(self):
+        if not self.latency_tree or not self.latency_tree.winfo_exists():
+            return
+        try:
+            for i in self.latency_tree.get_children():
+                self.latency_tree.delete(i)
+            traces = self.db_manager.get_command_traces()
+            for stage, count, p50, p90, p99, worst in summarize([t["stages"] for t in traces]):
+                self.latency_tree.insert("", "end", values=(
+                    stage, count, f"{p50:.0f}", f"{p90:.0f}", f"{p99:.0f}", f"{worst:.0f}"))
+            self.latency_info_var.set(f"Last {len(traces)} commands")
+        except Exception:
+            pass
+
     def _build_tab_settings(self):
         f = self.tab_settings
         f.grid_columnconfigure(1, weight=1)
@@ -547,27 +658,58 @@ class ModernDarkSpeechApp:
         tk.Entry(res_frame, textvariable=self.camera_h_var, width=8,
                  font=("Segoe UI", 10), bg=self.colors["bg_hover"], fg=self.colors["text_primary"],
                  insertbackground=self.colors["text_primary"]).pack(side="left")
+        tk.Label(res_frame, text="  @ ", font=("Segoe UI", 10),
+                 bg=self.colors["bg_tertiary"], fg=self.colors["text_primary"]).pack(side="left")
+        self.camera_fps_var = tk.IntVar(value=int(self.settings.get("camera_fps", 30)))
+        tk.Spinbox(res_frame, from_=5, to=60, textvariable=self.camera_fps_var, width=4,
+                   font=("Segoe UI", 10), bg=self.colors["bg_hover"], fg=self.colors["text_primary"],
+                   insertbackground=self.colors["text_primary"]).pack(side="left")
+        tk.Label(res_frame, text=" fps", font=("Segoe UI", 10),
+                 bg=self.colors["bg_tertiary"], fg=self.colors["text_primary"]).pack(side="left")
+        self.two_hand_var = tk.BooleanVar(value=bool(self.settings.get("two_hand_mode", False)))
+        tk.Checkbutton(res_frame, text="Two hands", variable=self.two_hand_var,
+                       bg=self.colors["bg_tertiary"], fg=self.colors["text_primary"],
+                       selectcolor=self.colors["bg_hover"], activebackground=self.colors["bg_tertiary"]).pack(side="left", padx=(12, 0))
 
         # Wake word setting
         tk.Label(card, text="Wake Word", font=("Segoe UI", 10),
                  bg=self.colors["bg_tertiary"], fg=self.colors["text_primary"]).grid(row=4, column=0, sticky="w", padx=12, pady=(8, 4))
         self.wake_word_var = tk.StringVar(value=self.settings.get("wake_word", "nova"))
-        self.wake_word_entry = tk.Entry(card, textvariable=self.wake_word_var, width=20,
+        wake_frame = tk.Frame(card, bg=self.colors["bg_tertiary"])
+        wake_frame.grid(row=4, column=1, sticky="w", padx=12, pady=(8, 4))
+        self.wake_word_entry = tk.Entry(wake_frame, textvariable=self.wake_word_var, width=20,
                                         font=("Segoe UI", 10), bg=self.colors["bg_hover"], fg=self.colors["text_primary"],
                                         insertbackground=self.colors["text_primary"])
-        self.wake_word_entry.grid(row=4, column=1, sticky="w", padx=12, pady=(8, 4))
+        self.wake_word_entry.pack(side="left")
+        tk.Button(wake_frame, text="🎙️ Enroll Wake Word", font=("Segoe UI", 9),
+                  bg=self.colors["accent_secondary"], fg=self.colors["text_primary"],
+                  activebackground="#3a5a8c", bd=0, relief=tk.FLAT, padx=10, pady=4,
+                  cursor="hand2", command=self.enroll_wake_word).pack(side="left", padx=(8, 0))
+
+        # Recognizer backend
+        tk.Label(card, text="Recognizer", font=("Segoe UI", 10),
+                 bg=self.colors["bg_tertiary"], fg=self.colors["text_primary"]).grid(row=5, column=0, sticky="w", padx=12, pady=(8, 4))
+        self.backend_var = tk.StringVar(value=self.settings.get("recognizer_backend", "google"))
+        ttk.Combobox(card, textvariable=self.backend_var, values=list(LIVE_BACKENDS), state="readonly",
+                     width=12).grid(row=5, column=1, sticky="w", padx=12, pady=(8, 4))
 
         self.voice_feedback_var = tk.BooleanVar(value=self.settings["voice_feedback"])
         tk.Checkbutton(card, text="Enable Voice Feedback", variable=self.voice_feedback_var,
                        bg=self.colors["bg_tertiary"], fg=self.colors["text_primary"],
                        selectcolor=self.colors["bg_hover"], activebackground=self.colors["bg_tertiary"]).grid(
-            row=5, column=0, columnspan=2, sticky="w", padx=12, pady=(10, 8)
+            row=6, column=0, columnspan=2, sticky="w", padx=12, pady=(10, 8)
+        )
+        self.barge_in_var = tk.BooleanVar(value=self.settings.get("barge_in", True))
+        tk.Checkbutton(card, text="Stop speaking when I talk (barge-in)", variable=self.barge_in_var,
+                       bg=self.colors["bg_tertiary"], fg=self.colors["text_primary"],
+                       selectcolor=self.colors["bg_hover"], activebackground=self.colors["bg_tertiary"]).grid(
+            row=7, column=0, columnspan=2, sticky="w", padx=12, pady=(0, 8)
         )
 
         tk.Button(card, text="💾 Save Settings", font=("Segoe UI", 9, "bold"),
                   bg=self.colors["accent_primary"], fg="white",
                   activebackground="#1b6d2e", bd=0, relief=tk.FLAT, padx=16, pady=10,
-                  cursor="hand2", command=self.save_settings).grid(row=6, column=0, columnspan=2, sticky="w", padx=12, pady=(8, 12))
+                  cursor="hand2", command=self.save_settings).grid(row=8, column=0, columnspan=2, sticky="w", padx=12, pady=(8, 12))
 
     def _build_tab_logs(self):
         f = self.tab_logs
@@ -581,6 +723,9 @@ class ModernDarkSpeechApp:
                   activebackground="#b12a27", bd=0, relief=tk.FLAT,
                   command=self.clear_logs, cursor="hand2", padx=12, pady=6)
         clear_btn.pack(side="right")
+        self.parse_cache_var = tk.StringVar(value="")
+        tk.Label(header, textvariable=self.parse_cache_var, font=("Segoe UI", 9),
+                 bg=self.colors["bg_primary"], fg=self.colors["text_muted"]).pack(side="right", padx=12)
         card = tk.Frame(f, bg=self.colors["bg_tertiary"], bd=1, relief=tk.SOLID)
         card.grid(row=1, column=0, sticky="nsew", padx=15, pady=(0, 15))
         card.grid_rowconfigure(0, weight=1)
@@ -607,6 +752,16 @@ class ModernDarkSpeechApp:
         header = ttk.Frame(f, style='Dark.TFrame')
         header.grid(row=0, column=0, sticky="ew", padx=15, pady=(15, 10))
         ttk.Label(header, text="🖐️ Virtual Mouse — Live", style='Title.TLabel').pack(side="left")
+        remove_btn = tk.Button(header, text="🗑️ Remove Gesture", font=("Segoe UI", 9),
+                  bg=self.colors["accent_danger"], fg="white",
+                  activebackground="#b12a27", bd=0, relief=tk.FLAT,
+                  command=self.remove_custom_gesture, cursor="hand2", padx=12, pady=6)
+        remove_btn.pack(side="right")
+        record_btn = tk.Button(header, text="➕ Record Gesture", font=("Segoe UI", 9),
+                  bg=self.colors["accent_primary"], fg="white",
+                  activebackground="#3a5a8c", bd=0, relief=tk.FLAT,
+                  command=self.record_custom_gesture, cursor="hand2", padx=12, pady=6)
+        record_btn.pack(side="right", padx=(0, 8))
 
         # Video container
         card = tk.Frame(f, bg=self.colors["bg_tertiary"], bd=1, relief=tk.SOLID)
@@ -620,7 +775,8 @@ class ModernDarkSpeechApp:
         # Info footer
         info = tk.Label(f, text=("Raise all five fingers to toggle gesture tracking ON/OFF • "
                                  "Thumb+Index short hold=LeftClick / long=Drag • "
-                                 "Index+Pinky=RightClick • Index+Middle+Ring=Scroll"),
+                                 "Index+Pinky=RightClick • Index+Middle+Ring=Scroll • "
+                                 "Hold a recorded pose to run its action"),
                         bg=self.colors["bg_secondary"], fg=self.colors["text_secondary"], font=("Segoe UI", 9))
         info.grid(row=2, column=0, sticky="ew", padx=15, pady=(0, 15))
 
@@ -638,6 +794,18 @@ class ModernDarkSpeechApp:
         except Exception:
             pass
 
+    def _on_tab_changed(self, _event=None):
+        try:
+            self._gesture_tab_visible = self.notebook.select() == str(self.tab_gesture)
+            if self.notebook.select() == str(self.tab_latency):
+                self.load_latency()
+        except Exception:
+            self._gesture_tab_visible = False
+
+    def _on_root_map(self, event):
+        if event.widget is self.root:
+            self._window_mapped = event.type == tk.EventType.Map
+
     # ------------------------
     # Voice control
     # ------------------------
@@ -681,13 +849,18 @@ class ModernDarkSpeechApp:
         consecutive_errors = 0
         
         while self.wake_word_active and not self.continuous_listening:
+            if self.enrolling:
+                time.sleep(0.2)
+                continue
             try:
                 result = self.speech_engine.listen_for_wake_word(self.settings["wake_word"], timeout=3)
                 if result:
                     text, confidence = result
                     self.safe_log_message(f"🎯 Wake word detected: '{text}' (confidence: {confidence:.2f})")
                     if confidence >= self.settings["wake_word_sensitivity"]:
-                        self.activate_continuous_listening()
+                        # "nova open chrome": run the rest now instead of listening again
+                        command = self.speech_engine.strip_wake_word(text, self.settings["wake_word"])
+                        self.activate_continuous_listening(initial_command=(command, confidence) if command else None)
                         break
                     else:
                         self.safe_log_message(f"⚠️ Wake word confidence too low: {confidence:.2f} < {self.settings['wake_word_sensitivity']}")
@@ -704,35 +877,224 @@ class ModernDarkSpeechApp:
                 else:
                     time.sleep(0.5)
 
-    def activate_continuous_listening(self):
+    def enroll_wake_word(self):
+        if self.enrolling:
+            return
+        word = self.wake_word_entry.get().strip().lower() or self.settings["wake_word"]
+        threading.Thread(target=self._enroll_wake_word_worker, args=(word,), daemon=True).start()
+
+    def _enroll_wake_word_worker(self, word, takes=3):
+        """Record a few takes of the wake word for the offline spotter."""
+        self.enrolling = True
+        try:
+            spotter = self.speech_engine.get_wake_spotter(word)
+            spotter.clear()
+            for i in range(takes):
+                self.safe_log_message(f"🎙️ Enrollment: say '{word.upper()}' ({i + 1}/{takes})…")
+                self.status_bar_var.set(f"🎙️ Say '{word.upper()}' ({i + 1}/{takes})")
+                audio = self.speech_engine.record_sample(timeout=6)
+                if audio is None:
+                    self.safe_log_message("⚠️ Enrollment: no speech heard, stopping")
+                    break
+                spotter.enroll(audio.get_raw_data(), audio.sample_rate, audio.sample_width)
+            if spotter.is_ready():
+                self.safe_log_message(f"✅ Wake word '{word}' enrolled ({len(spotter.templates)} samples, "
+                                      f"threshold {spotter.threshold:.1f}) — detection now runs offline")
+        except Exception as e:
+            self.safe_log_message(f"❌ Enrollment error: {e}")
+        finally:
+            self.enrolling = False
+
+    def activate_continuous_listening(self, initial_command=None):
+        """Enter command mode; ``initial_command`` is (text, confidence) spoken with the wake word."""
+        self.wake_latency.mark()
         self.continuous_listening = True
         self.stop_listening_btn.config(state="normal")
         self.update_system_status("🟢 CONTINUOUS LISTENING", self.colors["accent_primary"])
         self.status_var.set("Continuous Listening Active")
         self.current_command_var.set("Listening continuously for commands…")
         self.status_bar_var.set("🎤 Continuous listening active — Speak commands directly")
-        if self.settings["voice_feedback"]:
-            threading.Thread(target=lambda: self.speech_engine.speak("Yes? Continuous listening activated."), daemon=True).start()
-        threading.Thread(target=self.continuous_listening_worker, daemon=True).start()
+        if self.settings["voice_feedback"] and not initial_command:
+            self.speech_engine.speak("Yes? Continuous listening activated.", priority=tts_worker.URGENT, preempt=True)
+        threading.Thread(target=self.continuous_listening_worker, args=(initial_command,), daemon=True).start()
         self.safe_log_message("🟢 Continuous listening activated")
 
-    def continuous_listening_worker(self):
+    def continuous_listening_worker(self, initial_command=None):
+        # capture -> recognize -> parse -> execute, each stage on its own thread,
+        # so speech during a slow command is queued instead of dropped
+        self.command_pipeline = CommandPipeline(
+            capture=self._pipeline_capture,
+            recognize=self._pipeline_recognize,
+            parse=self._pipeline_parse,
+            execute=self._pipeline_execute,
+            on_error=lambda stage, e: self.safe_log_message(f"❌ Listening error ({stage}): {e}"),
+        )
+        self.command_pipeline.start()
+        if initial_command:
+            text, confidence = initial_command
+            self.safe_log_message(f"🎤 Command with wake word: '{text}'")
+            self.command_pipeline.submit("parse", {"text": text, "confidence": confidence,
+                                                   "captured_at": time.perf_counter()})
         while self.continuous_listening and self.wake_word_active:
-            try:
-                if not self.is_processing:
-                    result = self.speech_engine.listen_for_command(timeout=self.settings["command_timeout"])
+            time.sleep(0.1)
+        self.command_pipeline.stop()
+        self.safe_log_message(f"🔴 Continuous listening stopped ({self.command_pipeline.summary()})")
+        self.safe_log_message(f"⏱️ Endpointing: {self.speech_engine.endpointer.summary()}")
+        self.safe_log_message(f"⚡ {self.command_processor.cache_summary()}")
+        if self.command_processor.classifier is not None:
+            self.safe_log_message(f"🧠 {self.command_processor.classifier.summary()}")
+        if self.wake_word_active:
+            # Only now: the pipeline's capture no longer competes for the stream's segments
+            self.wake_word_thread = threading.Thread(target=self.wake_word_worker, daemon=True)
+            self.wake_word_thread.start()
+            self.safe_log_message("🟡 Returned to wake word mode")
+
+    def _pipeline_capture(self):
+        trace = LatencyTrace(source="voice")
+        pipeline = self.command_pipeline
+        audio = self.speech_engine.capture_utterance(timeout=self.settings["command_timeout"], trace=trace,
+                                                     cancelled=lambda: not pipeline.is_running())
+        latency = self.wake_latency.ready(self.speech_engine.ready_at)
+        if latency is not None:
+            if self.speech_engine.per_listen_calibration:
+                mode = "per-listen calibration"
+            elif self.speech_engine.audio_stream is not None:
+                mode = "continuous stream"
+            else:
+                mode = "tracked noise floor"
+            self.safe_log_message(f"⏱️ Wake→ready {latency * 1000:.0f} ms ({mode}; {self.wake_latency.summary()})")
+        if audio is None:
+            return None
+        return {"audio": audio, "trace": trace}
+
+    def _pipeline_recognize(self, item):
+        with item["trace"].span("recognize"):
+            result = self.speech_engine.recognize(item["audio"])
+        if not result:
+            return None
+        text, confidence = result
+        self.safe_log_message(f"🎤 Command: '{text}' (conf: {confidence:.2f})")
+        if confidence < self.settings["confidence_threshold"]:
+            self.safe_log_message(f"⚠️ Low confidence: {confidence:.2f}")
+            return None
+        if item["trace"].info.get("endpoint") == "short" and (
+                Endpointer.wants_continuation(text) or self.command_processor.incomplete_command(text)):
+            text = self._merge_continuation(item, text)
+        item.update(text=text, confidence=confidence)
+        return item
+
+    def _merge_continuation(self, item, text):
+        """A short pause ended "type …"/"search …"/"open …": wait for the rest and join it."""
+        engine = self.speech_engine
+        endpointer = engine.endpointer
+        voice_end = item["trace"].marks.get("voice_end", time.perf_counter())
+        endpointer.set_mode("dictation")
+        try:
+            deadline = time.perf_counter() + endpointer.long_pause + 6.0
+            while time.perf_counter() < deadline and self.continuous_listening:
+                nxt = self.command_pipeline.take("recognize", timeout=0.1)
+                if nxt is not None:
+                    gap = nxt["trace"].marks.get("speech_start", voice_end) - voice_end
+                    if gap > endpointer.long_pause:
+                        self.command_pipeline.putback("recognize", nxt)
+                        break
+                    with item["trace"].span("recognize_continuation"):
+                        result = engine.recognize(nxt["audio"])
                     if result:
-                        text, confidence = result
-                        self.safe_log_message(f"🎤 Command: '{text}' (conf: {confidence:.2f})")
-                        if confidence >= self.settings["confidence_threshold"]:
-                            self.process_command(text, confidence)
-                        else:
-                            self.safe_log_message(f"⚠️ Low confidence: {confidence:.2f}")
-                time.sleep(0.2)
-            except Exception as e:
-                self.safe_log_message(f"❌ Listening error: {e}")
-                time.sleep(1)
-        self.safe_log_message("🔴 Continuous listening stopped")
+                        self.safe_log_message(f"➕ Continued: '{result[0]}'")
+                        text = f"{text} {result[0]}"
+                    break
+                stream = engine.audio_stream
+                if (stream is None or not stream.speaking) and time.perf_counter() - voice_end > endpointer.long_pause:
+                    break
+        finally:
+            endpointer.set_mode("command")
+        return text
+
+    def _refresh_user_commands(self):
+        """Recompile the database commands only when the commands table changed."""
+        processor = self.command_processor
+        version = self.db_manager.get_commands_version()
+        if processor.user_commands_version is not None and version in (None, processor.user_commands_version):
+            return
+        count = processor.load_user_commands(self.db_manager.get_all_commands(), version if version is not None else -1)
+        print(f"Loaded {count} database commands (version {version})")
+
+    def _watch_user_commands(self, interval=2.0):
+        # Checks the table version on a timer, not on every utterance
+        while not self._user_commands_stop.wait(interval):
+            self._refresh_user_commands()
+
+    def _load_intent_model(self):
+        """Fallback for utterances no pattern matches: the saved model, else train one."""
+        classifier = IntentClassifier(threshold=self.settings.get("intent_fallback_threshold", 0.2))
+        if classifier.load():
+            self.command_processor.set_classifier(classifier)
+            print(classifier.summary())
+        else:
+            self.retrain_intent_model()
+
+    def retrain_intent_model(self):
+        if self.intent_training:
+            return
+        self.intent_training = True
+        threading.Thread(target=self._retrain_intent_model_worker, daemon=True).start()
+
+    def _retrain_intent_model_worker(self):
+        """Train on the pattern phrases plus utterances that worked before."""
+        try:
+            self._refresh_user_commands()
+            history = [row["command"] for row in self.db_manager.get_command_history(limit=2000)
+                       if row["status"] == "success"]
+            classifier, accuracy, seconds = train_from(
+                self.command_processor, history,
+                threshold=self.settings.get("intent_fallback_threshold", 0.2))
+            self.command_processor.set_classifier(classifier)
+            self.safe_log_message(f"🧠 Intent model trained on {classifier.trained_on} examples "
+                                  f"({len(classifier.labels)} commands, {accuracy:.0%} fit) in {seconds:.1f}s")
+        except Exception as e:
+            self.safe_log_message(f"❌ Intent model training failed: {e}")
+        finally:
+            self.intent_training = False
+
+    def _on_custom_commands_reloaded(self, table):
+        # "Did you mean" knows the custom commands too
+        self.command_processor.add_known_commands(table.names(), "custom", literal=True)
+        if table.reloads > 1:
+            self.safe_log_message(f"🔄 Custom commands reloaded ({len(table.names())} commands)")
+
+    def parse_command(self, text):
+        """(command_result, extracted command) for ``text``.
+
+        A custom command spoken exactly (ignoring case and filler words) wins
+        over the patterns, so "start coding" is not read as opening an app.
+        """
+        custom = self.custom_commands.lookup(text)
+        if custom is None:
+            custom = self.custom_commands.lookup(self.command_processor.extract_command(text))
+        if custom is not None:
+            return {"action": "custom", "parameters": {"name": custom}, "confidence": 1.0}, custom
+        steps = self.command_processor.plan_command(text)
+        if steps:
+            # Several commands in one utterance, executed as one plan
+            command_result = {"action": "plan", "parameters": {"steps": steps},
+                              "confidence": min(step["command"]["confidence"] for step in steps)}
+            return command_result, " → ".join(step["text"] for step in steps)
+        command_result = self.command_processor.process_command(text)
+        if self.parse_cache_var is not None:
+            # Tk variables belong to the UI thread; this runs on the parse stage
+            summary = f"⚡ {self.command_processor.cache_summary()}"
+            self.root.after(0, self.parse_cache_var.set, summary)
+        return command_result, command_result.get("extracted")
+
+    def _pipeline_parse(self, item):
+        trace = item.setdefault("trace", LatencyTrace(source="voice"))
+        with trace.span("parse"):
+            item["command"], item["extracted"] = self.parse_command(item["text"])
+        return item
+
+    def _pipeline_execute(self, item):
+        self.handle_command(item["text"], item["confidence"], item["command"], item["extracted"], item["trace"])
 
     def stop_continuous_listening(self):
         self.continuous_listening = False
@@ -742,9 +1104,6 @@ class ModernDarkSpeechApp:
             self.status_var.set("Listening for Wake Word")
             self.current_command_var.set(f"Say '{self.settings['wake_word'].upper()}' to activate…")
             self.status_bar_var.set(f"🎯 Say '{self.settings['wake_word'].upper()}' to activate")
-            self.wake_word_thread = threading.Thread(target=self.wake_word_worker, daemon=True)
-            self.wake_word_thread.start()
-            self.safe_log_message("🟡 Returned to wake word mode")
 
     def manual_listen(self):
         if not self.is_processing:
@@ -765,7 +1124,7 @@ class ModernDarkSpeechApp:
                 else:
                     self.safe_log_message(f"⚠️ Low confidence: {confidence:.2f}")
                     if self.settings["voice_feedback"]:
-                        threading.Thread(target=lambda: self.speech_engine.speak("Sorry, I didn't catch that clearly."), daemon=True).start()
+                        self.speech_engine.speak("Sorry, I didn't catch that clearly.", preempt=True)
             else:
                 self.safe_log_message("⏰ Manual listening timeout")
         except Exception as e:
@@ -783,17 +1142,28 @@ class ModernDarkSpeechApp:
                 self.status_bar_var.set("System inactive — Use controls to interact")
 
     def process_command(self, text, confidence):
+        """Parse and execute one utterance synchronously (manual input, tests, gestures)."""
+        trace = LatencyTrace(source="manual")
+        try:
+            with trace.span("parse"):
+                command_result, extracted_cmd = self.parse_command(text)
+        except Exception as e:
+            self.safe_log_message(f"❌ Processing error: {e}")
+            return
+        self.handle_command(text, confidence, command_result, extracted_cmd, trace)
+
+    def handle_command(self, text, confidence, command_result, extracted_cmd=None, trace=None):
+        """Execute an already parsed command: history, action, spoken feedback."""
+        trace = trace or LatencyTrace(source="direct")
+        trace.text = text
         try:
             self.is_processing = True
             self.current_command_var.set(f"Processing: '{text}'")
             self.status_bar_var.set(f"🧠 Processing: {text}")
             history_id = self.db_manager.add_command_history(text, confidence)
-            
-            # Process and extract actual command
-            command_result = self.command_processor.process_command(text)
+            trace.history_id = history_id
             
             # Show if command was cleaned/extracted
-            extracted_cmd = self.command_processor.last_extracted_command
             if extracted_cmd and extracted_cmd != text.lower().strip():
                 self.safe_log_message(f"💡 Extracted: '{extracted_cmd}' from '{text}'")
             
@@ -803,44 +1173,67 @@ class ModernDarkSpeechApp:
                 response, emotion = self.ai_personality.get_greeting_response(conv_type)
                 self.safe_log_message(f"💬 {text} → {response}")
                 if self.settings["voice_feedback"]:
-                    threading.Thread(target=lambda: self.speech_engine.speak(response, emotion), daemon=True).start()
-                self.db_manager.update_command_status(history_id, "success")
+                    self._speak_reply(response, emotion, trace)
+                self._update_status(history_id, "success", trace)
                 return
             
             if command_result["action"] != "unknown":
-                success = self.execute_command(command_result)
+                with trace.span("execute"):
+                    success = self.execute_command(command_result)
                 status = "success" if success else "failed"
-                self.db_manager.update_command_status(history_id, status)
+                self._update_status(history_id, status, trace)
                 
                 # Generate friendly AI response
                 if self.settings["voice_feedback"]:
                     action_type = command_result["action"]
                     action_data = self._get_action_description(command_result)
                     response, emotion = self.ai_personality.get_action_response(action_type, action_data, success)
-                    threading.Thread(target=lambda: self.speech_engine.speak(response, emotion), daemon=True).start()
+                    self._speak_reply(response, emotion, trace)
                 
                 self.safe_log_message(f"✅ {text} — {status}")
             else:
                 # Intelligent unknown command handling
-                self.db_manager.update_command_status(history_id, "unknown")
+                self._update_status(history_id, "unknown", trace)
                 suggestion = self.command_processor.suggest_command(text)
                 
                 if suggestion:
                     self.safe_log_message(f"🤔 I heard '{text}'. Did you mean '{suggestion}'?")
                     if self.settings["voice_feedback"]:
                         response = f"I'm not sure about '{text}'. Did you mean {suggestion}?"
-                        threading.Thread(target=lambda: self.speech_engine.speak(response, "curious"), daemon=True).start()
+                        self._speak_reply(response, "curious", trace)
                 else:
                     self.safe_log_message(f"🤔 I heard '{text}', but I'm not sure what to do with it.")
                     if self.settings["voice_feedback"]:
                         response = f"I heard '{text}', but I'm not sure what to do with that. Try saying 'help' for available commands."
-                        threading.Thread(target=lambda: self.speech_engine.speak(response, "confused"), daemon=True).start()
+                        self._speak_reply(response, "confused", trace)
         except Exception as e:
             self.safe_log_message(f"❌ Processing error: {e}")
         finally:
             self.is_processing = False
+            if not trace.waiting_for_tts:
+                self._finish_trace(trace)
             if self.notebook.index(self.notebook.select()) == 2 and self.history_tree:
                 self.load_history()
+
+    def _update_status(self, history_id, status, trace):
+        with trace.span("status"):
+            self.db_manager.update_command_status(history_id, status)
+
+    def _speak_reply(self, text, emotion, trace):
+        """Speak a command reply; the trace is stored once the reply was played."""
+        trace.waiting_for_tts = True
+        done = self.speech_engine.speak(
+            text, emotion, preempt=True,
+            on_start=lambda: trace.mark("tts_start"),
+            on_done=lambda: (trace.mark("tts_end"), self._finish_trace(trace)))
+        if done is None:
+            trace.waiting_for_tts = False
+
+    def _finish_trace(self, trace):
+        try:
+            self.db_manager.add_command_trace(trace.to_record())
+        except Exception as e:
+            print(f"Trace save error: {e}")
     
     def _get_action_description(self, command_result):
         """Extract action description for friendly responses"""
@@ -890,35 +1283,16 @@ class ModernDarkSpeechApp:
             action = command_result["action"]
             params = command_result["parameters"]
 
-            if action == "application":
-                if params.get("close"):
-                    return self.system_controller.close_application(params.get("app", ""))
-                else:
-                    # Reset context when opening non-web apps
-                    app = params.get("app", "")
-                    if app not in ['chrome', 'firefox', 'edge', 'browser']:
-                        self.last_opened_context = None
-                    return self.system_controller.open_application(app)
-
-            if action == "web":
-                # Pass context if available
-                context = getattr(self, 'last_opened_context', None)
-                return self.system_controller.web_search(params, context)
-
-            if action == "system":
-                return self.system_controller.execute_system_command(params)
-
-            if action == "file":
-                return self.system_controller.file_operation(params)
+            if action == "application" and not params.get("close"):
+                # Reset context when opening non-web apps
+                if params.get("app", "") not in ['chrome', 'firefox', 'edge', 'browser']:
+                    self.last_opened_context = None
 
-            if action == "media":
-                return self.system_controller.media_control(params)
+            if action == "custom":
+                return self.custom_commands.run(params.get("name", ""))
 
-            if action == "network":
-                return self.system_controller.network_operation(params)
-
-            if action == "utility":
-                return self.system_controller.utility_operation(params)
+            if action == "plan":
+                return run_plan(params["steps"], self._execute_step, log=self.safe_log_message)
 
             # hand-gesture mouse controller
             if action == "gesture":
@@ -930,32 +1304,26 @@ class ModernDarkSpeechApp:
                 else:
                     return self.stop_gesture() if self.gesture_controller.is_running() else self.start_gesture()
 
-            # window management
-            if action == "window":
-                return self.system_controller.window_operation(params)
-
-            # page scrolling
-            if action == "scroll":
-                direction = params.get("direction", "down")
-                return self.system_controller.scroll_page(direction)
-
-            # typing/dictation
-            if action == "typing":
-                return self.system_controller.typing_operation(params)
-
-            # text selection
-            if action == "selection":
-                return self.system_controller.selection_operation(params)
-
-            # arrow key navigation
-            if action == "navigation":
-                return self.system_controller.navigation_operation(params)
-
-            return False
+            # Everything else maps onto one system controller call
+            call = controller_call(command_result, getattr(self, 'last_opened_context', None))
+            if call is None:
+                return False
+            method, args = call
+            return getattr(self.system_controller, method)(*args)
         except Exception as e:
             self.safe_log_message(f"❌ Execution error: {e}")
             return False
 
+    def _execute_step(self, command_result):
+        """One step of a compound command; conversational steps are answered."""
+        if command_result["action"] == "conversation":
+            response, emotion = self.ai_personality.get_greeting_response(command_result["parameters"].get("type", ""))
+            self.safe_log_message(f"💬 {response}")
+            if self.settings["voice_feedback"]:
+                self.speech_engine.speak(response, emotion)
+            return True
+        return self.execute_command(command_result)
+
     # ------------------------
     # Gesture button + helpers (embedded)
     # ------------------------
@@ -969,16 +1337,19 @@ class ModernDarkSpeechApp:
         cam_index = int(self.camera_index_var.get()) if hasattr(self, "camera_index_var") else int(self.settings.get("camera_index", 0))
         cam_w = int(self.camera_w_var.get()) if hasattr(self, "camera_w_var") else int(self.settings.get("camera_width", 640))
         cam_h = int(self.camera_h_var.get()) if hasattr(self, "camera_h_var") else int(self.settings.get("camera_height", 480))
+        cam_fps = int(self.camera_fps_var.get()) if hasattr(self, "camera_fps_var") else int(self.settings.get("camera_fps", 30))
+        two_hands = bool(self.two_hand_var.get()) if hasattr(self, "two_hand_var") else bool(self.settings.get("two_hand_mode", False))
 
         # Provide a frame queue to the controller so it pushes frames back
-        ok, err = self.gesture_controller.start(camera_index=cam_index, width=cam_w, height=cam_h, frame_consumer=self._on_gesture_frame)
+        ok, err = self.gesture_controller.start(camera_index=cam_index, width=cam_w, height=cam_h, fps=cam_fps,
+                                                frame_consumer=self._on_gesture_frame, two_hands=two_hands)
         if not ok:
             self.safe_log_message(f"🛑 Could not start hand gesture mouse: {err}")
             messagebox.showerror("Camera / Permission Error", f"Could not access the webcam.\n\nDetails:\n{err}\n\nTips:\n• Close other apps using the camera\n• Try a different Camera Index in Settings\n• Allow camera access in OS privacy settings", parent=self.root)
             return False
         self.safe_log_message("🖐️ Hand-gesture mouse: started")
         if self.settings.get("voice_feedback"):
-            threading.Thread(target=lambda: self.speech_engine.speak("Hand gesture mouse enabled"), daemon=True).start()
+            self.speech_engine.speak("Hand gesture mouse enabled", priority=tts_worker.LOW)
         # Switch to the Gesture tab to show the view
         try:
             idx = self.notebook.tabs().index(self.notebook.select())
@@ -994,8 +1365,9 @@ class ModernDarkSpeechApp:
         ok = self.gesture_controller.stop()
         if ok:
             self.safe_log_message("🖐️ Hand-gesture mouse: stopped")
+            self.safe_log_message(f"⏱️ Gesture loop: {self.gesture_controller.scheduler.summary()}")
             if self.settings.get("voice_feedback"):
-                threading.Thread(target=lambda: self.speech_engine.speak("Hand gesture mouse disabled"), daemon=True).start()
+                self.speech_engine.speak("Hand gesture mouse disabled", priority=tts_worker.LOW)
         # stop UI update loop if running
         if self._gesture_ui_after is not None:
             try:
@@ -1016,37 +1388,80 @@ class ModernDarkSpeechApp:
             self.gesture_status_label.config(fg=self.colors["text_primary"])
             self.gesture_toggle_btn.config(text="🖐️ Gesture: OFF", bg=self.colors["bg_hover"], fg=self.colors["text_primary"])
 
-    def _on_gesture_frame(self, frame_bgr):
-        """Called (from worker thread) with latest BGR frame. We enqueue UI update on main thread."""
-        if self.gesture_video_label is None or not self.gesture_video_label.winfo_exists():
+    def record_custom_gesture(self):
+        """Ask for a name + action, then capture the held pose from the live camera."""
+        if not self.gesture_controller.is_running():
+            messagebox.showinfo("Record Gesture", "Start the Virtual Mouse first so the camera can see your hand.", parent=self.root)
             return
-
-        # Convert BGR -> RGB -> ImageTk and show in label safely on main thread
-        def _update():
-            # Check if label still exists
-            if not self.gesture_video_label.winfo_exists():  # type: ignore
-                return
-            # Fit label size while preserving AR
-            lbl_w = max(self.gesture_video_label.winfo_width(), 320)  # type: ignore
-            lbl_h = max(self.gesture_video_label.winfo_height(), 240)  # type: ignore
-            # Convert to PIL Image
-            frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
-            # Use Image.Resampling.LANCZOS for newer PIL versions, fallback to Image.LANCZOS
-            try:
-                img.thumbnail((lbl_w, lbl_h), Image.Resampling.LANCZOS)
-            except AttributeError:
-                img.thumbnail((lbl_w, lbl_h), Image.LANCZOS)  # type: ignore
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.gesture_video_label.configure(image=imgtk)  # type: ignore
-            # Keep a reference to avoid garbage collection
-            self._last_gesture_image = imgtk
-
-        # throttle UI updates to ~30 FPS using after
+        name = simpledialog.askstring("Record Gesture", "Gesture name:", parent=self.root)
+        if not name:
+            return
+        commands = self.custom_commands.commands
+        prompt = ("Action to run when the pose is held.\n"
+                  "Type a voice command (e.g. 'volume up') or one of the custom commands:\n  "
+                  + "\n  ".join(commands.keys()))
+        action = simpledialog.askstring("Record Gesture", prompt, parent=self.root)
+        if not action:
+            return
+        action = action.strip()
+        binding = {"type": "command" if action in commands else "speech", "target": action}
+        self.gesture_controller.record_pose(name.strip(), binding)
+        self.safe_log_message(f"⏺️ Recording gesture '{name}' → {action}: hold the pose steady…")
+
+    def remove_custom_gesture(self):
+        names = self.gesture_controller.gesture_library.names()
+        if not names:
+            messagebox.showinfo("Remove Gesture", "No custom gestures recorded yet.", parent=self.root)
+            return
+        name = simpledialog.askstring("Remove Gesture", "Gesture to remove:\n  " + "\n  ".join(names), parent=self.root)
+        if name and self.gesture_controller.gesture_library.remove_template(name.strip()):
+            self.safe_log_message(f"🗑️ Removed custom gesture '{name.strip()}'")
+
+    def _on_custom_gesture(self, template):
+        """Called from the gesture thread when a recorded pose is held."""
+        binding = template.get("binding", {})
+        target = binding.get("target", "")
+        self.safe_log_message(f"✋ Custom gesture '{template['name']}' → {target}")
+        if binding.get("type") == "command":
+            self.custom_commands.run(target)
+        elif target:
+            threading.Thread(target=self.process_command, args=(target, 1.0), daemon=True).start()
+
+    def _on_gesture_frame(self, frame_rgb, overlay):
+        """Called (from worker thread) with the latest RGB frame and its overlay data.
+
+        Frames are dropped here while the preview is hidden; otherwise only the
+        newest one is kept and drawn on the Tk thread at ~30 FPS.
+        """
+        if not (self._gesture_tab_visible and self._window_mapped):
+            return
+        self._pending_gesture_frame = (frame_rgb, overlay)
         if self._gesture_ui_after is None:
-            _update()
-            self._gesture_ui_after = self.root.after(33, self._clear_gesture_after_flag)
-        # else: we already scheduled a draw; next frame will schedule again
+            self._gesture_ui_after = self.root.after(0, self._render_gesture_frame)
+
+    def _render_gesture_frame(self):
+        pending, self._pending_gesture_frame = self._pending_gesture_frame, None
+        try:
+            if pending is not None and self.gesture_video_label is not None and self.gesture_video_label.winfo_exists():
+                frame_rgb, overlay = pending
+                HandGestureController.draw_overlay(frame_rgb, overlay)
+                # Fit label size while preserving AR
+                lbl_w = max(self.gesture_video_label.winfo_width(), 320)
+                lbl_h = max(self.gesture_video_label.winfo_height(), 240)
+                img = Image.fromarray(frame_rgb)
+                # Use Image.Resampling.LANCZOS for newer PIL versions, fallback to Image.LANCZOS
+                try:
+                    img.thumbnail((lbl_w, lbl_h), Image.Resampling.LANCZOS)
+                except AttributeError:
+                    img.thumbnail((lbl_w, lbl_h), Image.LANCZOS)  # type: ignore
+                imgtk = ImageTk.PhotoImage(image=img)
+                self.gesture_video_label.configure(image=imgtk)
+                # Keep a reference to avoid garbage collection
+                self._last_gesture_image = imgtk
+        except Exception as e:
+            print(f"Gesture preview error: {e}")
+        # throttle UI updates to ~30 FPS
+        self._gesture_ui_after = self.root.after(33, self._clear_gesture_after_flag)
 
     def _clear_gesture_after_flag(self):
         self._gesture_ui_after = None
@@ -1081,6 +1496,7 @@ class ModernDarkSpeechApp:
         if not self.commands_tree or not self.commands_tree.winfo_exists():
             return
         try:
+            self._refresh_user_commands()
             for i in self.commands_tree.get_children():
                 self.commands_tree.delete(i)
             for cmd in self.db_manager.get_all_commands():
@@ -1128,11 +1544,19 @@ class ModernDarkSpeechApp:
         try:
             self.settings["confidence_threshold"] = self.confidence_var.get()
             self.settings["voice_feedback"] = self.voice_feedback_var.get()
+            self.settings["barge_in"] = bool(self.barge_in_var.get())
+            self.speech_engine.set_barge_in(self.settings["barge_in"])
             self.settings["wake_word"] = self.wake_word_entry.get().lower()
             # camera prefs
             self.settings["camera_index"] = int(self.camera_index_var.get())
             self.settings["camera_width"] = int(self.camera_w_var.get())
             self.settings["camera_height"] = int(self.camera_h_var.get())
+            self.settings["camera_fps"] = int(self.camera_fps_var.get())
+            self.settings["two_hand_mode"] = bool(self.two_hand_var.get())
+            self.settings["recognizer_backend"] = self.backend_var.get()
+            active = self.speech_engine.set_backend(self.settings["recognizer_backend"])
+            if active != self.settings["recognizer_backend"]:
+                self.safe_log_message(f"⚠️ Recognizer '{self.settings['recognizer_backend']}' unavailable, using {active}")
 
             self.db_manager.save_settings(self.settings)
             messagebox.showinfo("Settings Saved", "Settings have been saved successfully!", parent=self.root)
@@ -1198,8 +1622,14 @@ class ModernDarkSpeechApp:
             self.continuous_listening = False
             if hasattr(self, "gesture_controller") and self.gesture_controller.is_running():
                 self.gesture_controller.stop()
+            if hasattr(self, "gesture_controller"):
+                self.gesture_controller.gesture_library.flush()  # a just-recorded pose may still be saving
             if hasattr(self, "speech_engine"):
                 self.speech_engine.cleanup()
+            if hasattr(self, "custom_commands"):
+                self.custom_commands.stop()
+            if hasattr(self, "_user_commands_stop"):
+                self._user_commands_stop.set()
         except Exception:
             pass
         self.root.destroy()
@@ -1248,26 +1678,42 @@ class CameraStream:
 
 
 class HandGestureController:
-    """Start/stop a background thread that runs Virtual Mouse and streams annotated frames via callback."""
-    def __init__(self, on_started=None, on_stopped=None, on_error=None):
+    """Start/stop a background thread that runs Virtual Mouse and streams frames + overlay data via callback."""
+    def __init__(self, on_started=None, on_stopped=None, on_error=None, on_custom_gesture=None):
         self.thread = None
         self.running = False
         self.stream = None
         self.on_started = on_started or (lambda: None)
         self.on_stopped = on_stopped or (lambda: None)
         self.on_error = on_error or (lambda _msg: None)
+        self.on_custom_gesture = on_custom_gesture or (lambda _template: None)
         self._lock = threading.Lock()
         self._frame_consumer = None
+        self.scheduler = FrameScheduler(30)
+        self.two_hands = False
+        # User-recorded static poses (see emotion_gesture/gesture_library.py)
+        self.gesture_library = GestureLibrary()
+        self._recorder = None
+
+    def record_pose(self, name, binding, frames=15):
+        """Capture the next few frames of the visible hand as a custom gesture."""
+        self._recorder = PoseRecorder(self.gesture_library, name, binding, frames=frames)
+
+    def is_recording(self):
+        return self._recorder is not None
 
     def is_running(self):
         with self._lock:
             return self.running
 
-    def start(self, camera_index=0, width=640, height=480, frame_consumer=None):
+    def start(self, camera_index=0, width=640, height=480, fps=30, frame_consumer=None, two_hands=False):
         with self._lock:
             if self.running:
                 return True, None
             self._frame_consumer = frame_consumer
+            self.two_hands = bool(two_hands)
+            self.scheduler.set_fps(fps)
+            self.scheduler.reset()
             try:
                 self.stream = CameraStream(src=camera_index, width=width, height=height)
             except Exception as e:
@@ -1293,10 +1739,39 @@ class HandGestureController:
         self.on_stopped()
         return True
 
+    def _push_frame(self, frame_rgb, hands, is_active, extra=""):
+        # Hand the untouched frame plus what to draw on it; the consumer renders
+        # the overlay only if the frame is actually displayed
+        if not self._frame_consumer:
+            return
+        try:
+            self._frame_consumer(frame_rgb, {"hands": hands, "active": is_active, "extra": extra})
+        except Exception:
+            pass
+
+    @staticmethod
+    def draw_overlay(frame_rgb, overlay):
+        """Draw landmarks and the status chip onto an RGB frame (display stage only)."""
+        mp_hands = mp.solutions.hands  # type: ignore
+        mp_drawing = mp.solutions.drawing_utils  # type: ignore
+        landmark_spec = mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2, circle_radius=2)
+        for hand_landmarks in overlay.get("hands") or []:
+            mp_drawing.draw_landmarks(frame_rgb, hand_landmarks, mp_hands.HAND_CONNECTIONS, landmark_spec)
+        # annotate status on frame corner (RGB colours)
+        is_active = overlay.get("active")
+        color = (0, 200, 0) if is_active else (200, 0, 0)
+        txt = "ACTIVE" if is_active else "IDLE (show 5 fingers to toggle)"
+        cv2.rectangle(frame_rgb, (8, 8), (310, 40), (20, 20, 20), -1)
+        cv2.putText(frame_rgb, f"Gesture: {txt}", (16, 32),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
+        if overlay.get("extra"):
+            cv2.putText(frame_rgb, overlay["extra"], (16, 62),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 200, 0), 2, cv2.LINE_AA)
+
     def _run(self):
+        scroller = None
         try:
             mp_hands = mp.solutions.hands  # type: ignore
-            mp_drawing = mp.solutions.drawing_utils  # type: ignore
 
             screen_w, screen_h = pyautogui.size()
             mid_screen_y = screen_h // 2
@@ -1317,32 +1792,22 @@ class HandGestureController:
             RIGHT_CLICK_HOLD = 0.3
             RIGHT_CLICK_COOLDOWN = 1.0
 
-            SCROLL_INTERVAL = 0.15
+            # Scrolling runs on its own fixed-rate thread; the loop only posts displacement
             V_DEADZONE = max(30, int(screen_h * 0.05))
-            last_scroll_time = 0.0
+            scroller = ScrollEmitter(pyautogui.scroll, deadzone=V_DEADZONE / mid_screen_y)
+            scroller.start()
 
-            def landmarks_to_array(lm_list):
-                return np.array([[lm.x, lm.y, lm.z] for lm in lm_list])
+            custom_trigger = CustomGestureTrigger()
+            custom_label = ""
 
-            def finger_extended_np(lms, tip_idx, pip_idx):
-                return lms[tip_idx, 1] < lms[pip_idx, 1]
-
-            def thumb_really_extended_np(lms):
-                tip = lms[mp_hands.HandLandmark.THUMB_TIP.value]
-                ip = lms[mp_hands.HandLandmark.THUMB_IP.value]
-                index_tip = lms[mp_hands.HandLandmark.INDEX_FINGER_TIP.value]
-                return tip[0] < ip[0] and abs(tip[0] - index_tip[0]) > 0.08
-
-            def five_fingers_extended(lms):
-                tips = [8, 12, 16, 20]
-                pips = [6, 10, 14, 18]
-                return all(finger_extended_np(lms, t, p) for t, p in zip(tips, pips)) and thumb_really_extended_np(lms)
+            two_hands = self.two_hands
+            two_hand_gestures = TwoHandGestures()
 
             with mp_hands.Hands(
                 model_complexity=1,
                 min_detection_confidence=0.6,
                 min_tracking_confidence=0.6,
-                max_num_hands=1
+                max_num_hands=2 if two_hands else 1
             ) as hands:
                 last_push = 0
                 push_interval = 0.02  # ~50 fps max push to UI
@@ -1353,6 +1818,7 @@ class HandGestureController:
                     return
 
                 while self.is_running():
+                    self.scheduler.begin()
                     frame = self.stream.read()
                     if frame is None:
                         continue
@@ -1363,22 +1829,46 @@ class HandGestureController:
                     now = time.time()
 
                     if results.multi_hand_landmarks:
-                        hand_landmarks = results.multi_hand_landmarks[0]
-                        lms = landmarks_to_array(hand_landmarks.landmark)
-                        mp_drawing.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+                        # All hands in one array; finger states for every hand in one pass
+                        stack, labels = stack_hands(results)
+                        states = finger_states(stack, labels if two_hands else None)
+                        primary = primary_index(labels) if two_hands else 0
+                        lms = stack[primary]
+
+                        # Recording a custom pose takes over the frame
+                        recorder = self._recorder
+                        if recorder is not None:
+                            if recorder.add(lms):
+                                print(f"Custom gesture recorded: {recorder.name}")
+                                self._recorder = None
+                            self._push_frame(rgb_frame, results.multi_hand_landmarks, is_active,
+                                             f"REC {recorder.name} {len(recorder.samples)}/{recorder.frames}")
+                            self.scheduler.wait()
+                            continue
 
                         # Toggle tracking with 5 fingers
-                        if five_fingers_extended(lms) and (now - last_toggle_time > 1.5):
+                        if states[primary].all() and (now - last_toggle_time > 1.5):
                             is_active = not is_active
                             print("Virtual Mouse " + ("Activated" if is_active else "Deactivated"))
                             last_toggle_time = now
 
-                        if is_active:
-                            index_ext = finger_extended_np(lms, 8, 6)
-                            middle_ext = finger_extended_np(lms, 12, 10)
-                            ring_ext = finger_extended_np(lms, 16, 14)
-                            pinky_ext = finger_extended_np(lms, 20, 18)
-                            thumb_ext = thumb_really_extended_np(lms)
+                        # Two-hand gestures take priority over the one-hand ones
+                        if is_active and two_hands:
+                            for action, direction in two_hand_gestures.update(stack, states, now):
+                                if action == "zoom":
+                                    mod = "command" if platform.system() == "Darwin" else "ctrl"
+                                    pyautogui.hotkey(mod, "+" if direction > 0 else "-")
+                                    print("Zoom In" if direction > 0 else "Zoom Out")
+                                elif action == "scroll":
+                                    pyautogui.scroll(50 * direction)
+                                    print("Two-hand Scroll " + ("Up" if direction > 0 else "Down"))
+                            custom_label = two_hand_gestures.active or custom_label
+
+                        if not is_active or two_hand_gestures.active:
+                            scroller.release()
+                        else:
+                            thumb_ext, index_ext, middle_ext, ring_ext, pinky_ext = (
+                                bool(v) for v in states[primary, [THUMB, INDEX, MIDDLE, RING, PINKY]])
 
                             # cursor movement
                             index_tip = lms[mp_hands.HandLandmark.INDEX_FINGER_TIP.value]
@@ -1429,16 +1919,31 @@ class HandGestureController:
                                 right_click_start = None
                                 right_click_active = False
 
-                            # vertical scroll
-                            if index_ext and middle_ext and ring_ext and not pinky_ext and (now - last_scroll_time >= SCROLL_INTERVAL):
+                            # vertical scroll: speed follows distance from mid-screen
+                            scroll_gesture = index_ext and middle_ext and ring_ext and not pinky_ext
+                            if scroll_gesture:
                                 avg_y = np.mean([lms[8, 1], lms[12, 1], lms[16, 1]])
-                                finger_y_screen = int(avg_y * screen_h)
-                                dy = finger_y_screen - mid_screen_y
-                                if abs(dy) > V_DEADZONE:
-                                    pyautogui.scroll(-50 if dy > 0 else 50)
-                                    print("Scroll Down" if dy > 0 else "Scroll Up")
-                                last_scroll_time = now
+                                scroller.feed((avg_y * screen_h - mid_screen_y) / mid_screen_y)
+                            else:
+                                scroller.release()
+
+                            # custom poses, only when no built-in gesture is held
+                            if len(self.gesture_library) and not (left_click_gesture or rock_sign or scroll_gesture or dragging):
+                                template, _dist = self.gesture_library.match(lms)
+                                custom_label = template["name"] if template else ""
+                                fired = custom_trigger.update(template, now)
+                                if fired:
+                                    print(f"Custom Gesture: {fired['name']}")
+                                    try:
+                                        self.on_custom_gesture(fired)
+                                    except Exception as e:
+                                        print(f"Custom gesture action failed: {e}")
+                            else:
+                                custom_label = ""
+                                custom_trigger.update(None, now)
                     else:
+                        two_hand_gestures.reset()
+                        scroller.release()
                         try:
                             prev_mouse_x, prev_mouse_y = pyautogui.position()
                         except Exception:
@@ -1446,21 +1951,17 @@ class HandGestureController:
 
                     # Push frame to UI at limited rate
                     t = time.time()
-                    if self._frame_consumer and (t - last_push) >= push_interval:
+                    if (t - last_push) >= push_interval:
                         last_push = t
-                        # annotate status on frame corner
-                        color = (0, 200, 0) if is_active else (0, 0, 200)
-                        txt = "ACTIVE" if is_active else "IDLE (show 5 fingers to toggle)"
-                        cv2.rectangle(frame, (8, 8), (310, 40), (20, 20, 20), -1)
-                        cv2.putText(frame, f"Gesture: {txt}", (16, 32),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
-                        try:
-                            self._frame_consumer(frame)
-                        except Exception:
-                            pass
+                        self._push_frame(rgb_frame, results.multi_hand_landmarks, is_active, custom_label)
+
+                    self.scheduler.wait()
         except Exception as e:
             self.on_error(str(e))
         finally:
+            self._recorder = None
+            if scroller is not None:
+                scroller.stop()
             try:
                 if self.stream:
                     self.stream.release()
@@ -1476,53 +1977,232 @@ class HandGestureController:
 # =========================
 class EnhancedSpeechEngine:
     def __init__(self):
+        self.tts = None
         try:
             self.recognizer = sr.Recognizer()
             self.microphone = sr.Microphone()
             
             # Optimize recognizer settings for better wake word detection
             self.recognizer.energy_threshold = 300  # Lower for more sensitivity
-            self.recognizer.dynamic_energy_threshold = True
-            self.recognizer.dynamic_energy_adjustment_damping = 0.15
-            self.recognizer.dynamic_energy_ratio = 1.5
+            # The noise floor is tracked by NoiseFloorEstimator instead of sr's own adjuster
+            self.recognizer.dynamic_energy_threshold = False
+            self.noise_floor = NoiseFloorEstimator(ratio=1.5)
+            self.noise_floor.bind(self.recognizer)
+            # Legacy behaviour (1 s calibration before every listen), kept for latency comparison
+            self.per_listen_calibration = False
+            self.barge_in_enabled = True
+            # Pause that ends an utterance adapts to phrase length and speaker (stream capture only)
+            self.endpointer = Endpointer(base_pause=self.recognizer.pause_threshold)
+            self.ready_at = None  # perf_counter() when the last listen started accepting speech
+            self.audio_stream = None
+            self.wake_spotter = None  # offline keyword spotter, built for the configured wake word
+            self.backend = create_backend("google", self.recognizer)
+            self.last_result = None
             self.recognizer.pause_threshold = 0.8  # Wait 0.8s of silence before considering phrase complete
             self.recognizer.operation_timeout = None  # No operation timeout
             self.recognizer.phrase_threshold = 0.3  # Minimum phrase duration
             self.recognizer.non_speaking_duration = 0.5  # Non-speaking duration required to consider phrase complete
             
-            self.tts_engine = pyttsx3.init()
-            voices = self.tts_engine.getProperty('voices')
+            # One thread owns the TTS engine; speak() only queues
+            self.tts = TTSWorker(self._create_tts_engine, cache=TTSCache())
+            self.tts.start()
             
-            if len(voices) > 1:
-                self.tts_engine.setProperty('voice', voices[1].id)
-            self.tts_engine.setProperty("rate", 165)
-            self.tts_engine.setProperty("volume", 0.9)
-            
-            # Initial ambient noise adjustment
+            # Initial ambient noise adjustment (once); the estimator tracks it from here on
             print("Calibrating microphone for ambient noise...")
             with self.microphone as source:
                 self.recognizer.adjust_for_ambient_noise(source, duration=2)
+            self.noise_floor.seed(self.recognizer.energy_threshold)
             print(f"Microphone calibrated. Energy threshold: {self.recognizer.energy_threshold}")
+            self.start_audio_stream()
         except Exception as e:
             print(f"Speech engine initialization error: {e}")
 
+    def start_audio_stream(self):
+        """Open the microphone once and keep segmenting utterances in the background."""
+        if self.audio_stream is not None:
+            return True
+        try:
+            # Our own replies are gated out of the segments instead of being transcribed
+            stream = AudioStream(self.microphone, noise_floor=self.noise_floor,
+                                 pause=self.recognizer.pause_threshold, endpointer=self.endpointer,
+                                 is_playing=lambda: self.tts is not None and self.tts.speaking)
+            # Stop talking as soon as the user starts speaking over us
+            stream.barge_in = BargeInDetector(
+                self.noise_floor,
+                is_playing=lambda: self.tts is not None and self.tts.speaking,
+                on_barge_in=self._on_barge_in)
+            stream.barge_in.enabled = self.barge_in_enabled
+            stream.start()
+            self.audio_stream = stream
+            print("Microphone stream open (continuous capture)")
+            return True
+        except Exception as e:
+            print(f"Continuous capture unavailable, falling back to per-listen capture: {e}")
+            self.audio_stream = None
+            return False
+
+    def set_adaptive_endpointing(self, enabled):
+        self.endpointer.enabled = bool(enabled)
+
+    def set_barge_in(self, enabled):
+        self.barge_in_enabled = bool(enabled)
+        if self.audio_stream is not None and self.audio_stream.barge_in is not None:
+            self.audio_stream.barge_in.enabled = self.barge_in_enabled
+
+    def _on_barge_in(self):
+        if self.tts is not None and self.tts.barge_in():
+            print("Barge-in: speech stopped for new user input")
+
+    def stop_audio_stream(self):
+        if self.audio_stream is not None:
+            self.audio_stream.stop()
+            self.audio_stream = None
+
+    def set_per_listen_calibration(self, enabled):
+        """Switch to the legacy open/calibrate/listen cycle (for latency comparison)."""
+        self.per_listen_calibration = bool(enabled)
+        if self.per_listen_calibration:
+            self.stop_audio_stream()
+        else:
+            self.start_audio_stream()
+
+    def _capture(self, timeout, phrase_time_limit, trace=None, cancelled=None):
+        """Next utterance as sr.AudioData; raises sr.WaitTimeoutError if none arrives.
+
+        With a LatencyTrace, marks when listening started, when speech
+        started and stopped, and when the utterance was handed over. On the
+        stream, ``cancelled()`` is checked every 0.2 s; once it is true the
+        wait ends and a segment that arrives anyway is left on the stream for
+        the next reader.
+        """
+        if self.audio_stream is not None:
+            # Always-open stream: anything said since the last call is already queued
+            self.ready_at = time.perf_counter()
+            deadline = time.perf_counter() + timeout
+            segment = None
+            while segment is None and not (cancelled is not None and cancelled()):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                step = remaining if cancelled is None else min(0.2, remaining)
+                segment = self.audio_stream.next_segment(timeout=step, max_length=phrase_time_limit)
+            if segment is not None and cancelled is not None and cancelled():
+                self.audio_stream.unread(segment)
+                segment = None
+            if segment is None:
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+            if trace is not None:
+                started = segment.started if segment.started is not None else self.ready_at
+                trace.mark("listen_start", min(self.ready_at, started))
+                trace.mark("speech_start", started)
+                trace.mark("voice_end", segment.voice_ended)
+                trace.mark("segment_end", segment.ended)
+                trace.mark("captured")
+                trace.info["endpoint"] = segment.endpoint
+            return sr.AudioData(segment.pcm, segment.sample_rate, segment.sample_width)
+        # Per-listen capture cannot tell our own voice from the user's: let the reply finish first
+        while self.tts is not None and self.tts.speaking:
+            time.sleep(0.05)
+        with self.microphone as source:
+            self._prepare_source(source)
+            if trace is not None:
+                trace.mark("listen_start", self.ready_at)
+            audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+            if trace is not None:
+                trace.mark("captured")
+            return audio
+
+    def _prepare_source(self, source):
+        """Get an open microphone ready to listen without blocking on calibration."""
+        if self.per_listen_calibration:
+            self.recognizer.adjust_for_ambient_noise(source, duration=1)
+            self.noise_floor.seed(self.recognizer.energy_threshold)
+        else:
+            # Every chunk listen() reads also updates the noise floor / energy_threshold
+            source.stream = self.noise_floor.tap(source.stream, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+        self.ready_at = time.perf_counter()
+
+    def set_backend(self, name):
+        """Select the recognizer backend ("google", "offline" or "fake")."""
+        self.backend = create_backend(name, self.recognizer)
+        return self.backend.name
+
+    def _transcribe(self, audio):
+        """Run the selected backend. Returns a RecognitionResult or None."""
+        result = self.backend.transcribe(audio)
+        self.last_result = result
+        return result
+
+    def get_wake_spotter(self, wake_word):
+        word = wake_word.lower().strip()
+        if self.wake_spotter is None or self.wake_spotter.wake_word != word:
+            self.wake_spotter = WakeWordSpotter(word)
+            if not self.wake_spotter.is_ready():
+                print(f"No enrollment samples for '{word}': wake word detection uses online recognition")
+        return self.wake_spotter
+
+    def capture_utterance(self, timeout=5, phrase_time_limit=6, trace=None, cancelled=None):
+        """Next utterance as sr.AudioData, or None if nothing was said in time (or ``cancelled()``)."""
+        try:
+            return self._capture(timeout, phrase_time_limit=phrase_time_limit, trace=trace, cancelled=cancelled)
+        except sr.WaitTimeoutError:
+            return None
+
+    def record_sample(self, timeout=6):
+        """Capture one utterance (used for wake word enrollment)."""
+        return self.capture_utterance(timeout, phrase_time_limit=3)
+
+    def recognize(self, audio):
+        """Transcribe captured audio. Returns (text, confidence) or None."""
+        try:
+            result = self._transcribe(audio)
+        except BackendUnavailable as e:
+            print(f"Recognizer unavailable: {e}")
+            return None
+        if result is None:
+            return None
+        return (result.text, result.confidence)
+
     def listen_for_wake_word(self, wake_word, timeout=3):
         try:
-            with self.microphone as source:
-                # Brief ambient adjustment before each listen
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
-                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=3)
-            
-            # Try Google Speech Recognition with retry
-            try:
-                text = str(self.recognizer.recognize_google(audio)).lower()
-            except sr.RequestError:
-                # Network error, try once more
-                try:
-                    text = str(self.recognizer.recognize_google(audio)).lower()
-                except:
+            audio = self._capture(timeout, phrase_time_limit=3)
+
+            spotter = self.get_wake_spotter(wake_word)
+            if spotter.is_ready():
+                # Local check first: idle audio never goes to the network
+                hit, local_conf, _dist = spotter.detect_pcm(audio.get_raw_data(), audio.sample_rate, audio.sample_width)
+                if not hit:
                     return None
-            
+                try:
+                    result = self._transcribe(audio)
+                except BackendUnavailable:
+                    result = None
+                if result is None:
+                    # Offline or unintelligible: trust the local spotter
+                    return (wake_word.lower(), local_conf)
+                return self._match_wake_text(result.text, wake_word)
+
+            try:
+                result = self._transcribe(audio)
+            except BackendUnavailable:
+                return None
+            if result is None:
+                return None
+            return self._match_wake_text(result.text, wake_word)
+        except sr.WaitTimeoutError:
+            return None
+        except sr.UnknownValueError:
+            return None
+        except Exception as e:
+            print(f"Wake word error: {e}")
+            return None
+
+    def strip_wake_word(self, text, wake_word):
+        """What was said around the wake word: "hey nova, open chrome" -> "open chrome"."""
+        return strip_wake_word(text, wake_word)
+
+    def _match_wake_text(self, text, wake_word):
+        try:
             # More flexible wake word matching
             wake_parts = wake_word.lower().strip().split()
             text_clean = text.strip()
@@ -1540,10 +2220,6 @@ class EnhancedSpeechEngine:
             if matches >= len(wake_parts) - 1 and matches > 0:
                 return (text, 0.75)
             
-            return None
-        except sr.WaitTimeoutError:
-            return None
-        except sr.UnknownValueError:
             return None
         except Exception as e:
             print(f"Wake word error: {e}")
@@ -1551,22 +2227,8 @@ class EnhancedSpeechEngine:
 
     def listen_for_command(self, timeout=5):
         try:
-            with self.microphone as source:
-                # Quick ambient adjustment
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
-                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=6)
-            
-            # Try Google Speech Recognition with retry
-            try:
-                text = str(self.recognizer.recognize_google(audio)).lower()
-            except sr.RequestError:
-                # Network error, try once more
-                try:
-                    text = str(self.recognizer.recognize_google(audio)).lower()
-                except:
-                    return None
-            
-            return (text, 0.85)
+            audio = self._capture(timeout, phrase_time_limit=6)
+            return self.recognize(audio)
         except sr.WaitTimeoutError:
             return None
         except sr.UnknownValueError:
@@ -1575,668 +2237,46 @@ class EnhancedSpeechEngine:
             print(f"Command listening error: {e}")
             return None
 
-    def speak(self, text, emotion="neutral", interruptible=True):
-        """Enhanced speak with emotion-based voice modulation and interrupt capability"""
-        try:
-            # Adjust voice properties based on emotion for more natural responses
-            original_rate = self.tts_engine.getProperty('rate')
-            original_volume = self.tts_engine.getProperty('volume')
-            
-            if emotion == "excited":
-                self.tts_engine.setProperty('rate', 180)
-                self.tts_engine.setProperty('volume', 0.95)
-            elif emotion == "friendly":
-                self.tts_engine.setProperty('rate', 165)
-                self.tts_engine.setProperty('volume', 0.9)
-            elif emotion == "calm":
-                self.tts_engine.setProperty('rate', 150)
-                self.tts_engine.setProperty('volume', 0.85)
-            elif emotion == "serious":
-                self.tts_engine.setProperty('rate', 145)
-                self.tts_engine.setProperty('volume', 0.9)
-            
-            if interruptible:
-                # For long text, check for interruption every few words
-                words = text.split()
-                chunk_size = 10  # Speak 10 words at a time
-                for i in range(0, len(words), chunk_size):
-                    chunk = ' '.join(words[i:i+chunk_size])
-                    self.tts_engine.say(chunk)
-                    self.tts_engine.runAndWait()
-                    # Short pause to check for interruption
-                    import time
-                    time.sleep(0.1)
-            else:
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
-            
-            # Restore original settings
-            self.tts_engine.setProperty('rate', original_rate)
-            self.tts_engine.setProperty('volume', original_volume)
-        except Exception:
-            pass
-    
+    @staticmethod
+    def _create_tts_engine():
+        engine = pyttsx3.init()
+        voices = engine.getProperty('voices')
+        if len(voices) > 1:
+            engine.setProperty('voice', voices[1].id)
+        engine.setProperty("rate", 165)
+        engine.setProperty("volume", 0.9)
+        return engine
+
+    def speak(self, text, emotion="neutral", interruptible=True, priority=tts_worker.NORMAL, preempt=False,
+              on_start=None, on_done=None):
+        """Queue text for the TTS worker with emotion-based voice modulation.
+
+        Returns immediately; the returned Event is set once the text was spoken
+        (or dropped). ``preempt`` cuts off whatever is being said now.
+        """
+        if self.tts is None:
+            return None
+        return self.tts.say(text, emotion, priority=priority, preempt=preempt, interruptible=interruptible,
+                            on_start=on_start, on_done=on_done)
+
+    def prewarm_tts(self, items):
+        """Queue fixed replies for background rendering into the TTS cache."""
+        if self.tts is None:
+            return 0
+        return self.tts.prewarm(items)
+
     def stop_speaking(self):
-        """Stop current speech immediately"""
-        try:
-            self.tts_engine.stop()
-        except Exception:
-            pass
+        """Stop current speech immediately and drop queued messages"""
+        if self.tts is not None:
+            self.tts.interrupt()
 
     def cleanup(self):
         try:
-            self.tts_engine.stop()
+            self.tts.stop()
+            print(f"TTS: {self.tts.summary()}")
         except Exception:
             pass
-
-
-class EnhancedCommandProcessor:
-    def __init__(self):
-        self.last_extracted_command = None  # Store last extracted command for logging
-        self.load_enhanced_patterns()
-
-    def load_enhanced_patterns(self):
-        # IMPORTANT: Pattern order matters! Specific patterns MUST come before generic ones
-        # Order: typing → selection → web → window → scroll → conversation → system → application → rest
-        self.patterns = {
-            # 1. TYPING - Most specific, check first
-            "typing": [
-                (r"type (.+)", "type_text"),
-                (r"write (.+)", "type_text"),
-                (r"enter (.+)", "type_text"),
-                (r"new line", "new_line"),
-                (r"new paragraph", "new_paragraph"),
-                (r"press enter", "press_enter"),
-                (r"press tab", "press_tab"),
-                (r"(press |hit )?space(bar)?", "press_space"),
-                (r"backspace", "backspace"),
-                (r"delete", "delete_key"),
-                # Keyboard numbers
-                (r"press (\d+|zero|one|two|three|four|five|six|seven|eight|nine)", "press_key"),
-                (r"type (\d+|zero|one|two|three|four|five|six|seven|eight|nine)", "press_key"),
-                # Navigation keys
-                (r"go back", "press_back"),
-                (r"go forward", "press_forward"),
-                (r"press escape", "press_escape"),
-                (r"escape", "press_escape"),
-            ],
-            
-            # 2. SELECTION - Text selection and OCR-based screen selection
-            "selection": [
-                # General screen selection using OCR (must come first)
-                (r"select (.+)", "select_on_screen"),
-                (r"click (.+)", "select_on_screen"),
-                (r"choose (.+)", "select_on_screen"),
-                # Specific text selection (more specific patterns after general)
-                (r"select next (word|line|character)", "select_next"),
-                (r"select previous (word|line|character)", "select_previous"),
-                (r"select all", "select_all"),
-            ],
-            
-            # 3. WEB - Website opening and search (BEFORE application)
-            "web": [
-                # Website opening (must come before search to take priority)
-                (r"(open|launch|go to) youtube", "open_website"),
-                (r"(open|launch|go to) facebook", "open_website"),
-                (r"(open|launch|go to) twitter", "open_website"),
-                (r"(open|launch|go to) instagram", "open_website"),
-                (r"(open|launch|go to) linkedin", "open_website"),
-                (r"(open|launch|go to) whatsapp( web)?", "open_website"),
-                (r"(open|launch|go to) github", "open_website"),
-                (r"(open|launch|go to) gmail", "open_website"),
-                (r"(open|launch|go to) amazon", "open_website"),
-                (r"open netflix", "open_website"),
-                (r"open spotify", "open_website"),
-                (r"open reddit", "open_website"),
-                (r"open pinterest", "open_website"),
-                (r"open tiktok", "open_website"),
-                (r"open snapchat", "open_website"),
-                (r"open telegram", "open_website"),
-                (r"open discord", "open_website"),
-                (r"open slack", "open_website"),
-                (r"open medium", "open_website"),
-                (r"open quora", "open_website"),
-                (r"open stack overflow", "open_website"),
-                (r"open maps", "open_website"),
-                (r"google maps", "open_website"),
-                (r"open drive", "open_website"),
-                (r"google drive", "open_website"),
-                # Web search (comes after website opening)
-                # Explicit Google searches (bypass context)
-                (r"search (.+) in google", "google_search"),
-                (r"google search (.+)", "google_search"),
-                (r"search google for (.+)", "google_search"),
-                # Browse always opens Google (not YouTube)
-                (r"browse (.+)", "browse_web"),
-                # Context-aware searches (YouTube if open, else Google)
-                (r"search for (.+)", "web_search"),
-                (r"search (.+)", "web_search"),
-                (r"google (.+)", "web_search"),
-                (r"look up (.+)", "web_search"),
-                (r"find (.+)", "web_search"), 
-                (r"show me (.+)", "web_search"),
-                (r"check weather", "web_search"),
-                (r"check news", "web_search"),
-            ],
-            
-            # 4. WINDOW - Window and tab management (BEFORE navigation)
-            "window": [
-                # Tab operations - MUST come FIRST (more specific than app switching)
-                (r"close (tab|table)", "close_tab"),
-                (r"close this (tab|table)", "close_tab"),
-                (r"go to next (tab|table)", "switch_tab"),
-                (r"go to previous (tab|table)", "previous_tab"),
-                (r"switch previous (tab|table)", "previous_tab"),
-                (r"switch next (tab|table)", "switch_tab"),
-                (r"switch (tab|table)", "switch_tab"),
-                (r"next (tab|table)", "switch_tab"),
-                (r"change (tab|table)", "switch_tab"),
-                (r"change previous (tab|table)", "previous_tab"),
-                (r"change next (tab|table)", "switch_tab"),
-                (r"previous (tab|table)", "previous_tab"),
-                (r"new (tab|table)", "new_tab"),
-                (r"open new (tab|table)", "new_tab"),
-                
-                # Window switching - Generic window commands
-                (r"^(switch|change) window$", "next_window"),
-                (r"go to next window", "next_window"),
-                (r"go to previous window", "previous_window"),
-                (r"next window", "next_window"),
-                (r"previous window", "previous_window"),
-                
-                # App-specific switching - AFTER tab and generic window patterns
-                (r"switch to (\w+)", "switch_to_window"),
-                (r"switch (\w+)", "switch_to_window"),
-                (r"change to (\w+)", "switch_to_window"),
-                
-                # Window operations
-                (r"(minimize|minimise) (window|the window|this window|this)", "minimize_window"),
-                (r"maximize (window|the window|this window)", "maximize_window"),
-                (r"close (window|the window|this window)", "close_window"),
-            ],
-            
-            # 5. SCROLL - Page scrolling
-            "scroll": [
-                (r"scroll (up|down)", "scroll_page"),
-                (r"(page|scroll) (up|down)", "scroll_page"),
-                (r"scroll to (top|bottom)", "scroll_extreme"),
-            ],
-            
-            # 6. CONVERSATION - Friendly responses
-            "conversation": [
-                (r"(hello|hi|hey|greetings)", "greeting"),
-                (r"how are you", "how_are_you"),
-                (r"what(s| is) your name", "my_name"),
-                (r"(thank you|thanks|thank)", "thanks"),
-                (r"(goodbye|bye|see you)", "goodbye"),
-                (r"(help|what can you do)", "help"),
-                (r"(who made you|who created you)", "creator"),
-                (r"tell me a joke", "joke"),
-            ],
-            
-            # 7. SYSTEM - System commands (volume, brightness, time, etc.) - BEFORE utility
-            "system": [
-                (r"volume up", "volume_control"),
-                (r"volume down", "volume_control"),
-                (r"(increase|raise) (the )?volume", "volume_control"),
-                (r"(decrease|lower) (the )?volume", "volume_control"),
-                (r"turn (the )?volume (up|down)", "volume_control"), 
-                (r"make it (louder|quieter)", "volume_control"),  
-                (r"(mute|unmute)", "mute_control"),
-                (r"brightness up", "brightness_control"),
-                (r"brightness down", "brightness_control"),
-                (r"(increase|raise|turn up) (the )?brightness", "brightness_control"),
-                (r"(decrease|lower|turn down|dim) (the )?brightness", "brightness_control"),
-                (r"lock (computer|screen)", "lock_system"),
-                (r"shutdown|shut down", "shutdown"),
-                (r"restart|reboot", "restart"),
-                (r"sleep|hibernate", "sleep"),
-                (r"take screenshot", "screenshot"),
-                # TIME/DATE - Must come BEFORE utility to avoid calculator conflict
-                (r"what time is it", "tell_time"),
-                (r"^time$", "tell_time"),
-                (r"tell (me )?(the )?time", "tell_time"),
-                (r"current time", "tell_time"),
-                (r"what date is it", "tell_date"),
-                (r"^date$", "tell_date"),
-                (r"tell (me )?(the )?date", "tell_date"),
-                (r"current date", "tell_date"),
-                (r"today's date", "tell_date"),
-                (r"minimize all", "minimize_all"),
-                (r"show desktop", "show_desktop"),
-                (r"task manager", "task_manager"),
-                (r"check internet", "check_internet"),
-                (r"empty (the )?recycle bin", "empty_recycle"),
-            ],
-            
-            # 8. APPLICATION - Open/close applications (AFTER web patterns)
-            "application": [
-                (r"open (\w+)", "open_app"),
-                (r"launch (\w+)", "open_app"),
-                (r"start (\w+)", "open_app"),
-                (r"run (\w+)", "open_app"),
-                (r"close (\w+)", "close_app"),
-            ],
-            
-            # 9. FILE - File operations
-            "file": [
-                (r"create folder (.+)", "create_folder"),
-                (r"(create|make) (a )?file (.+)", "create_file"),
-                (r"open (desktop|documents|downloads|pictures|music|videos)", "open_folder"),
-                (r"go to (desktop|documents|downloads|pictures|music|videos)", "open_folder"),
-                (r"open (file explorer|explorer)", "open_explorer"),
-            ],
-            
-            # 10. MEDIA - Media controls + YouTube/Screen OCR navigation
-            "media": [
-                # YouTube video play commands
-                (r"^play$", "play_video"),  # Single word 'play' for YouTube
-                (r"play (this|video|it)", "play_video"),
-                (r"play first (one|video|song|result)", "play_video"),
-                (r"play (the )?video", "play_video"),
-                
-                # OCR-based selection by number (first, second, third, etc.)
-                (r"select (first|second|third|fourth|fifth|1st|2nd|3rd|4th|5th) (result|video|one)", "select_number"),
-                (r"play (first|second|third|fourth|fifth|1st|2nd|3rd|4th|5th) (result|video|one)", "play_number"),
-                (r"click (first|second|third|fourth|fifth|1st|2nd|3rd|4th|5th) (result|video|one)", "select_number"),
-                
-                # OCR-based selection by text/title
-                (r"select (video|result) (about|with|titled) (.+)", "select_by_text"),
-                (r"play (video|result) (about|with|titled) (.+)", "play_by_text"),
-                (r"find and (select|play|click) (.+)", "select_by_text"),
-                
-                # Traditional navigation
-                (r"select first (one|video|result|song)", "select_first"),
-                (r"select (down|up|next|previous)", "navigate_result"),  # Captures direction in group 1
-                (r"(go |move |scroll )?(down|up)", "scroll_direction"),  # Captures direction in group 2
-                (r"next (result|video|one)", "next_result"),
-                (r"previous (result|video|one)", "previous_result"),
-                (r"scroll (down|up)", "scroll_media"),
-                
-                # Regular media controls
-                (r"(play|start|resume) (music|song|audio)", "play_music"),
-                (r"(pause|stop) (music|song|audio)", "pause_music"),
-                (r"(next|skip) (song|track)", "next_song"),
-                (r"(previous|back|last) (song|track)", "previous_song"),
-                (r"stop (playing |the )?music", "stop_music"),
-            ],
-            
-            # 11. NETWORK - Network operations
-            "network": [
-                (r"connect wifi", "connect_wifi"),
-                (r"disconnect wifi", "disconnect_wifi"),
-                (r"show ip", "show_ip"),
-                (r"network settings", "network_settings"),
-            ],
-            
-            # 12. UTILITY - Utility operations (math only, NOT time/date)
-            "utility": [
-                (r"set timer (.+)", "set_timer"),
-                (r"set alarm (.+)", "set_alarm"),
-                # CALCULATOR - Only match actual math operations
-                (r"calculate (.+)", "calculate"),
-                (r"(add|subtract|multiply|divide|sum|minus|plus|times) (.+)", "calculate"),
-                (r"what('s| is) (\d+.*[+\-*/].+)", "calculate"),  # Only math expressions
-                (r"solve (.+)", "calculate"),
-                (r"copy (.+)", "copy_text"),
-                (r"paste", "paste_text"),
-                (r"(read|speak|say) (.+)", "read_text"),
-            ],
-            
-            # 13. GESTURE - Gesture control
-            "gesture": [
-                (r"(enable|start|turn on) (gesture|mouse|virtual mouse)", "gesture_on"),
-                (r"(disable|stop|turn off) (gesture|mouse|virtual mouse)", "gesture_off"),
-                (r"(toggle|switch) (gesture|mouse)", "gesture_toggle"),
-            ],
-            
-            # 14. NAVIGATION - Arrow keys (LAST, most generic)
-            "navigation": [
-                (r"^right$", "arrow_right"),
-                (r"^left$", "arrow_left"),
-                (r"^up$", "arrow_up"),
-                (r"^down$", "arrow_down"),
-                (r"arrow right", "arrow_right"),
-                (r"arrow left", "arrow_left"),
-                (r"arrow up", "arrow_up"),
-                (r"arrow down", "arrow_down"),
-                (r"press right", "arrow_right"),
-                (r"press left", "arrow_left"),
-                (r"press up", "arrow_up"),
-                (r"press down", "arrow_down"),
-            ],
-        }
-
-    def process_command(self, text):
-        import re
-        
-        # First, clean the input by removing filler words and extracting command
-        cleaned_text = self.extract_command(text)
-        self.last_extracted_command = cleaned_text  # Store for logging
-        
-        t = cleaned_text.lower().strip()
-        for cat, pats in self.patterns.items():
-            for pattern, action in pats:
-                m = re.search(pattern, t)
-                if m:
-                    return self._build(cat, action, m, t)
-        return {"action": "unknown", "parameters": {}, "confidence": 0.1}
-    
-    def extract_command(self, text):
-        """Extract actual command from text by removing filler words and focusing on action keywords"""
-        import re
-        
-        t = text.lower().strip()
-        
-        # List of filler/conversational words to remove
-        filler_words = [
-            'yeah', 'yes', 'yep', 'yup', 'sure', 'okay', 'ok', 'alright', 'fine',
-            'no', 'nah', 'nope', 'please', 'thanks', 'thank you', 'sorry',
-            'um', 'uh', 'ah', 'well', 'like', 'just', 'maybe', 'perhaps',
-            'can you', 'could you', 'would you', 'will you', 'i want', 'i need',
-            'of course', 'ofcourse', 'definitely', 'absolutely', 'totally',
-            'actually', 'basically', 'literally', 'really', 'very', 'quite',
-            'i want to', 'i need to', 'i would like to', 'i want you to',
-        ]
-        
-        # Action keywords that indicate actual commands
-        action_keywords = [
-            'open', 'close', 'launch', 'start', 'run', 'stop', 'quit', 'exit',
-            'search', 'google', 'browse', 'find', 'look', 'show',
-            'play', 'pause', 'stop', 'next', 'previous', 'skip',
-            'select', 'click', 'choose', 'pick',
-            'switch', 'change', 'go to', 'move to',
-            'type', 'write', 'enter', 'press',
-            'volume', 'brightness', 'mute', 'unmute',
-            'minimize', 'maximise', 'maximize', 'minimise',
-            'scroll', 'up', 'down', 'left', 'right',
-            'create', 'make', 'delete', 'remove',
-            'take', 'screenshot', 'lock', 'shutdown', 'restart', 'sleep',
-            'what', 'tell', 'time', 'date', 'weather', 'news',
-        ]
-        
-        # First, try to find command patterns with action keywords
-        words = t.split()
-        
-        # Remove leading filler words
-        while words and words[0] in filler_words:
-            words.pop(0)
-        
-        # Remove trailing filler words
-        while words and words[-1] in filler_words:
-            words.pop()
-        
-        # Try to find where the actual command starts
-        command_start_idx = -1
-        for i, word in enumerate(words):
-            if word in action_keywords:
-                command_start_idx = i
-                break
-        
-        # If we found an action keyword, extract from there
-        if command_start_idx >= 0:
-            # Take from action keyword onwards
-            command_words = words[command_start_idx:]
-            
-            # Remove any remaining filler words that appear after action
-            cleaned_command = []
-            skip_next = False
-            for i, word in enumerate(command_words):
-                if skip_next:
-                    skip_next = False
-                    continue
-                    
-                # Check for multi-word fillers
-                if i < len(command_words) - 1:
-                    two_words = f"{word} {command_words[i+1]}"
-                    if two_words in filler_words:
-                        skip_next = True
-                        continue
-                
-                # Skip single-word fillers only if they're not part of command
-                if word in filler_words and word not in action_keywords:
-                    continue
-                    
-                cleaned_command.append(word)
-            
-            result = ' '.join(cleaned_command)
-            return result if result else t
-        
-        # If no action keyword found, just remove filler words
-        cleaned_words = [w for w in words if w not in filler_words]
-        result = ' '.join(cleaned_words)
-        return result if result else t
-    
-    def suggest_command(self, text):
-        """Suggest correct command based on common mistakes and keywords"""
-        import re
-        t = text.lower().strip()
-        
-        # Common corrections for misheard/mispronounced commands
-        corrections = {
-            # Application names often misheard
-            "python": "open python" if "open" not in t and "close" not in t else "close python",
-            "chrome": "open chrome" if "open" not in t and "close" not in t else "close chrome",
-            "notepad": "open notepad" if "open" not in t and "close" not in t else "close notepad",
-            "calculator": "open calculator" if "open" not in t and "close" not in t else "close calculator",
-            
-            # Duplicate words (speech recognition artifacts)
-            "close close": "close",
-            "open open": "open",
-            "search search": "search",
-            "select select": "select",
-        }
-        
-        # Check for exact corrections
-        for mistake, correction in corrections.items():
-            if mistake in t:
-                # Replace the mistake with correction
-                suggested = t.replace(mistake, correction)
-                return suggested
-        
-        # Check if it's a single word that might be an app name
-        words = t.split()
-        if len(words) == 1:
-            word = words[0]
-            # Common app names
-            app_keywords = ['chrome', 'firefox', 'edge', 'notepad', 'calculator', 'word', 'excel', 
-                          'powerpoint', 'outlook', 'spotify', 'discord', 'vscode', 'python', 'cmd']
-            if word in app_keywords or any(app in word for app in app_keywords):
-                return f"open {word}"
-        
-        # Check for repeated words (speech artifact)
-        if len(words) >= 2 and words[0] == words[1]:
-            return ' '.join(words[1:])  # Remove duplicate
-        
-        # Check if command has action words but malformed
-        action_words = ['open', 'close', 'launch', 'start', 'search', 'select', 'click', 'switch']
-        has_action = any(word in t for word in action_words)
-        
-        if has_action:
-            # Try to extract app name after action
-            for action in action_words:
-                if action in t:
-                    parts = t.split(action, 1)
-                    if len(parts) > 1:
-                        target = parts[1].strip()
-                        # Clean up duplicates
-                        target_words = target.split()
-                        if len(target_words) >= 2 and target_words[0] == action:
-                            target = ' '.join(target_words[1:])
-                        if target:
-                            return f"{action} {target}"
-        
-        return None  # No suggestion available
-
-    def _build(self, cat, action, m, original):
-        if cat == "conversation":
-            return {"action": "conversation", "parameters": {"type": action, "original": original}, "confidence": 0.95}
-        if cat == "application":
-            if action == "close_app":
-                app = m.group(1) if m.groups() else "unknown"
-                return {"action": "application", "parameters": {"app": app, "close": True}, "confidence": 0.9}
-            app = m.group(1) if m.groups() else "unknown"
-            return {"action": "application", "parameters": {"app": app}, "confidence": 0.9}
-        if cat == "web":
-            if action == "open_website":
-                # Comprehensive site mapping for social media and popular sites
-                site_map = {
-                    "youtube": "youtube.com",
-                    "facebook": "facebook.com",
-                    "twitter": "twitter.com",
-                    "instagram": "instagram.com",
-                    "linkedin": "linkedin.com",
-                    "whatsapp": "web.whatsapp.com",
-                    "github": "github.com",
-                    "gmail": "gmail.com",
-                    "amazon": "amazon.com",
-                    "netflix": "netflix.com",
-                    "spotify": "spotify.com",
-                    "reddit": "reddit.com",
-                    "pinterest": "pinterest.com",
-                    "tiktok": "tiktok.com",
-                    "snapchat": "snapchat.com",
-                    "telegram": "web.telegram.org",
-                    "discord": "discord.com",
-                    "slack": "slack.com",
-                    "medium": "medium.com",
-                    "quora": "quora.com",
-                    "stack overflow": "stackoverflow.com",
-                    "stackoverflow": "stackoverflow.com",
-                    "maps": "maps.google.com",
-                    "drive": "drive.google.com",
-                    "chatgpt": "chat.openai.com"
-                }
-                q = None
-                # Check for exact matches in the original command
-                original_lower = original.lower()
-                for k, v in site_map.items():
-                    if k in original_lower:
-                        q = v
-                        break
-                if q is None:
-                    q = m.group(1) if m.groups() else original
-                return {"action": "web", "parameters": {"query": q, "is_website": True}, "confidence": 0.95}
-            elif action == "google_search":
-                # Force Google search regardless of context
-                q = m.group(1) if m.groups() else original
-                return {"action": "web", "parameters": {"query": q, "is_website": False, "force_google": True}, "confidence": 0.95}
-            elif action == "browse_web":
-                # Browse always uses Google
-                q = m.group(1) if m.groups() else original
-                return {"action": "web", "parameters": {"query": q, "is_website": False, "force_google": True}, "confidence": 0.9}
-            elif "weather" in original:
-                q = "weather forecast"
-            elif "news" in original:
-                q = "latest news"
-            else:
-                q = m.group(1) if m.groups() else original
-            return {"action": "web", "parameters": {"query": q, "is_website": False}, "confidence": 0.9}
-        if cat == "system":
-            if "volume" in action:
-                direction = "up" if ("up" in original or "increase" in original) else "down"
-                return {"action": "system", "parameters": {"action": "volume", "direction": direction}, "confidence": 0.9}
-            if "brightness" in action:
-                direction = "up" if ("up" in original or "increase" in original or "raise" in original or "turn up" in original) else "down"
-                return {"action": "system", "parameters": {"action": "brightness", "direction": direction}, "confidence": 0.9}
-            return {"action": "system", "parameters": {"action": action.replace("_", "")}, "confidence": 0.9}
-        if cat == "file":
-            if action == "create_folder":
-                name = m.group(1) if m.groups() else "New Folder"
-                return {"action": "file", "parameters": {"action": "create_folder", "filename": name}, "confidence": 0.9}
-            if action == "open_folder":
-                folder = m.group(1) if m.groups() else "desktop"
-                return {"action": "file", "parameters": {"action": "open_folder", "folder": folder}, "confidence": 0.9}
-        if cat == "media":
-            if action == "navigate_result":
-                # Extract direction from group 1 for "select down/up"
-                direction = m.group(1) if m.groups() else "down"
-                return {"action": "media", "parameters": {"action": action, "direction": direction}, "confidence": 0.9}
-            elif action == "scroll_direction":
-                # Extract direction from group 2 for "down/up" (group 1 is optional prefix)
-                direction = m.group(2) if len(m.groups()) >= 2 else (m.group(1) if m.groups() else "down")
-                return {"action": "media", "parameters": {"action": action, "direction": direction}, "confidence": 0.9}
-            elif action in ("select_number", "play_number"):
-                # Extract number from text (first, second, 1st, 2nd, etc.)
-                number_text = m.group(1) if m.groups() else "first"
-                number_map = {
-                    "first": 1, "1st": 1,
-                    "second": 2, "2nd": 2,
-                    "third": 3, "3rd": 3,
-                    "fourth": 4, "4th": 4,
-                    "fifth": 5, "5th": 5,
-                    "sixth": 6, "6th": 6,
-                    "seventh": 7, "7th": 7,
-                    "eighth": 8, "8th": 8,
-                    "ninth": 9, "9th": 9,
-                    "tenth": 10, "10th": 10
-                }
-                number = number_map.get(number_text.lower(), 1)
-                return {"action": "media", "parameters": {"action": action, "number": number}, "confidence": 0.9}
-            elif action in ("select_by_text", "play_by_text"):
-                # Extract search text - get the last group which has the actual search query
-                search_text = ""
-                if m.groups():
-                    # Get the last non-empty group (the search query)
-                    for g in reversed(m.groups()):
-                        if g:
-                            search_text = g
-                            break
-                return {"action": "media", "parameters": {"action": action, "text": search_text}, "confidence": 0.9}
-            return {"action": "media", "parameters": {"action": action}, "confidence": 0.9}
-        if cat == "network":
-            return {"action": "network", "parameters": {"action": action}, "confidence": 0.9}
-        if cat == "utility":
-            value = m.group(1) if m.groups() else None
-            return {"action": "utility", "parameters": {"action": action, "value": value}, "confidence": 0.9}
-        if cat == "gesture":
-            intent = "on" if "on" in action else "off" if "off" in action else "toggle"
-            return {"action": "gesture", "parameters": {"state": intent}, "confidence": 0.95}
-        if cat == "window":
-            if action == "switch_to_window":
-                app_name = m.group(1) if m.groups() else "unknown"
-                return {"action": "window", "parameters": {"action": action, "app": app_name}, "confidence": 0.9}
-            return {"action": "window", "parameters": {"action": action}, "confidence": 0.9}
-        if cat == "typing":
-            if "type_text" in action:
-                text = m.group(1) if m.groups() else ""
-                return {"action": "typing", "parameters": {"action": action, "text": text}, "confidence": 0.9}
-            elif action == "press_key":
-                key = m.group(1) if m.groups() else ""
-                return {"action": "typing", "parameters": {"action": action, "text": key}, "confidence": 0.9}
-            return {"action": "typing", "parameters": {"action": action}, "confidence": 0.9}
-        if cat == "selection":
-            if action == "select_on_screen":
-                # Extract text to find and select
-                search_text = m.group(1) if m.groups() else ""
-                return {"action": "selection", "parameters": {"action": action, "text": search_text}, "confidence": 0.85}
-            
-            # Traditional selection
-            unit = "character"
-            if m.groups():
-                unit = m.group(1) if "word" in original or "line" in original or "character" in original else "character"
-            direction = "next" if "next" in action else "previous" if "previous" in action else "all"
-            return {"action": "selection", "parameters": {"action": action, "unit": unit, "direction": direction}, "confidence": 0.9}
-        if cat == "navigation":
-            # Determine arrow direction from action or original text
-            if "right" in action or "right" in original or "next" in original:
-                arrow_dir = "right"
-            elif "left" in action or "left" in original or "back" in original:
-                arrow_dir = "left"
-            elif "up" in action or "up" in original:
-                arrow_dir = "up"
-            elif "down" in action or "down" in original:
-                arrow_dir = "down"
-            else:
-                arrow_dir = "right"  # default
-            return {"action": "navigation", "parameters": {"direction": arrow_dir}, "confidence": 0.95}
-        if cat == "scroll":
-            if "extreme" in action:
-                direction = "top" if "top" in original else "bottom"
-            else:
-                direction = "up" if "up" in original else "down"
-            return {"action": "scroll", "parameters": {"direction": direction}, "confidence": 0.9}
-        return {"action": "unknown", "parameters": {}, "confidence": 0.1}
+        self.stop_audio_stream()
 
 
 class EnhancedSystemController:
@@ -3424,6 +3464,26 @@ class DatabaseManager:
                 key TEXT PRIMARY KEY,
                 value TEXT NOT NULL
             )""")
+            cur.execute("""CREATE TABLE IF NOT EXISTS command_traces (
+                trace_id TEXT PRIMARY KEY,
+                history_id INTEGER,
+                source TEXT,
+                command_text TEXT,
+                total_ms REAL,
+                stages TEXT,
+                marks TEXT,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )""")
+            # Bumped by triggers on every change to commands, so the compiled patterns can be reused until then
+            cur.execute("""CREATE TABLE IF NOT EXISTS commands_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )""")
+            cur.execute("INSERT OR IGNORE INTO commands_version (id, version) VALUES (1, 0)")
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                cur.execute(f"""CREATE TRIGGER IF NOT EXISTS commands_{event.lower()}_version
+                    AFTER {event} ON commands
+                    BEGIN UPDATE commands_version SET version = version + 1 WHERE id = 1; END""")
             conn.commit(); conn.close()
         except Exception as e:
             print(f"DB init error: {e}")
@@ -3436,6 +3496,14 @@ class DatabaseManager:
         except Exception as e:
             print(f"Get commands error: {e}"); return []
 
+    def get_commands_version(self):
+        try:
+            conn = sqlite3.connect(self.db_path); cur = conn.cursor()
+            cur.execute("SELECT version FROM commands_version WHERE id = 1"); row = cur.fetchone(); conn.close()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"Get commands version error: {e}"); return None
+
     def add_command_history(self, text, conf):
         try:
             conn = sqlite3.connect(self.db_path); cur = conn.cursor()
@@ -3461,6 +3529,28 @@ class DatabaseManager:
         except Exception as e:
             print(f"Get history error: {e}"); return []
 
+    def add_command_trace(self, record):
+        try:
+            conn = sqlite3.connect(self.db_path); cur = conn.cursor()
+            cur.execute("INSERT OR REPLACE INTO command_traces (trace_id, history_id, source, command_text, total_ms, stages, marks) "
+                        "VALUES (?,?,?,?,?,?,?)",
+                        (record["trace_id"], record["history_id"], record["source"], record["command_text"],
+                         record["stages"].get("total"), json.dumps(record["stages"]), json.dumps(record["marks"])))
+            conn.commit(); conn.close()
+        except Exception as e:
+            print(f"Add trace error: {e}")
+
+    def get_command_traces(self, limit=500):
+        try:
+            conn = sqlite3.connect(self.db_path); cur = conn.cursor()
+            cur.execute("SELECT trace_id, history_id, source, command_text, total_ms, stages, timestamp "
+                        "FROM command_traces ORDER BY timestamp DESC LIMIT ?", (limit,))
+            rows = cur.fetchall(); conn.close()
+            return [{"trace_id": r[0], "history_id": r[1], "source": r[2], "command": r[3], "total_ms": r[4],
+                     "stages": json.loads(r[5] or "{}"), "timestamp": r[6]} for r in rows]
+        except Exception as e:
+            print(f"Get traces error: {e}"); return []
+
     def save_settings(self, settings):
         try:
             conn = sqlite3.connect(self.db_path); cur = conn.cursor()
@@ -0,0 +1,135 @@
+"""
+Background noise-floor tracking for the speech engine
+Replaces the 1 s adjust_for_ambient_noise() that ran before every listen:
+the floor is estimated continuously from the chunks the microphone already
+delivers, and the recognizer's energy_threshold is updated in place.
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+
+
+def chunk_rms(data, sample_width=2):
+    """RMS energy of a raw little-endian PCM chunk (same scale as audioop.rms)."""
+    if not data:
+        return 0.0
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}.get(sample_width, np.int16)
+    samples = np.frombuffer(data, dtype=dtype)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float64) ** 2)))
+
+
+class NoiseFloorEstimator:
+    """Exponential noise-floor estimate with asymmetric attack/release.
+
+    The floor falls quickly when the room gets quieter and rises slowly, so
+    a burst of speech does not drag it up. Chunks above the threshold
+    (speech) only move it with the very long ``speech_time`` constant, which
+    still lets a permanently louder room be absorbed eventually. Time
+    constants are in seconds of audio, so the rate does not depend on the
+    chunk size.
+    """
+
+    def __init__(self, ratio=1.5, min_threshold=150.0, max_threshold=4000.0,
+                 rise_time=4.0, fall_time=0.5, speech_time=30.0, initial_floor=200.0):
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.rise_time = rise_time
+        self.fall_time = fall_time
+        self.speech_time = speech_time
+        self.floor = float(initial_floor)
+        self.samples_seen = 0
+        self._lock = threading.Lock()
+        self._targets = []
+
+    def bind(self, recognizer):
+        """Keep ``recognizer.energy_threshold`` in sync with the estimate."""
+        self._targets.append(recognizer)
+        recognizer.energy_threshold = self.threshold()
+
+    def seed(self, energy_threshold):
+        """Initialise from an energy threshold (e.g. a one-off calibration)."""
+        with self._lock:
+            self.floor = max(1.0, float(energy_threshold) / self.ratio)
+        self._publish()
+
+    def threshold(self):
+        return min(self.max_threshold, max(self.min_threshold, self.floor * self.ratio))
+
+    def update(self, energy, duration):
+        """Feed the RMS energy of a chunk lasting ``duration`` seconds.
+
+        Returns True when the chunk was treated as background.
+        """
+        with self._lock:
+            background = energy <= self.threshold()
+            if not background:
+                tau = self.speech_time
+            elif energy < self.floor:
+                tau = self.fall_time
+            else:
+                tau = self.rise_time
+            self.floor += (energy - self.floor) * (1.0 - math.exp(-duration / tau))
+            self.samples_seen += 1
+        self._publish()
+        return background
+
+    def _publish(self):
+        value = self.threshold()
+        for recognizer in self._targets:
+            # Plain attribute write; a listen() in progress picks it up on its next chunk
+            recognizer.energy_threshold = value
+
+    def tap(self, stream, sample_rate, sample_width=2):
+        """Wrap a microphone stream so every chunk read also feeds the estimator."""
+        return _TappedStream(stream, self, sample_rate, sample_width)
+
+
+class _TappedStream:
+    def __init__(self, stream, estimator, sample_rate, sample_width):
+        self._stream = stream
+        self._estimator = estimator
+        self._bytes_per_second = float(sample_rate * sample_width)
+        self._sample_width = sample_width
+
+    def read(self, size):
+        data = self._stream.read(size)
+        if data:
+            self._estimator.update(chunk_rms(data, self._sample_width),
+                                   len(data) / self._bytes_per_second)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class LatencyLog:
+    """Small rolling record of wake-to-ready latencies (seconds)."""
+
+    def __init__(self, size=50):
+        self.size = size
+        self.values = []
+        self._mark = None
+
+    def mark(self):
+        self._mark = time.perf_counter()
+
+    def ready(self, ready_at):
+        if self._mark is None or ready_at is None or ready_at < self._mark:
+            return None
+        value = ready_at - self._mark
+        self._mark = None
+        self.values = (self.values + [value])[-self.size:]
+        return value
+
+    def summary(self):
+        if not self.values:
+            return "no samples"
+        ordered = sorted(self.values)
+        median = ordered[len(ordered) // 2]
+        return f"median {median * 1000:.0f} ms, max {ordered[-1] * 1000:.0f} ms over {len(ordered)} wakes"
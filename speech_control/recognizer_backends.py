@@ -0,0 +1,196 @@
+"""
+Speech-recognition backends
+Common transcribe(audio) -> RecognitionResult interface over Google (online),
+CMU Sphinx (offline) and a deterministic fake that maps WAV fixtures to
+transcripts for network-free benchmarks.
+"""
+
+import hashlib
+import json
+import os
+import time
+import wave
+
+try:
+    import speech_recognition as sr
+    SR_AVAILABLE = True
+except ImportError:
+    sr = None
+    SR_AVAILABLE = False
+
+try:
+    import pocketsphinx  # noqa: F401  (used through speech_recognition)
+    SPHINX_AVAILABLE = True
+except ImportError:
+    SPHINX_AVAILABLE = False
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "replay")
+
+
+class BackendUnavailable(Exception):
+    """The backend could not run (no network, missing engine, ...)."""
+
+
+class RecognitionResult:
+    def __init__(self, text, confidence, latency=0.0, backend=""):
+        self.text = text
+        self.confidence = confidence
+        self.latency = latency  # seconds spent inside the backend
+        self.backend = backend
+
+    def __repr__(self):
+        return f"RecognitionResult({self.text!r}, {self.confidence:.2f}, {self.latency * 1000:.0f} ms, {self.backend})"
+
+
+class RecognizerBackend:
+    """Base class: subclasses implement ``_transcribe(audio) -> (text, confidence)``.
+
+    ``transcribe`` returns a RecognitionResult, or None when nothing was
+    understood, and raises BackendUnavailable when the engine can't run.
+    """
+
+    name = "base"
+
+    def transcribe(self, audio):
+        start = time.perf_counter()
+        out = self._transcribe(audio)
+        latency = time.perf_counter() - start
+        if not out or not out[0]:
+            return None
+        text, confidence = out
+        return RecognitionResult(str(text).lower().strip(), float(confidence), latency, self.name)
+
+    def _transcribe(self, audio):
+        raise NotImplementedError
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech API through speech_recognition (needs network)."""
+
+    name = "google"
+
+    def __init__(self, recognizer, retries=1, default_confidence=0.85):
+        self.recognizer = recognizer
+        self.retries = retries
+        self.default_confidence = default_confidence
+
+    def _transcribe(self, audio):
+        if not SR_AVAILABLE or self.recognizer is None:
+            raise BackendUnavailable("speech_recognition is not installed (pip install SpeechRecognition)")
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.recognizer.recognize_google(audio, show_all=True)
+                break
+            except sr.RequestError as e:
+                if attempt >= self.retries:
+                    raise BackendUnavailable(str(e))
+        # show_all gives alternatives; the first one may carry a confidence
+        if not response or not isinstance(response, dict) or not response.get("alternative"):
+            return None
+        best = response["alternative"][0]
+        return best.get("transcript", ""), best.get("confidence", self.default_confidence)
+
+
+class OfflineBackend(RecognizerBackend):
+    """CMU PocketSphinx, fully local; less accurate but private and free."""
+
+    name = "offline"
+
+    def __init__(self, recognizer, confidence=0.7):
+        if not (SR_AVAILABLE and SPHINX_AVAILABLE):
+            raise BackendUnavailable("pocketsphinx is not installed (pip install pocketsphinx)")
+        self.recognizer = recognizer
+        self.confidence = confidence
+
+    def _transcribe(self, audio):
+        try:
+            return self.recognizer.recognize_sphinx(audio), self.confidence
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            raise BackendUnavailable(str(e))
+
+
+def pcm_fingerprint(pcm):
+    return hashlib.sha1(pcm).hexdigest()
+
+
+class FakeBackend(RecognizerBackend):
+    """Deterministic recognizer for tests and benchmarks.
+
+    Maps the exact PCM content of known WAV fixtures to transcripts. They
+    are read from the replay manifest, ``<fixtures_dir>/manifest.json``:
+    each case's ``transcript`` (and optional ``transcript_confidence``) is
+    what this recognizer "hears" in its ``file``, kept apart from the
+    ``text`` the harness expects. Unknown audio is "not understood".
+    ``latency`` adds a fixed simulated delay.
+    """
+
+    name = "fake"
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, latency=0.0, confidence=0.9):
+        self.fixtures_dir = fixtures_dir
+        self.simulated_latency = latency
+        self.confidence = confidence
+        self.transcripts = {}
+        self.files = {}  # fixture file name -> (transcript, confidence)
+        self.load()
+
+    def load(self):
+        self.transcripts = {}
+        self.files = {}
+        manifest = os.path.join(self.fixtures_dir, "manifest.json")
+        if not os.path.exists(manifest):
+            print(f"No ASR fixtures in {self.fixtures_dir}: the fake recognizer understands nothing")
+            return
+        with open(manifest, "r") as f:
+            data = json.load(f)
+        for case in data.get("cases", []) if isinstance(data, dict) else data:
+            if "transcript" not in case:
+                continue
+            try:
+                with wave.open(os.path.join(self.fixtures_dir, case["file"]), "rb") as wf:
+                    pcm = wf.readframes(wf.getnframes())
+            except Exception as e:
+                print(f"Skipping ASR fixture {case.get('file')}: {e}")
+                continue
+            entry = (case["transcript"], case.get("transcript_confidence", self.confidence))
+            self.files[os.path.basename(case["file"])] = entry
+            self.transcripts[pcm_fingerprint(pcm)] = entry
+
+    def add(self, pcm, text, confidence=None):
+        self.transcripts[pcm_fingerprint(pcm)] = (text, self.confidence if confidence is None else confidence)
+
+    def add_cut(self, name, pcm):
+        """``pcm`` was cut from fixture file ``name`` (e.g. by the VAD): recognize it the same way."""
+        if name in self.files:
+            self.transcripts[pcm_fingerprint(pcm)] = self.files[name]
+
+    def _transcribe(self, audio):
+        pcm = audio.get_raw_data() if hasattr(audio, "get_raw_data") else bytes(audio)
+        if self.simulated_latency:
+            time.sleep(self.simulated_latency)
+        return self.transcripts.get(pcm_fingerprint(pcm))
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "offline": OfflineBackend,
+    "fake": FakeBackend,
+}
+
+# Offered in Settings; "fake" only knows the replay fixtures (harness and tests)
+LIVE_BACKENDS = ("google", "offline")
+
+
+def create_backend(name, recognizer=None, **kwargs):
+    """Build a backend by settings name; falls back to Google if it can't be created."""
+    name = (name or "google").lower()
+    try:
+        if name == "fake":
+            return FakeBackend(**kwargs)
+        if name == "offline":
+            return OfflineBackend(recognizer, **kwargs)
+    except BackendUnavailable as e:
+        print(f"Recognizer backend '{name}' unavailable ({e}); using Google")
+    return GoogleBackend(recognizer)
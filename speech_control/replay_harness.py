@@ -0,0 +1,327 @@
+"""
+Replay harness for the voice command pipeline
+Feeds WAV files through the same VAD, wake-word spotter, recognizer backend,
+EnhancedCommandProcessor and a dry-run system controller as the app, then
+reports accuracy and per-stage latency. Utterances are endpointed with the
+app's adaptive Endpointer and, for comparison, with the fixed 0.8 s pause.
+With the default fake backend it needs no microphone, speakers or network.
+
+Usage:
+    python replay_harness.py fixtures/replay/manifest.json
+    python replay_harness.py path/to/wavs --backend google --wake-word nova
+    python replay_harness.py cases.json --json results.json --min-accuracy 0.9
+    python replay_harness.py fixtures/replay --fixed-endpoint
+
+Manifest (JSON), paths relative to the manifest:
+    {"wake_word": "nova", "templates_dir": "wake_word_templates",
+     "cases": [{"file": "open_chrome.wav", "transcript": "nova open chrome",
+                "text": "nova open chrome", "intent": "application",
+                "parameters": {"app": "chrome"}, "wake": true},
+               {"file": "room_noise.wav", "speech": false}]}
+``transcript`` is what the fake backend "hears" in the file (it reads the
+same manifest); ``text`` is the expected recognition, scored only with a
+real backend. ``templates_dir`` holds the wake word enrollment the spotter
+stage uses.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from audio_stream import segment_samples
+from endpointer import Endpointer
+from command_processor import EnhancedCommandProcessor, controller_call
+from latency_trace import LatencyTrace, summarize
+from noise_floor import NoiseFloorEstimator, chunk_rms
+from recognizer_backends import create_backend, BackendUnavailable, SR_AVAILABLE, sr
+from wake_word_spotter import WakeWordSpotter, read_wav, strip_wake_word
+
+
+class PCMAudio:
+    """Minimal stand-in for sr.AudioData when speech_recognition is missing."""
+
+    def __init__(self, pcm, sample_rate, sample_width):
+        self.frame_data = pcm
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+
+    def get_raw_data(self):
+        return self.frame_data
+
+
+class DryRunSystemController:
+    """Stands in for EnhancedSystemController: records calls, touches nothing."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def record(*args):
+            self.calls.append((name, args))
+            return True
+        return record
+
+
+def load_cases(path):
+    """(cases, wake_word, templates_dir) from a manifest file or a directory of WAVs."""
+    if os.path.isdir(path):
+        manifest = os.path.join(path, "manifest.json")
+        if os.path.exists(manifest):
+            return load_cases(manifest)
+        wavs = sorted(n for n in os.listdir(path) if n.lower().endswith(".wav"))
+        return [{"file": os.path.join(path, n)} for n in wavs], None, None
+
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, "r") as f:
+        data = json.load(f)
+    wake_word = templates_dir = None
+    if isinstance(data, dict):
+        wake_word = data.get("wake_word")
+        if data.get("templates_dir"):
+            templates_dir = os.path.join(base, data["templates_dir"])
+        entries = data.get("cases", [])
+    else:
+        entries = data
+    cases = []
+    for entry in entries:
+        case = dict(entry)
+        case["file"] = os.path.join(base, case["file"])
+        cases.append(case)
+    return cases, wake_word, templates_dir
+
+
+def load_pcm(path):
+    """(int16 mono samples, sample_rate) of a WAV file."""
+    samples, rate = read_wav(path)
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16), rate
+
+
+class ReplayHarness:
+    def __init__(self, backend="fake", wake_word=None, templates_dir=None, calibration=0.25,
+                 adaptive_endpoint=True, fixed_pause=0.8, fixtures_dir=None):
+        self.calibration = calibration  # seconds of leading audio treated as room noise
+        self.fixed_pause = fixed_pause
+        self.endpointer = Endpointer(base_pause=fixed_pause) if adaptive_endpoint else None
+        kwargs = {"fixtures_dir": fixtures_dir} if backend == "fake" and fixtures_dir else {}
+        self.backend = create_backend(backend, sr.Recognizer() if SR_AVAILABLE else None, **kwargs)
+        self.wake_word = wake_word
+        self.spotter = None
+        if wake_word:
+            kwargs = {"templates_dir": templates_dir} if templates_dir else {}
+            spotter = WakeWordSpotter(wake_word, **kwargs)
+            self.spotter = spotter if spotter.is_ready() else None
+        self.processor = EnhancedCommandProcessor()
+        self.controller = DryRunSystemController()
+
+    def _audio(self, pcm, rate):
+        if SR_AVAILABLE:
+            return sr.AudioData(pcm, rate, 2)
+        return PCMAudio(pcm, rate, 2)
+
+    def _segment(self, samples, rate, endpointer=None):
+        # Like the app's start-up calibration: seed the floor from the leading audio
+        noise_floor = NoiseFloorEstimator(ratio=1.5)
+        noise_floor.seed(chunk_rms(samples[:int(rate * self.calibration)].tobytes()) * noise_floor.ratio)
+        return segment_samples(samples, rate, noise_floor=noise_floor, pause=self.fixed_pause,
+                               endpointer=endpointer)
+
+    def run_case(self, case):
+        trace = LatencyTrace(source="replay")
+        out = {"file": os.path.basename(case["file"]), "errors": []}
+        try:
+            samples, rate = load_pcm(case["file"])
+        except Exception as e:
+            out["errors"].append(f"unreadable: {e}")
+            return out, trace
+
+        with trace.span("vad"):
+            segments = self._segment(samples, rate, self.endpointer)
+        out["segments"] = len(segments)
+        if not segments:
+            if case.get("speech", True):
+                out["errors"].append("no speech detected")
+            return out, trace
+        # Silence waited after the last word before recognition could start
+        last = segments[-1]
+        out["endpoint"] = last.endpoint
+        out["endpoint_ms"] = (last.ended - last.voice_ended) * 1000.0
+        if self.endpointer is not None:
+            fixed = self._segment(samples, rate)
+            if fixed:
+                out["fixed_endpoint_ms"] = (fixed[-1].ended - fixed[-1].voice_ended) * 1000.0
+        pcm = b"".join(s.pcm for s in segments)
+
+        if self.spotter is not None:
+            with trace.span("wake"):
+                hit, confidence, _dist = self.spotter.detect_pcm(pcm, rate)
+            out["wake"] = bool(hit)
+
+        audio = self._audio(pcm, rate)
+        if self.backend.name == "fake":
+            # The VAD trimmed the fixture: it still "sounds" like its manifest transcript
+            self.backend.add_cut(out["file"], pcm)
+        try:
+            with trace.span("recognize"):
+                result = self.backend.transcribe(audio)
+        except BackendUnavailable as e:
+            out["errors"].append(f"recognizer unavailable: {e}")
+            return out, trace
+        text = result.text if result else ""
+        out["text"] = text
+
+        command_text = text
+        if self.wake_word:
+            command_text = strip_wake_word(text, self.wake_word) or text
+        with trace.span("parse"):
+            command = self.processor.process_command(command_text)
+        out["intent"] = command["action"]
+        out["parameters"] = command["parameters"]
+
+        with trace.span("execute"):
+            call = controller_call(command)
+            if call is not None:
+                method, args = call
+                getattr(self.controller, method)(*args)
+        out["call"] = call[0] if call else None
+        return out, trace
+
+    @property
+    def scores_text(self):
+        """The fake backend only replays manifest transcripts, so its text proves nothing."""
+        return self.backend.name != "fake"
+
+    def check(self, case, out):
+        """Compare against the expectations present in ``case``; fills out["checks"]."""
+        checks = {}
+        if "speech" in case:
+            checks["speech"] = (out.get("segments", 0) > 0) == case["speech"]
+            if not case["speech"]:
+                out["checks"] = checks
+                out["ok"] = not out["errors"] and all(checks.values())
+                return out["ok"]
+        if "text" in case and self.scores_text:
+            checks["text"] = out.get("text", "") == " ".join(case["text"].lower().split())
+        if "intent" in case:
+            checks["intent"] = out.get("intent") == case["intent"]
+        if "parameters" in case:
+            got = out.get("parameters", {})
+            checks["parameters"] = all(got.get(k) == v for k, v in case["parameters"].items())
+        if "wake" in case and "wake" in out:
+            checks["wake"] = out["wake"] == case["wake"]
+        out["checks"] = checks
+        out["ok"] = not out["errors"] and all(checks.values())
+        return out["ok"]
+
+    def run(self, cases):
+        results, traces = [], []
+        for case in cases:
+            out, trace = self.run_case(case)
+            self.check(case, out)
+            out["stages"] = trace.durations()
+            results.append(out)
+            traces.append(out["stages"])
+        return results, summarize(traces)
+
+
+def accuracy(results, key):
+    scored = [r["checks"][key] for r in results if key in r.get("checks", {})]
+    return (sum(scored) / float(len(scored)), len(scored)) if scored else (None, 0)
+
+
+def endpoint_savings(results):
+    """(cases, mean adaptive ms, mean fixed ms) over cases measured both ways."""
+    pairs = [(r["endpoint_ms"], r["fixed_endpoint_ms"]) for r in results
+             if "endpoint_ms" in r and "fixed_endpoint_ms" in r]
+    if not pairs:
+        return 0, None, None
+    return (len(pairs), sum(a for a, _ in pairs) / len(pairs), sum(f for _, f in pairs) / len(pairs))
+
+
+def print_report(results, latency, scores_text=True):
+    print("=" * 72)
+    print("VOICE PIPELINE REPLAY")
+    print("=" * 72)
+    for r in results:
+        mark = "✓" if r["ok"] else "✗"
+        if r["errors"] or r.get("segments", 1):
+            detail = "; ".join(r["errors"]) or f"'{r.get('text', '')}' → {r.get('intent')} ({r.get('call')})"
+        else:
+            detail = "no speech"
+        failed = [k for k, v in r.get("checks", {}).items() if not v]
+        if failed:
+            detail += f"  [mismatch: {', '.join(failed)}]"
+        print(f"{mark} {r['file']:28s} {detail}")
+
+    print("\nAccuracy")
+    for key in ("speech", "intent", "parameters", "text", "wake"):
+        value, n = accuracy(results, key)
+        if n:
+            print(f"  {key:11s} {value * 100:5.1f}%  ({n} cases)")
+    if not scores_text:
+        print(f"  {'text':11s} not scored: the fake backend replays the manifest transcripts")
+    passed = sum(r["ok"] for r in results)
+    print(f"  {'overall':11s} {passed}/{len(results)} cases passed")
+
+    n, adaptive, fixed = endpoint_savings(results)
+    if n:
+        print(f"\nEndpointing ({n} cases): adaptive {adaptive:.0f} ms vs fixed {fixed:.0f} ms "
+              f"of trailing silence, {fixed - adaptive:.0f} ms saved per command")
+        splits = sum(1 for r in results if r.get("segments", 0) > 1)
+        if splits:
+            print(f"  {splits} case(s) split into several segments")
+
+    print("\nLatency (ms)")
+    print(f"  {'stage':16s} {'n':>4s} {'p50':>8s} {'p90':>8s} {'p99':>8s} {'max':>8s}")
+    for stage, count, p50, p90, p99, worst in latency:
+        print(f"  {stage:16s} {count:4d} {p50:8.1f} {p90:8.1f} {p99:8.1f} {worst:8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay WAV files through the voice command pipeline")
+    parser.add_argument("source", help="manifest .json or directory of .wav files")
+    parser.add_argument("--backend", default="fake", help="recognizer backend: fake, google or offline")
+    parser.add_argument("--wake-word", default=None, help="strip/spot this wake word (overrides the manifest)")
+    parser.add_argument("--templates-dir", default=None,
+                        help="wake word enrollment directory (overrides the manifest)")
+    parser.add_argument("--fixed-endpoint", action="store_true",
+                        help="endpoint with the fixed pause only (no adaptive endpointing)")
+    parser.add_argument("--json", default=None, help="write per-case results and latency summary here")
+    parser.add_argument("--min-accuracy", type=float, default=None,
+                        help="exit with status 1 if intent accuracy falls below this (0-1)")
+    args = parser.parse_args(argv)
+
+    cases, manifest_wake, manifest_templates = load_cases(args.source)
+    if not cases:
+        print(f"No WAV cases found in {args.source}")
+        return 1
+    harness = ReplayHarness(args.backend, args.wake_word or manifest_wake,
+                            args.templates_dir or manifest_templates,
+                            adaptive_endpoint=not args.fixed_endpoint,
+                            fixtures_dir=os.path.dirname(cases[0]["file"]))
+    if harness.wake_word and harness.spotter is None:
+        print(f"No wake word templates for '{harness.wake_word}': wake word stage skipped")
+    results, latency = harness.run(cases)
+    print_report(results, latency, harness.scores_text)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"results": results,
+                       "latency": [dict(zip(("stage", "count", "p50", "p90", "p99", "max"), row)) for row in latency]},
+                      f, indent=2, default=str)
+
+    if args.min_accuracy is not None:
+        value, n = accuracy(results, "intent")
+        if n and value < args.min_accuracy:
+            print(f"\nIntent accuracy {value:.2f} below required {args.min_accuracy:.2f}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
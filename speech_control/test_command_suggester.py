@@ -0,0 +1,61 @@
+"""
+Offline test for "did you mean" command suggestions
+Indexes the built-in patterns plus database-style and custom commands, then
+checks misheard utterances against the expected suggestion and times the
+lookups. No microphone or network needed.
+"""
+import time
+
+from command_processor import EnhancedCommandProcessor
+from launcher.fuzzy_index import levenshtein
+
+DATABASE_PATTERNS = ["open chrome|launch chrome|start chrome", "open notepad|launch notepad|start notepad",
+                     "volume up|increase volume|louder", "search for (.+)|google (.+)|look up (.+)"]
+CUSTOM_COMMANDS = ["open project folder", "start meeting", "start coding"]
+
+CASES = {
+    "opn chrome": "open chrome",
+    "chrome": "open chrome",
+    "serch for cats": "search for cats",
+    "volum up": "volume up",
+    "take screen shot": "take screenshot",
+    "start meting": "start meeting",
+    "open open project folder": "open project folder",
+    "tel me a joke": "tell me a joke",
+    "skroll down": "scroll down",
+    "minimise al": "minimize all",
+    "blorp": None,
+}
+
+
+def main():
+    print("=" * 60)
+    print("COMMAND SUGGESTION TEST")
+    print("=" * 60)
+    assert levenshtein("kitten", "sitting") == 3 and levenshtein("", "abc") == 3
+
+    processor = EnhancedCommandProcessor()
+    processor.add_known_commands(DATABASE_PATTERNS, "database")
+    processor.add_known_commands(CUSTOM_COMMANDS, "custom", literal=True)
+    print(f"✓ {len(processor.suggestions)} known command phrases")
+
+    failures = 0
+    timings = []
+    for text, expected in CASES.items():
+        start = time.perf_counter()
+        suggestions = processor.suggest_commands(text)
+        timings.append((time.perf_counter() - start) * 1e6)
+        got = suggestions[0][0] if suggestions else None
+        ok = got == expected
+        failures += not ok
+        shown = ", ".join(f"{s} ({score:.2f})" for s, score in suggestions) or "-"
+        print(f"{'✓' if ok else '✗'} {text:26s} → {shown}")
+
+    timings.sort()
+    print(f"\nLookup: median {timings[len(timings) // 2]:.0f} µs, max {timings[-1]:.0f} µs")
+    print("\nAll suggestions matched" if failures == 0 else f"\n{failures} suggestion(s) wrong")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,118 @@
+"""
+Test for compound commands
+Checks how EnhancedCommandProcessor.plan_command splits utterances holding
+several commands and orders their steps, then runs plans through run_plan
+with a stand-in executor to check that dependent steps wait (including the
+settle time) while independent steps overlap, and which words a short
+pause may have cut off from the rest of a command. No microphone, network
+or system control needed.
+"""
+import threading
+import time
+
+from command_processor import EnhancedCommandProcessor, run_plan
+from endpointer import Endpointer
+
+# utterance -> [(step text, action, index of the step it waits for)], None if not split
+PLANS = [
+    ("open chrome and search for python tutorials",
+     [("open chrome", "application", None), ("search for python tutorials", "web", 0)]),
+    ("please open notepad then type hello world and press enter",
+     [("please open notepad", "application", None), ("type hello world", "typing", 0), ("press enter", "typing", 1)]),
+    ("volume up and open chrome, then scroll down",
+     [("volume up", "system", None), ("open chrome", "application", None), ("scroll down", "scroll", 1)]),
+    ("open chrome and then mute and search for salt and pepper",
+     [("open chrome", "application", None), ("mute", "system", None), ("search for salt and pepper", "web", 0)]),
+    ("search for salt and pepper", None),
+    ("type salt and pepper", None),
+    ("type hello and goodbye", None),
+    ("tom and jerry", None),
+    ("blah and open chrome", None),
+    ("open chrome", None),
+]
+
+
+def check_plans(processor):
+    ok = True
+    for text, expected in PLANS:
+        steps = processor.plan_command(text)
+        got = steps and [(s["text"], s["command"]["action"], s["after"]) for s in steps]
+        if got != expected:
+            ok = False
+            print(f"✗ '{text}': expected {expected}, got {got}")
+    print(f"{'✓' if ok else '✗'} {len(PLANS)} utterances planned")
+
+    # A user-defined command is never split
+    processor.load_user_commands([{"id": 1, "name": "focus", "pattern": "mute and open notepad",
+                                   "type": "application", "parameters": '{"app": "notepad"}'}], version=1)
+    ok = ok and processor.plan_command("mute and open notepad") is None
+    ok = ok and len(processor.plan_command("mute and open chrome")) == 2
+    return ok
+
+
+# Recognized after a short endpoint -> whether to wait for the rest of the command
+CONTINUATIONS = [
+    ("open", True), ("um open", True), ("volume", True), ("turn on", True), ("type", True),
+    ("search for", True), ("open chrome", False), ("volume up", False), ("scroll down", False),
+    ("hello there", False), ("banana", False),
+]
+
+
+def check_continuations(processor):
+    wrong = [text for text, expected in CONTINUATIONS
+             if (Endpointer.wants_continuation(text) or processor.incomplete_command(text)) != expected]
+    print(f"{'✓' if not wrong else '✗'} {len(CONTINUATIONS) - len(wrong)}/{len(CONTINUATIONS)} "
+          f"cut-off commands recognized" + (f" (wrong: {wrong})" if wrong else ""))
+    return not wrong
+
+
+def timed_run(steps, fail=()):
+    """run_plan with an executor that takes 50 ms per step; {parameters: (start, end)}."""
+    spans, lock = {}, threading.Lock()
+    origin = time.perf_counter()
+
+    def execute(command):
+        start = time.perf_counter() - origin
+        time.sleep(0.05)
+        with lock:
+            spans[str(command["parameters"])] = (start, time.perf_counter() - origin)
+        return command["parameters"].get("app") not in fail
+
+    # Settle times scaled down from seconds to tens of milliseconds
+    result = run_plan(steps, execute, log=lambda message: None, sleep=lambda seconds: time.sleep(seconds / 20))
+    return result, spans, time.perf_counter() - origin
+
+
+def check_execution(processor):
+    steps = processor.plan_command("open chrome and search for python tutorials and volume up")
+    ok, spans, elapsed = timed_run(steps)
+    launch = spans[str(steps[0]["command"]["parameters"])]
+    search = spans[str(steps[1]["command"]["parameters"])]
+    volume = spans[str(steps[2]["command"]["parameters"])]
+    waited = search[0] >= launch[1] + steps[0]["settle"] / 20
+    overlapped = volume[0] < launch[1]
+    print(f"{'✓' if waited else '✗'} search started {search[0] * 1000:.0f} ms in, after the launch settled")
+    print(f"{'✓' if overlapped else '✗'} volume ran alongside the launch ({volume[0] * 1000:.0f} ms in); "
+          f"plan took {elapsed * 1000:.0f} ms for 3 × 50 ms steps")
+    ok = ok and waited and overlapped
+
+    ok_failed, spans, _ = timed_run(steps, fail=("chrome",))
+    skipped = not ok_failed and len(spans) == 2
+    print(f"{'✓' if skipped else '✗'} search skipped when the launch fails")
+    return ok and skipped
+
+
+def main():
+    print("=" * 60)
+    print("COMPOUND COMMAND TEST")
+    print("=" * 60)
+    processor = EnhancedCommandProcessor()
+    ok = check_execution(processor)
+    ok = check_continuations(processor) and ok
+    ok = check_plans(processor) and ok
+    print("\nCompound commands OK" if ok else "\nCompound command test failed")
+    return ok
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,112 @@
+"""
+Test for the intent classifier fallback
+Trains the classifier from the built-in patterns, then checks that
+misheard commands no pattern accepts are classified correctly, that
+unrelated speech is rejected, that a prediction takes well under a
+millisecond, that a long command history doesn't slow training down and that a saved model predicts the same after loading.
+No microphone or network needed.
+"""
+import json
+import os
+import tempfile
+import time
+
+from command_processor import EnhancedCommandProcessor
+from intent_classifier import IntentClassifier, guessable, train_from, training_examples
+
+# Recognizer slips and rewordings the patterns miss -> (action, parameters)
+MISHEARD = [
+    ("scroll dawn", "scroll", {"direction": "down"}),
+    ("brightnes dawn", "system", {"action": "brightness", "direction": "down"}),
+    ("next tap", "window", {"action": "switch_tab"}),
+    ("go to next tap", "window", {"action": "switch_tab"}),
+    ("new tap", "window", {"action": "new_tab"}),
+    ("previus tab", "window", {"action": "previous_tab"}),
+    ("minimize windo", "window", {"action": "minimize_window"}),
+    ("maximise window", "window", {"action": "maximize_window"}),
+    ("take a screen shot", "system", {"action": "screenshot"}),
+    ("paus music", "media", {"action": "pause_music"}),
+]
+
+# Misheard irreversible commands must not be guessed
+UNSAFE = ["lock the computer", "lock it", "shut dawn", "restart the computer", "go to sleap", "empty the bin"]
+
+UNRELATED = [
+    "banana", "i had lunch", "the weather was lovely", "my cat is sleeping", "blue car",
+    "qwerty", "the meeting ran long", "sandwich", "i think so", "purple elephant", "chair",
+]
+
+
+def main():
+    print("=" * 60)
+    print("INTENT CLASSIFIER TEST")
+    print("=" * 60)
+    processor = EnhancedCommandProcessor()
+    classifier, accuracy, seconds = train_from(processor, history=["um please scroll down"], path=None)
+    print(f"✓ trained on {classifier.trained_on} examples, {len(classifier.labels)} commands, "
+          f"{accuracy:.0%} fit in {seconds:.1f}s")
+    ok = accuracy > 0.95
+
+    for text, *_ in MISHEARD:
+        assert processor.parse_patterns(processor.extract_command(text)) is None, f"patterns already accept '{text}'"
+    correct = 0
+    for text, action, parameters in MISHEARD:
+        predicted = classifier.predict(text)
+        got = predicted and (predicted[0]["action"], predicted[0]["parameters"])
+        if got == (action, parameters):
+            correct += 1
+        else:
+            print(f"✗ '{text}': got {got}")
+    print(f"{'✓' if correct >= len(MISHEARD) - 2 else '✗'} {correct}/{len(MISHEARD)} misheard commands classified")
+    ok = ok and correct >= len(MISHEARD) - 2
+
+    accepted = [text for text in UNRELATED if classifier.predict(text) is not None]
+    print(f"{'✓' if not accepted else '✗'} {len(UNRELATED) - len(accepted)}/{len(UNRELATED)} unrelated utterances rejected"
+          + (f" (accepted {accepted})" if accepted else ""))
+    ok = ok and not accepted
+
+    guessed = [text for text in UNSAFE if classifier.predict(text) is not None]
+    unsafe_labels = [label for label in classifier.labels if not guessable(json.loads(label))]
+    print(f"{'✓' if not guessed and not unsafe_labels else '✗'} shutdown, restart, sleep, lock and "
+          f"empty recycle bin are never guessed" + (f" (guessed {guessed})" if guessed else ""))
+    ok = ok and not guessed and not unsafe_labels
+
+    # Through the processor: patterns first, classifier only when they miss
+    processor.set_classifier(classifier)
+    assert processor.process_command("scroll down")["confidence"] == 0.9
+    result = processor.process_command("please scroll dawn")
+    print(f"✓ process_command('please scroll dawn') -> {result}")
+    ok = ok and result["action"] == "scroll" and result["confidence"] < 0.9
+    ok = ok and processor.process_command("banana")["action"] == "unknown"
+
+    texts = [text for text, *_ in MISHEARD] + UNRELATED
+    start = time.perf_counter()
+    for _ in range(20):
+        for text in texts:
+            classifier.predict(text)
+    per_call_us = (time.perf_counter() - start) / (20 * len(texts)) * 1e6
+    print(f"{'✓' if per_call_us < 1000 else '✗'} {per_call_us:.0f} µs per prediction")
+    ok = ok and per_call_us < 1000
+
+    # The app trains on up to 2000 history rows
+    history = ["please scroll down", "volume up", "open chrome", "banana"] * 500
+    start = time.perf_counter()
+    history_texts, _ = training_examples(processor, history)
+    seconds = time.perf_counter() - start
+    print(f"{'✓' if seconds < 2.0 else '✗'} {len(history)} history rows -> {len(history_texts)} examples "
+          f"in {seconds:.2f}s")
+    ok = ok and seconds < 2.0
+
+    path = os.path.join(tempfile.mkdtemp(), "intent_model.npz")
+    classifier.save(path)
+    loaded = IntentClassifier()
+    same = loaded.load(path) and all(loaded.predict(t) == classifier.predict(t) for t in texts)
+    print(f"{'✓' if same else '✗'} saved model predicts the same after loading")
+    ok = ok and same and not IntentClassifier().load(path + ".missing")
+
+    print("\nIntent classifier OK" if ok else "\nIntent classifier test failed")
+    return ok
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,166 @@
+"""
+Parity test and benchmark for the compiled intent matcher
+Checks that EnhancedCommandProcessor's keyword-indexed matcher picks the
+same pattern with the same groups as trying every pattern with re.search in
+order, over a fixed corpus plus random word salads, then times both with
+the built-in patterns and with a few thousand extra user-style commands.
+No microphone or network needed.
+"""
+import random
+import re
+import time
+
+from command_processor import EnhancedCommandProcessor
+
+CORPUS = [
+    "open chrome", "close notepad", "launch spotify", "start word", "run cmd",
+    "open youtube", "go to github", "open whatsapp web", "google maps", "open stack overflow",
+    "search for weather in london", "search cats in google", "google search python lists",
+    "search google for pizza", "browse news", "look up the time in tokyo", "find my keys",
+    "show me funny videos", "check weather", "check news",
+    "type hello world", "write a letter", "enter password", "type 5", "press seven",
+    "new line", "new paragraph", "press enter", "press tab", "space", "hit spacebar",
+    "backspace", "delete", "go back", "go forward", "press escape", "escape",
+    "select all", "select next word", "select previous line", "click submit", "choose the blue one",
+    "close tab", "close this table", "go to next tab", "switch previous tab", "new tab",
+    "switch window", "change window", "next window", "previous window",
+    "switch to notepad", "change to chrome", "minimize window", "maximize the window", "close this window",
+    "scroll up", "scroll down", "page up", "scroll to top", "scroll to bottom",
+    "hello", "hi there", "how are you", "what's your name", "what is your name", "thanks",
+    "goodbye", "help", "what can you do", "who made you", "tell me a joke",
+    "volume up", "volume down", "raise the volume", "lower volume", "turn the volume up",
+    "make it louder", "mute", "unmute", "brightness up", "dim the brightness", "turn up brightness",
+    "lock screen", "shut down", "restart", "reboot", "sleep", "take screenshot",
+    "what time is it", "time", "tell me the time", "current date", "today's date", "date",
+    "minimize all", "show desktop", "task manager", "check internet", "empty the recycle bin",
+    "create folder projects", "make a file notes", "open documents", "go to downloads", "open file explorer",
+    "play", "play this", "play first video", "play the video", "select second result",
+    "play 3rd video", "click first one", "select video about cooking", "play result titled lofi",
+    "find and play jazz", "select first one", "select down", "move up", "down", "up",
+    "next result", "previous video", "play music", "pause song", "skip track", "last song",
+    "stop playing music", "connect wifi", "disconnect wifi", "show ip", "network settings",
+    "set timer 5 minutes", "set alarm 7 am", "calculate 2 plus 2", "add 3 and 4", "what is 12 * 4",
+    "what's 7 / 2", "solve x squared", "copy this text", "paste", "read the page", "say hi",
+    "enable gesture", "turn off virtual mouse", "toggle mouse", "right", "left",
+    "arrow up", "press down", "press left", "", "   ", "blah blah", "asdfgh",
+    "please open the calculator", "can you search for flights", "ok type thanks a lot",
+]
+
+# Database-style patterns are arbitrary regexes, including local flags
+INLINE_FLAG_PATTERNS = [
+    (r"(?i:Volume) up", "inline_volume"),
+    (r"^(?i:OPEN (?:my )?Notes)$", "inline_notes"),
+    (r"(?i:Play) (?:the )?(?i:Jazz)", "inline_jazz"),
+    (r"(?i:dim|Dark)(?:en)? mode", "inline_dark"),
+]
+INLINE_FLAG_TEXTS = ["volume up", "open my notes", "open notes", "play the jazz", "darken mode", "dim mode"]
+
+VOCAB = sorted({w for text in CORPUS for w in text.split()} | {"the", "a", "to", "of", "and", "this", "it"})
+
+
+def reference_match(processor, t):
+    """The original matching loop: re.search over every pattern in order."""
+    for cat, pats in processor.patterns.items():
+        for pattern, action in pats:
+            m = re.search(pattern, t)
+            if m:
+                return cat, action, m
+    return None
+
+
+def signature(found):
+    if found is None:
+        return None
+    cat, action, m = found
+    return cat, action, m.span(), m.groups()
+
+
+def build_corpus(n_random=3000, seed=11):
+    rng = random.Random(seed)
+    texts = [t.lower().strip() for t in CORPUS]
+    for _ in range(n_random):
+        texts.append(" ".join(rng.choice(VOCAB) for _ in range(rng.randint(1, 6))))
+    return texts
+
+
+def bench(fn, texts, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for t in texts:
+            fn(t)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(texts) * 1e6
+
+
+def main():
+    print("=" * 60)
+    print("INTENT MATCHER PARITY TEST")
+    print("=" * 60)
+    processor = EnhancedCommandProcessor()
+    print(f"✓ {len(processor._entries)} patterns compiled, {len(processor._index)} keywords, "
+          f"{len(processor._unindexed)} always tried")
+    texts = build_corpus()
+    ok = check(processor, texts)
+
+    # A key from inside (?i:...) could be absent from the lower-cased text
+    inline = EnhancedCommandProcessor()
+    inline.patterns = dict({"inline": INLINE_FLAG_PATTERNS}, **inline.patterns)
+    inline.compile_patterns()
+    print("With inline (?i:...) patterns first:")
+    ok = check(inline, INLINE_FLAG_TEXTS + texts[:500]) and ok
+
+    reference_us = bench(lambda t: reference_match(processor, t), texts)
+    compiled_us = bench(processor.match, texts)
+    processor.clear_cache()
+    full_us = bench(processor.process_command, CORPUS, repeat=1)
+    cached_us = bench(processor.process_command, CORPUS)
+    print(f"\nPer utterance: re.search loop {reference_us:.1f} µs, indexed matcher {compiled_us:.1f} µs "
+          f"({reference_us / compiled_us:.1f}x); process_command {full_us:.1f} µs, repeated {cached_us:.1f} µs")
+    assert all(processor.process_command(t) == processor._parse(t) for t in CORPUS), "cached parse differs"
+    print(f"✓ {processor.cache_summary()}")
+
+    # Thousands of extra commands grow the pattern set
+    processor.patterns["custom"] = [(rf"macro {name}( now)?", "custom_macro")
+                                    for name in (f"job{i}" for i in range(3000))]
+    processor.compile_patterns()
+    print(f"\nWith {len(processor._entries)} patterns")
+    # Compare with trying every compiled pattern in order: re.search itself
+    # would recompile here, since its cache only holds 512 patterns
+    indexed = [signature(processor.match(t)) for t in texts]
+    key_lengths, processor._key_lengths = processor._key_lengths, []
+    mismatches = sum(signature(processor.match(t)) != sig for t, sig in zip(texts, indexed))
+    loop_us = bench(processor.match, texts, repeat=1)
+    processor._key_lengths = key_lengths
+    print(f"{'✓' if not mismatches else '✗'} {len(texts) - mismatches}/{len(texts)} utterances match the compiled loop")
+    assert processor.match("macro job2999 now")[1] == "custom_macro"
+    compiled_us = bench(processor.match, texts)
+    print(f"Per utterance: compiled loop {loop_us:.1f} µs, indexed matcher {compiled_us:.1f} µs "
+          f"({loop_us / compiled_us:.1f}x)")
+    ok = ok and mismatches == 0
+
+    print("\nAll utterances matched" if ok else "\nParity check failed")
+    return ok
+
+
+def check(processor, texts):
+    mismatches = 0
+    for t in texts:
+        expected, got = signature(reference_match(processor, t)), signature(processor.match(t))
+        if expected != got:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"✗ '{t}': expected {expected}, got {got}")
+    print(f"{'✓' if not mismatches else '✗'} {len(texts) - mismatches}/{len(texts)} utterances match the reference")
+
+    # Without the index every pattern is tried in order
+    key_lengths, processor._key_lengths = processor._key_lengths, []
+    fallback = sum(signature(processor.match(t)) != signature(reference_match(processor, t)) for t in texts)
+    processor._key_lengths = key_lengths
+    print(f"{'✓' if not fallback else '✗'} unindexed matcher: {fallback} mismatches")
+    return mismatches == 0 and fallback == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,85 @@
+"""
+Offline test for database-defined voice commands
+Loads commands shaped like the rows update_database.py writes, checks they
+are matched before the built-in patterns (whole command only, first group
+filling the parameter) and that reloading replaces them, also while
+another thread reads the patterns.
+No microphone or network needed.
+"""
+import threading
+
+from command_processor import EnhancedCommandProcessor
+from intent_classifier import training_examples
+
+ROWS = [
+    {"id": 1, "name": "Volume Up", "pattern": "volume up|increase volume|louder", "type": "system",
+     "parameters": '{"action": "volume", "direction": "up"}'},
+    {"id": 2, "name": "Open Notes", "pattern": "my notes|open my notes", "type": "application",
+     "parameters": '{"app": "notepad"}'},
+    {"id": 3, "name": "Lookup", "pattern": "what does (.+) mean", "type": "web",
+     "parameters": '{"is_website": false}'},
+    {"id": 4, "name": "Broken", "pattern": "bad (pattern", "type": "system", "parameters": "{}"},
+]
+
+CASES = [
+    ("louder", "system", {"action": "volume", "direction": "up"}),
+    ("my notes", "application", {"app": "notepad"}),
+    ("what does ephemeral mean", "web", {"query": "ephemeral", "is_website": False}),
+    # Whole command only: no partial match inside a longer utterance
+    ("louder than ever", "unknown", {}),
+    # A user command beats the built-in pattern sharing its verb...
+    ("open my notes", "application", {"app": "notepad"}),
+    # ...but only as the whole command: the rest still goes to the built-ins
+    ("open my notes folder", "application", {"app": "my"}),
+    ("volume down", "system", {"action": "volume", "direction": "down"}),
+]
+
+
+def main():
+    print("=" * 60)
+    print("DATABASE COMMANDS TEST")
+    print("=" * 60)
+    processor = EnhancedCommandProcessor()
+    loaded = processor.load_user_commands(ROWS, version=1)
+    assert loaded == 3 and processor.user_commands_version == 1
+    print(f"✓ Loaded {loaded} of {len(ROWS)} rows (invalid pattern skipped)")
+
+    failures = 0
+    for text, action, parameters in CASES:
+        result = processor.process_command(text)
+        ok = result["action"] == action and all(result["parameters"].get(k) == v for k, v in parameters.items())
+        failures += not ok
+        print(f"{'✓' if ok else '✗'} {text:28s} → {result['action']} {result['parameters']}")
+
+    processor.load_user_commands(ROWS[1:2], version=2)
+    ok = processor.process_command("louder")["action"] == "unknown" and processor.process_command("my notes")["action"] == "application"
+    failures += not ok
+    print(f"{'✓' if ok else '✗'} reload replaces the previous commands")
+
+    # The table watcher reloads while the intent model trains from the patterns
+    errors = []
+
+    def reload_repeatedly():
+        try:
+            for version in range(3, 25):
+                processor.load_user_commands(ROWS[version % 2:3], version=version)
+        except Exception as e:
+            errors.append(e)
+
+    reloader = threading.Thread(target=reload_repeatedly)
+    reloader.start()
+    try:
+        while reloader.is_alive():
+            training_examples(processor)
+    except Exception as e:
+        errors.append(e)
+    reloader.join()
+    failures += bool(errors)
+    print(f"{'✓' if not errors else '✗'} reloads while the patterns are read" + (f" ({errors[0]!r})" if errors else ""))
+
+    print("\nAll commands matched" if failures == 0 else f"\n{failures} check(s) failed")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
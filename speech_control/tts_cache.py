@@ -0,0 +1,195 @@
+"""
+Disk cache of synthesized speech
+WAV files keyed by text + voice + rate + volume with LRU eviction, so fixed
+assistant replies are synthesized once and afterwards played straight from
+disk.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import wave
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import sounddevice as sd
+    SOUNDDEVICE_AVAILABLE = True
+except Exception:  # ImportError, or OSError when PortAudio is missing
+    sd = None
+    SOUNDDEVICE_AVAILABLE = False
+
+try:
+    import winsound
+    WINSOUND_AVAILABLE = True
+except ImportError:
+    winsound = None
+    WINSOUND_AVAILABLE = False
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache")
+PLAYBACK_AVAILABLE = SOUNDDEVICE_AVAILABLE or WINSOUND_AVAILABLE
+
+
+def cache_key(text, voice, rate, volume):
+    raw = f"{voice}|{int(rate)}|{float(volume):.2f}|{' '.join(text.split())}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def is_wav(path):
+    """Whether ``path`` is a RIFF/WAVE file (some engines, e.g. macOS nsss, write AIFF)."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(12)
+    except OSError:
+        return False
+    return len(header) == 12 and header[:4] == b"RIFF" and header[8:] == b"WAVE"
+
+
+def wav_duration(path):
+    with wave.open(path, "rb") as wf:
+        return wf.getnframes() / float(wf.getframerate())
+
+
+def play_wav(path, interrupt=None):
+    """Play a WAV file, blocking until done. Returns False if ``interrupt`` cut it off."""
+    duration = wav_duration(path)
+    if SOUNDDEVICE_AVAILABLE:
+        with wave.open(path, "rb") as wf:
+            width, channels, rate = wf.getsampwidth(), wf.getnchannels(), wf.getframerate()
+            dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+            samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=dtype).reshape(-1, channels)
+        sd.play(samples, rate)
+        stop = sd.stop
+    elif WINSOUND_AVAILABLE:
+        winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+        stop = lambda: winsound.PlaySound(None, 0)
+    else:
+        raise RuntimeError("no audio playback backend (pip install sounddevice)")
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        if interrupt is not None and interrupt.wait(0.02):
+            stop()
+            return False
+        if interrupt is None:
+            time.sleep(0.02)
+    return True
+
+
+class TTSCache:
+    """LRU cache of rendered utterances on disk.
+
+    ``index.json`` keeps entries oldest-first; ``get`` marks an entry as
+    recently used and the least recently used files are deleted once the
+    cache exceeds ``max_entries`` or ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_entries=400, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> {"file", "size", "text"}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.load()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.cache_dir, "index.json")
+
+    @property
+    def total_bytes(self):
+        return sum(e["size"] for e in self.entries.values())
+
+    def load(self):
+        self.entries = OrderedDict()
+        try:
+            with open(self.index_path, "r") as f:
+                for key, entry in json.load(f):
+                    if os.path.exists(os.path.join(self.cache_dir, entry["file"])):
+                        self.entries[key] = entry
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"TTS cache index unreadable, starting empty: {e}")
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(list(self.entries.items()), f)
+            os.replace(tmp, self.index_path)
+            self._dirty = False
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """Path of the cached WAV, or None."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            path = os.path.join(self.cache_dir, entry["file"])
+            if not os.path.exists(path):
+                del self.entries[key]
+                self._dirty = True
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self._dirty = True
+            self.hits += 1
+            return path
+
+    def path_for(self, key):
+        """Where a new rendering for ``key`` should be written."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def add(self, key, text):
+        """Register a rendering already written to ``path_for(key)``."""
+        path = self.path_for(key)
+        if not os.path.exists(path) or os.path.getsize(path) <= 44:  # header only: synthesis failed
+            return False
+        if not is_wav(path):
+            os.remove(path)
+            return False
+        with self._lock:
+            self.entries[key] = {"file": os.path.basename(path), "size": os.path.getsize(path), "text": text}
+            self.entries.move_to_end(key)
+            self._dirty = True
+            self._evict()
+        return True
+
+    def _evict(self):
+        total = self.total_bytes
+        while self.entries and (len(self.entries) > self.max_entries or total > self.max_bytes):
+            _key, entry = self.entries.popitem(last=False)
+            total -= entry["size"]
+            try:
+                os.remove(os.path.join(self.cache_dir, entry["file"]))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for entry in self.entries.values():
+                try:
+                    os.remove(os.path.join(self.cache_dir, entry["file"]))
+                except OSError:
+                    pass
+            self.entries.clear()
+            self._dirty = True
+        self.save()
+
+    def summary(self):
+        return (f"{len(self.entries)} clips, {self.total_bytes / 1e6:.1f} MB, "
+                f"{self.hits} hits / {self.misses} misses")
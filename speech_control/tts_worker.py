@@ -0,0 +1,357 @@
+"""
+Serialized text-to-speech
+One worker thread owns the pyttsx3 engine and speaks messages from a
+priority queue, so replies never overlap and no thread is spawned per reply.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+from tts_cache import cache_key, is_wav, play_wav, PLAYBACK_AVAILABLE
+
+URGENT = 0
+NORMAL = 1
+LOW = 2
+
+# (rate, volume) per emotion; anything else uses the engine defaults
+EMOTION_VOICE = {
+    "excited": (180, 0.95),
+    "friendly": (165, 0.9),
+    "calm": (150, 0.85),
+    "serious": (145, 0.9),
+}
+
+
+class Utterance:
+    def __init__(self, text, emotion, priority, interruptible, max_age, on_start=None, on_done=None):
+        self.text = text
+        self.emotion = emotion
+        self.priority = priority
+        self.interruptible = interruptible
+        self.max_age = max_age
+        self.on_start = on_start
+        self.on_done = on_done
+        self.created = time.perf_counter()
+        self.done = threading.Event()
+
+    def is_stale(self, now):
+        return self.max_age is not None and now - self.created > self.max_age
+
+    def started(self):
+        if self.on_start is not None:
+            try:
+                self.on_start()
+            except Exception as e:
+                print(f"TTS callback error: {e}")
+
+    def finish(self):
+        """Spoken or dropped: release waiters and run ``on_done`` once."""
+        if self.done.is_set():
+            return
+        self.done.set()
+        if self.on_done is not None:
+            try:
+                self.on_done()
+            except Exception as e:
+                print(f"TTS callback error: {e}")
+
+
+class TTSWorker:
+    """Owns the TTS engine on a single thread.
+
+    ``say`` queues a message and returns immediately. Lower priority numbers
+    are spoken first (FIFO within a priority); queued messages older than
+    their ``max_age`` are dropped, and consecutive queued messages with the
+    same priority and emotion are merged into one ``runAndWait``.
+    ``preempt=True`` cuts off the current interruptible message and discards
+    queued ones of equal or lower priority.
+
+    The engine is created by ``engine_factory`` inside the worker thread,
+    since some pyttsx3 drivers must be used from the thread that made them.
+
+    With a ``cache`` (TTSCache), messages already rendered for the current
+    voice are played from disk; ``prewarm`` renders texts in the background
+    whenever nothing is waiting to be spoken. A message queued during a
+    render aborts it; the render is retried when the worker is idle again.
+    """
+
+    def __init__(self, engine_factory, on_idle=None, low_priority_max_age=4.0, cache=None):
+        self.engine_factory = engine_factory
+        self.on_idle = on_idle
+        self.low_priority_max_age = low_priority_max_age
+        self.cache = cache if PLAYBACK_AVAILABLE else None
+        self.engine = None
+        self._defaults = (165, 0.9)
+        self._render_jobs = deque()
+        self.rendered = 0
+        self.cache_played = 0
+        self.spoken = 0
+        self.dropped = 0
+        self.merged = 0
+        self.preempted = 0
+        self.barged_in = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._current = None
+        self._rendering = False
+        self._interrupt = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.interrupt()
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        if self.cache is not None:
+            self.cache.save()
+
+    def prewarm(self, items):
+        """Render (text, emotion) pairs into the cache while the worker is idle."""
+        if self.cache is None:
+            return 0
+        with self._cond:
+            self._render_jobs.extend(items)
+            self._cond.notify()
+        return len(items)
+
+    @property
+    def speaking(self):
+        return self._current is not None
+
+    def say(self, text, emotion="neutral", priority=NORMAL, preempt=False, interruptible=True, max_age=None,
+            on_start=None, on_done=None):
+        """Queue ``text``; returns an Event that is set once it was spoken or dropped.
+
+        ``on_start`` / ``on_done`` run on the worker thread when playback
+        starts and when the message was spoken, cut off or dropped.
+        """
+        if max_age is None and priority >= LOW:
+            max_age = self.low_priority_max_age
+        utterance = Utterance(text, emotion, priority, interruptible, max_age, on_start, on_done)
+        if not text or not text.strip():
+            utterance.finish()
+            return utterance.done
+        with self._cond:
+            if preempt:
+                self._discard(lambda u: u.priority >= priority)
+                current = self._current
+                if current is not None and current.interruptible and current.priority >= priority:
+                    self.preempted += 1
+                    self._cut()
+            heapq.heappush(self._heap, (priority, next(self._seq), utterance))
+            if self._rendering:
+                # Background rendering never delays a reply
+                self._cut()
+            self._cond.notify()
+        return utterance.done
+
+    def interrupt(self):
+        """Stop the current message and drop everything queued."""
+        with self._cond:
+            self._discard(lambda u: True)
+            if self._current is not None:
+                self._cut()
+
+    def barge_in(self):
+        """The user started talking: stop the current message if it may be
+        interrupted and drop queued replies that are not urgent."""
+        with self._cond:
+            current = self._current
+            if current is None or not current.interruptible:
+                return False
+            self._discard(lambda u: u.priority > URGENT)
+            self.barged_in += 1
+            self._cut()
+            return True
+
+    def _discard(self, predicate):
+        # Caller holds the condition
+        keep = []
+        for entry in self._heap:
+            if predicate(entry[2]):
+                entry[2].finish()
+                self.dropped += 1
+            else:
+                keep.append(entry)
+        heapq.heapify(keep)
+        self._heap = keep
+
+    def _cut(self):
+        self._interrupt.set()
+        try:
+            self.engine.stop()
+        except Exception:
+            pass
+
+    def _next(self):
+        """Pop the next fresh message, merging queued followers that sound the same.
+
+        Returns a list of Utterances, a (text, emotion) render job when only
+        background work is left, or None.
+        """
+        with self._cond:
+            while self._running and not self._heap and not self._render_jobs:
+                self._cond.wait(timeout=0.5)
+            if not self._running:
+                return None
+            if not self._heap:
+                self._rendering = True
+                self._interrupt.clear()
+                return self._render_jobs.popleft()
+            now = time.perf_counter()
+            first = None
+            while self._heap and first is None:
+                utterance = heapq.heappop(self._heap)[2]
+                if utterance.is_stale(now):
+                    utterance.finish()
+                    self.dropped += 1
+                else:
+                    first = utterance
+            if first is None:
+                return None
+            parts = [first]
+            while self._heap:
+                follower = self._heap[0][2]
+                if follower.is_stale(now):
+                    heapq.heappop(self._heap)
+                    follower.finish()
+                    self.dropped += 1
+                    continue
+                if (follower.priority != first.priority or follower.emotion != first.emotion
+                        or follower.interruptible != first.interruptible):
+                    break
+                heapq.heappop(self._heap)
+                parts.append(follower)
+                self.merged += 1
+            self._current = first
+            self._interrupt.clear()
+            return parts
+
+    def _voice(self, emotion):
+        """(voice id, rate, volume) the engine will use for ``emotion``."""
+        rate, volume = EMOTION_VOICE.get(emotion, self._defaults)
+        try:
+            voice = self.engine.getProperty("voice")
+        except Exception:
+            voice = ""
+        return voice, rate, volume
+
+    def _apply_voice(self, emotion):
+        voice, rate, volume = self._voice(emotion)
+        self.engine.setProperty("rate", rate)
+        self.engine.setProperty("volume", volume)
+        return voice, rate, volume
+
+    def _render(self, text, emotion):
+        voice, rate, volume = self._apply_voice(emotion)
+        key = cache_key(text, voice, rate, volume)
+        if key in self.cache:
+            return
+        path = self.cache.path_for(key)
+        try:
+            if not self._interrupt.is_set():
+                self.engine.save_to_file(text, path)
+                self.engine.runAndWait()
+            if self._interrupt.is_set():
+                # Cut short for a reply: drop the partial file, try again later
+                if os.path.exists(path):
+                    os.remove(path)
+                with self._cond:
+                    self._render_jobs.appendleft((text, emotion))
+                return
+            if os.path.exists(path) and not is_wav(path):
+                # The driver writes another format (AIFF on macOS): play everything live
+                print("TTS engine does not write WAV files; speech cache disabled")
+                os.remove(path)
+                self._render_jobs.clear()
+                self.cache = None
+                return
+            if self.cache.add(key, text):
+                self.rendered += 1
+        except Exception as e:
+            print(f"TTS cache render error: {e}")
+        if not self._render_jobs:
+            self.cache.save()
+
+    def _run(self):
+        try:
+            self.engine = self.engine_factory()
+            self._defaults = (self.engine.getProperty("rate"), self.engine.getProperty("volume"))
+            self.engine.connect("started-word", self._on_word)
+        except Exception as e:
+            print(f"TTS engine initialization error: {e}")
+            self._running = False
+            return
+
+        while self._running:
+            parts = self._next()
+            if not parts:
+                continue
+            if isinstance(parts, tuple):
+                try:
+                    self._render(*parts)
+                finally:
+                    with self._cond:
+                        self._rendering = False
+                continue
+            first = parts[0]
+            text = " ".join(p.text.strip() for p in parts)
+            for p in parts:
+                p.started()
+            try:
+                voice, rate, volume = self._apply_voice(first.emotion)
+                cached = self.cache.get(cache_key(text, voice, rate, volume)) if self.cache is not None else None
+                if cached is not None:
+                    try:
+                        play_wav(cached, self._interrupt)
+                        self.cache_played += 1
+                    except Exception as e:
+                        print(f"Cached speech unplayable, synthesizing instead: {e}")
+                        cached = None
+                if cached is None:
+                    self.engine.say(text)
+                    self.engine.runAndWait()
+                self.spoken += len(parts)
+            except Exception as e:
+                print(f"TTS error: {e}")
+            finally:
+                with self._cond:
+                    self._current = None
+                for p in parts:
+                    p.finish()
+                if self.on_idle is not None and not self._heap:
+                    try:
+                        self.on_idle()
+                    except Exception:
+                        pass
+
+    def _on_word(self, name, location, length):
+        # Backup for drivers that ignore stop() from another thread
+        if self._interrupt.is_set():
+            try:
+                self.engine.stop()
+            except Exception:
+                pass
+
+    def summary(self):
+        text = (f"spoken {self.spoken}, merged {self.merged}, "
+                f"dropped {self.dropped}, pre-empted {self.preempted}, barge-ins {self.barged_in}")
+        if self.cache is not None:
+            text += f"; cache: {self.cache_played} played from disk, {self.rendered} rendered ({self.cache.summary()})"
+        return text
@@ -0,0 +1,244 @@
+"""
+Offline wake-word spotter
+MFCC features + subsequence DTW against a few enrollment recordings, so idle
+audio never leaves the machine; full ASR only runs after a local hit.
+"""
+
+import os
+import re
+import wave
+
+import numpy as np
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wake_word_templates")
+
+
+# ---------------------------
+#   Audio helpers
+# ---------------------------
+def pcm_to_float(pcm, sample_width=2):
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}.get(sample_width, np.int16)
+    samples = np.frombuffer(pcm, dtype=dtype).astype(np.float32)
+    return samples / float(np.iinfo(dtype).max)
+
+
+def read_wav(path):
+    """Return (mono float32 samples in [-1, 1], sample_rate)."""
+    with wave.open(path, "rb") as wf:
+        rate, width, channels = wf.getframerate(), wf.getsampwidth(), wf.getnchannels()
+        samples = pcm_to_float(wf.readframes(wf.getnframes()), width)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def write_wav(path, pcm, sample_rate, sample_width=2):
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+
+
+# ---------------------------
+#   Features
+# ---------------------------
+_MEL_CACHE = {}
+
+
+def _mel_filterbank(sample_rate, n_fft, n_mels, fmin=80.0, fmax=4000.0):
+    key = (sample_rate, n_fft, n_mels, fmin, fmax)
+    if key in _MEL_CACHE:
+        return _MEL_CACHE[key]
+    fmax = min(fmax, sample_rate / 2.0)
+    mel = lambda f: 2595.0 * np.log10(1.0 + f / 700.0)
+    hz = lambda m: 700.0 * (10.0 ** (m / 2595.0) - 1.0)
+    points = hz(np.linspace(mel(fmin), mel(fmax), n_mels + 2))
+    bins = np.floor((n_fft + 1) * points / sample_rate).astype(int)
+    fb = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for i in range(1, n_mels + 1):
+        left, center, right = bins[i - 1], bins[i], bins[i + 1]
+        for k in range(left, center):
+            fb[i - 1, k] = (k - left) / max(1, center - left)
+        for k in range(center, right):
+            fb[i - 1, k] = (right - k) / max(1, right - center)
+    _MEL_CACHE[key] = fb
+    return fb
+
+
+def _dct_matrix(n_mfcc, n_mels):
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    return np.cos(np.pi / n_mels * (n + 0.5) * k).astype(np.float32)
+
+
+def mfcc(samples, sample_rate, n_mfcc=13, n_mels=26, frame_ms=25, hop_ms=10):
+    """(frames, n_mfcc - 1) MFCCs without c0, mean-normalised over voiced frames.
+
+    Dropping c0 makes the features independent of loudness; the mean is
+    taken over frames near the utterance's peak energy so leading/trailing
+    silence does not shift it.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    frame_len = int(sample_rate * frame_ms / 1000)
+    hop = int(sample_rate * hop_ms / 1000)
+    if len(samples) < frame_len:
+        samples = np.pad(samples, (0, frame_len - len(samples)))
+    emphasized = np.append(samples[0], samples[1:] - 0.97 * samples[:-1])
+    n_frames = 1 + (len(emphasized) - frame_len) // hop
+    idx = np.arange(frame_len)[None, :] + hop * np.arange(n_frames)[:, None]
+    frames = emphasized[idx] * np.hamming(frame_len).astype(np.float32)
+    n_fft = 1 << (frame_len - 1).bit_length()
+    power = (np.abs(np.fft.rfft(frames, n_fft)) ** 2) / n_fft
+    mel_energy = np.log(power @ _mel_filterbank(sample_rate, n_fft, n_mels).T + 1e-10)
+    coeffs = mel_energy @ _dct_matrix(n_mfcc, n_mels).T
+    frame_energy = np.log(power.sum(axis=1) + 1e-10)
+    voiced = frame_energy >= frame_energy.max() - np.log(1e3)  # within 30 dB of the peak
+    return coeffs[:, 1:] - coeffs[voiced, 1:].mean(axis=0, keepdims=True)
+
+
+def trim_silence(samples, sample_rate, ratio=0.1, frame_ms=20):
+    """Cut leading/trailing frames far below the utterance's peak energy."""
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    n = len(samples) // frame
+    if n < 3:
+        return samples
+    energy = np.sqrt(np.mean(samples[:n * frame].reshape(n, frame) ** 2, axis=1))
+    voiced = np.nonzero(energy >= energy.max() * ratio)[0]
+    if len(voiced) == 0:
+        return samples
+    return samples[voiced[0] * frame:(voiced[-1] + 1) * frame]
+
+
+# ---------------------------
+#   Matching
+# ---------------------------
+WAKE_FILLERS = ("hey", "hi", "ok", "okay", "hello", "yo", "there")
+
+
+def strip_wake_word(text, wake_word):
+    """What was said around the wake word: "hey nova, open chrome" -> "open chrome"."""
+    words = [w.strip(".,!?;:") for w in text.lower().split()]
+    words = [w for w in words if w]
+    wake_parts = wake_word.lower().split()
+    n = len(wake_parts)
+    for i in range(len(words) - n + 1):
+        if words[i:i + n] == wake_parts:
+            before = [w for w in words[:i] if w not in WAKE_FILLERS]
+            return " ".join(before + words[i + n:])
+    # Wake word only partially recognised: drop the parts that were heard
+    if not any(w in wake_parts for w in words):
+        return ""
+    rest = [w for w in words if w not in wake_parts and w not in WAKE_FILLERS]
+    return " ".join(rest)
+
+
+def subsequence_dtw(template, query):
+    """Best alignment cost of the whole ``template`` against any part of ``query``.
+
+    Start and end in the query are free, so the wake word can sit inside a
+    longer utterance ("nova, open chrome"). The cost is normalised by the
+    template length.
+    """
+    n, m = len(template), len(query)
+    if n == 0 or m == 0:
+        return np.inf
+    # Frame-to-frame Euclidean distances, all at once
+    cost = np.sqrt(np.maximum(
+        (template ** 2).sum(1)[:, None] - 2.0 * template @ query.T + (query ** 2).sum(1)[None, :], 0.0))
+    prev = cost[0].copy()  # free start anywhere in the query
+    for i in range(1, n):
+        cur = np.empty(m)
+        cur[0] = prev[0] + cost[i, 0]
+        diag_up = np.minimum(prev[1:], prev[:-1]) + cost[i, 1:]
+        # Horizontal steps depend on the current row, so finish them sequentially
+        for j in range(1, m):
+            cur[j] = min(diag_up[j - 1], cur[j - 1] + cost[i, j])
+        prev = cur
+    return float(prev.min()) / n
+
+
+class WakeWordSpotter:
+    """Keyword spotter for one wake word, trained from a few recordings.
+
+    Enrollment WAVs live in ``templates_dir/<wake_word>/``. A segment is a
+    hit when its best DTW distance to any template is under ``threshold``;
+    with two or more templates the threshold is derived from how far the
+    templates are from each other.
+    """
+
+    def __init__(self, wake_word, templates_dir=TEMPLATES_DIR, threshold=None, margin=1.35):
+        self.wake_word = wake_word.lower().strip()
+        self.templates_dir = templates_dir
+        self.fixed_threshold = threshold
+        self.margin = margin
+        self.templates = []
+        self.threshold = threshold
+        self.load()
+
+    @property
+    def word_dir(self):
+        slug = re.sub(r"[^a-z0-9]+", "_", self.wake_word) or "wake_word"
+        return os.path.join(self.templates_dir, slug)
+
+    def is_ready(self):
+        return len(self.templates) > 0
+
+    def load(self):
+        self.templates = []
+        if os.path.isdir(self.word_dir):
+            for name in sorted(os.listdir(self.word_dir)):
+                if name.lower().endswith(".wav"):
+                    try:
+                        samples, rate = read_wav(os.path.join(self.word_dir, name))
+                        self.templates.append(self._features(samples, rate))
+                    except Exception as e:
+                        print(f"Skipping wake word template {name}: {e}")
+        self._calibrate()
+
+    def _features(self, samples, rate):
+        return mfcc(trim_silence(samples, rate), rate)
+
+    def _calibrate(self):
+        if self.fixed_threshold is not None:
+            self.threshold = self.fixed_threshold
+            return
+        if len(self.templates) < 2:
+            self.threshold = 18.0  # rough default until more samples are enrolled
+            return
+        dists = [subsequence_dtw(a, b) for i, a in enumerate(self.templates)
+                 for j, b in enumerate(self.templates) if i != j]
+        self.threshold = float(np.max(dists)) * self.margin
+
+    def enroll(self, pcm, sample_rate, sample_width=2):
+        """Save one recording of the wake word and retrain."""
+        os.makedirs(self.word_dir, exist_ok=True)
+        index = len([n for n in os.listdir(self.word_dir) if n.endswith(".wav")]) + 1
+        write_wav(os.path.join(self.word_dir, f"sample_{index:02d}.wav"), pcm, sample_rate, sample_width)
+        self.load()
+
+    def clear(self):
+        if os.path.isdir(self.word_dir):
+            for name in os.listdir(self.word_dir):
+                if name.endswith(".wav"):
+                    os.remove(os.path.join(self.word_dir, name))
+        self.load()
+
+    def score(self, samples, sample_rate):
+        """Smallest template distance for float samples (lower is better)."""
+        if not self.templates:
+            return np.inf
+        query = mfcc(samples, sample_rate)
+        return min(subsequence_dtw(t, query) for t in self.templates)
+
+    def detect(self, samples, sample_rate):
+        """Returns (hit, confidence in [0, 1], distance)."""
+        dist = self.score(samples, sample_rate)
+        if not np.isfinite(dist):
+            return False, 0.0, dist
+        hit = dist <= self.threshold
+        confidence = float(np.clip(1.0 - 0.5 * dist / self.threshold, 0.0, 1.0))
+        return hit, confidence, dist
+
+    def detect_pcm(self, pcm, sample_rate, sample_width=2):
+        return self.detect(pcm_to_float(pcm, sample_width), sample_rate)